@@ -5,11 +5,12 @@
 import asyncio
 import random
 import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 from product_parser import ProductParser
+from blocking import BlockingPolicy
+import metrics
 import logging
 
-# Настройка логирования
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
@@ -18,8 +19,82 @@ class AdvancedAmazonParser(ProductParser):
     Продвинутый парсер Amazon с методами обхода блокировки
     """
     
-    def __init__(self, headless: bool = False, timeout: int = 60000):
-        super().__init__(headless, timeout)
+    # Селекторы ожидания загрузки результатов поиска
+    CONTENT_SELECTORS = [
+        '[data-component-type="s-search-result"]',
+        '.s-result-item',
+        '[data-asin]',
+        '.s-search-result',
+        '[cel_widget_id*="MAIN-SEARCH_RESULTS"]',
+        '.s-widget-container',
+        '[data-testid*="product"]'
+    ]
+    
+    CONTENT_DEADLINE = 15.0
+    
+    PRODUCT_SELECTORS = [
+        '[data-component-type="s-search-result"]',
+        '.s-result-item',
+        '[data-asin]',
+        '.s-search-result'
+    ]
+    
+    NAME_SELECTORS = [
+        'h2 a span',
+        'h2 span',
+        '[data-cy="title-recipe-title"] span',
+        '.s-size-mini .s-link-style .s-color-base',
+        'h2 a[title]'
+    ]
+    
+    # Полная цена с копейками и символом валюты ('.a-offscreen') - раньше целой части
+    PRICE_SELECTORS = [
+        '.a-price .a-offscreen',
+        '.a-price-whole',
+        '.a-price-range',
+        '[data-cy="price-recipe"] .a-price .a-offscreen',
+        '.a-price-symbol + .a-price-whole',
+        '.a-price .a-price-whole',
+        '.a-price .a-price-symbol'
+    ]
+    
+    PRICE_ATTRIBUTES = ['data-price', 'data-asin-price', 'data-price-amount']
+    
+    NEXT_PAGE_SELECTORS = ['a.s-pagination-next']
+    
+    # Цены amazon.com без символа (например, '.a-price-whole') - в долларах
+    DEFAULT_CURRENCY = 'USD'
+    
+    # Страница проверки на робота вместо выдачи
+    BLOCK_SELECTORS = [
+        'form[action*="validateCaptcha"]',
+        '#captchacharacters',
+    ]
+    BLOCK_TEXTS = [
+        'Enter the characters you see below',
+        "Sorry, we just need to make sure you're not a robot",
+        'To discuss automated access to Amazon data',
+    ]
+    
+    # Не чаще одной страницы в 2 секунды на домен (два запроса подряд без ожидания)
+    RATE_LIMIT = (0.5, 2)
+    
+    def __init__(self, headless: bool = False, timeout: int = 60000,
+                 max_products: int = 10, human_behavior: bool = False, **kwargs):
+        """
+        Инициализация парсера Amazon
+        
+        Args:
+            headless: Запускать браузер в фоновом режиме
+            timeout: Таймаут загрузки страницы в миллисекундах
+            max_products: Максимум товаров с одной страницы в parse()
+            human_behavior: Имитация мыши и скролла перед извлечением
+                (по умолчанию выключено - ожидание идет по готовности страницы,
+                темп запросов задает rate_limiter)
+            **kwargs: Параметры ProductParser
+        """
+        super().__init__(headless, timeout, max_products=max_products, **kwargs)
+        self.human_behavior = human_behavior
         self.user_agents = [
             'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -28,33 +103,31 @@ class AdvancedAmazonParser(ProductParser):
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/121.0'
         ]
     
-    async def _setup_page(self, page):
-        """Настройка страницы для обхода блокировки"""
-        # Случайный User-Agent
+    def _context_options(self):
+        """Параметры контекста для обхода блокировки"""
+        # Случайный User-Agent на каждый контекст пула
         user_agent = random.choice(self.user_agents)
         
-        # Устанавливаем заголовки
-        await page.set_extra_http_headers({
-            'User-Agent': user_agent,
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.9,ru;q=0.8',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Sec-Fetch-Dest': 'document',
-            'Sec-Fetch-Mode': 'navigate',
-            'Sec-Fetch-Site': 'none',
-            'Sec-Fetch-User': '?1',
-            'Cache-Control': 'max-age=0'
-        })
-        
-        # Устанавливаем viewport
-        await page.set_viewport_size({"width": 1920, "height": 1080})
-        
-        # Блокируем ненужные ресурсы для ускорения
-        await page.route("**/*.{png,jpg,jpeg,gif,svg,ico,woff,woff2,ttf,eot}", lambda route: route.abort())
-        await page.route("**/ads/**", lambda route: route.abort())
-        await page.route("**/analytics/**", lambda route: route.abort())
+        return {
+            'user_agent': user_agent,
+            'viewport': {"width": 1920, "height": 1080},
+            'extra_http_headers': {
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
+                'Accept-Language': 'en-US,en;q=0.9,ru;q=0.8',
+                'Accept-Encoding': 'gzip, deflate, br',
+                'Connection': 'keep-alive',
+                'Upgrade-Insecure-Requests': '1',
+                'Sec-Fetch-Dest': 'document',
+                'Sec-Fetch-Mode': 'navigate',
+                'Sec-Fetch-Site': 'none',
+                'Sec-Fetch-User': '?1',
+                'Cache-Control': 'max-age=0'
+            }
+        }
+    
+    def _default_blocking(self):
+        """Блокируем ненужные ресурсы для ускорения, включая рекламные пути Amazon"""
+        return BlockingPolicy(url_patterns=['*/ads/*', '*/analytics/*'])
     
     async def _human_like_behavior(self, page):
         """Имитация человеческого поведения"""
@@ -81,158 +154,215 @@ class AdvancedAmazonParser(ProductParser):
             logger.debug(f"Ошибка имитации поведения: {e}")
     
     async def _wait_for_content(self, page):
-        """Ожидание загрузки товаров Amazon с множественными попытками"""
-        selectors = [
-            '[data-component-type="s-search-result"]',
-            '.s-result-item',
-            '[data-asin]',
-            '.s-search-result',
-            '[cel_widget_id*="MAIN-SEARCH_RESULTS"]',
-            '.s-widget-container',
-            '[data-testid*="product"]'
-        ]
+        """Ожидание загрузки товаров Amazon по готовности страницы"""
+        with metrics.phase(metrics.WAIT):
+            state = await self.readiness.wait(page)
+        metrics.count(metrics.IPC_CALLS)
+        if state['ready']:
+            logger.info(f"✅ Найдено {state['count']} товаров за {state['elapsed'] / 1000:.1f} с")
+        else:
+            logger.warning(f"Не удалось найти товары за {self.readiness.deadline} с")
+        return state['ready']
+    
+    async def _load_page(self, page, url):
+        """Загрузка страницы с обходом блокировки"""
+        logger.info(f"🌐 Загружаем: {url}")
         
-        for attempt in range(3):
-            try:
-                logger.info(f"Попытка {attempt + 1} поиска товаров...")
-                
+        # Переходим на страницу
+        with metrics.phase(metrics.NAVIGATION):
+            await page.goto(url, timeout=self.timeout)
+        metrics.count(metrics.IPC_CALLS)
+        
+        if self.human_behavior:
+            with metrics.phase(metrics.HUMAN):
                 # Имитируем человеческое поведение
                 await self._human_like_behavior(page)
-                
-                # Пробуем разные селекторы
-                for selector in selectors:
-                    try:
-                        await page.wait_for_selector(selector, timeout=5000)
-                        logger.info(f"✅ Товары найдены по селектору: {selector}")
-                        return True
-                    except:
-                        continue
-                
-                # Ждем общую загрузку
-                await page.wait_for_load_state('networkidle', timeout=10000)
-                
-                # Проверяем наличие товаров
-                for selector in selectors:
-                    elements = await page.query_selector_all(selector)
-                    if elements:
-                        logger.info(f"✅ Найдено {len(elements)} товаров по селектору: {selector}")
-                        return True
-                
-                # Случайная задержка перед следующей попыткой
-                await asyncio.sleep(random.uniform(2, 5))
-                
-            except Exception as e:
-                logger.warning(f"Попытка {attempt + 1} не удалась: {e}")
-                if attempt < 2:
-                    await asyncio.sleep(random.uniform(3, 7))
         
-        logger.warning("Не удалось найти товары после всех попыток")
-        return False
+        # Ждем загрузки контента
+        if not await self._wait_for_content(page):
+            logger.warning("Контент не загружен, но продолжаем...")
+    
+    def _has_snapshot_extraction(self):
+        """Снимки карточек доступны, если извлечение Amazon не переопределено"""
+        return type(self)._extract_amazon_product_data is AdvancedAmazonParser._extract_amazon_product_data
+    
+    def _batch_spec(self, url=''):
+        """Данные карточки Amazon, собираемые в браузере"""
+        return {
+            'attributes': ['data-asin'] + self.PRICE_ATTRIBUTES,
+            'nested': [['h2 a', 'href']],
+            'fields': {
+                'name': {'selectors': self._selectors_for(url, 'name', self.NAME_SELECTORS), 'stop': True},
+                # Цену нормализуем в Python, поэтому нужны все кандидаты
+                'price': {'selectors': self._selectors_for(url, 'price', self.PRICE_SELECTORS), 'stop': False},
+            },
+        }
+    
+    async def _next_page_url(self, page, url, page_number):
+        """Следующая страница выдачи: кнопка пагинации или параметр &page="""
+        if await page.query_selector('.s-pagination-next.s-pagination-disabled'):
+            return None
+        
+        next_url = await super()._next_page_url(page, url, page_number)
+        if next_url:
+            return next_url
+        
+        # Для поисковых URL Amazon номер страницы задается параметром page
+        parts = urlsplit(url)
+        if parts.path.rstrip('/') != '/s':
+            return None
+        query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if key != 'page']
+        query.append(('page', str(page_number + 1)))
+        return urlunsplit(parts._replace(query=urlencode(query)))
     
-    async def parse(self, url: str) -> list:
-        """Парсинг с обходом блокировки"""
-        if not self.browser:
-            await self._init_browser()
+    async def _extract_products_batch(self, page, limit=None):
+        """Пакетное извлечение товаров за один round trip"""
+        card_selectors = self._selectors_for(page.url, 'cards', self.PRODUCT_SELECTORS)
+        spec = self._batch_spec(page.url)
+        selector, total, snapshots = await self._snapshot_cards(page, card_selectors, spec, limit)
+        self._learn_from_snapshots(page.url, card_selectors, selector, spec, snapshots)
+        
+        if not snapshots:
+            logger.warning("❌ Товары не найдены")
+            return []
+        
+        logger.info(f"📦 Найдено {total} товаров")
+        
+        products = []
+        for i, snapshot in enumerate(snapshots):
+            try:
+                product_data = self._product_from_snapshot(snapshot, i)
+                if product_data:
+                    products.append(product_data)
+                    logger.info(f"✅ Товар {i+1}: {product_data['name'][:50]}...")
+            except Exception as e:
+                logger.error(f"❌ Ошибка товара {i+1}: {e}")
+                continue
         
+        logger.info(f"🎉 Успешно извлечено {len(products)} товаров")
+        return products
+    
+    async def _extract_products_by_element(self, page, limit=None):
+        """Поэлементное извлечение товаров"""
         products = []
+        product_elements = []
+        card_selectors = self._selectors_for(page.url, 'cards', self.PRODUCT_SELECTORS)
+        for selector in card_selectors:
+            try:
+                metrics.count(metrics.SELECTOR_PROBES)
+                metrics.count(metrics.IPC_CALLS)
+                elements = await page.query_selector_all(selector)
+                if elements:
+                    metrics.count(metrics.SELECTOR_MATCHES)
+                    product_elements = elements
+                    self._learn_selector(page.url, 'cards', card_selectors, selector)
+                    logger.info(f"📦 Найдено {len(elements)} товаров")
+                    break
+            except:
+                continue
         
-        try:
-            # Создаем страницу
-            page = await self.browser.new_page()
-            await self._setup_page(page)
-            
-            logger.info(f"🌐 Загружаем: {url}")
-            
-            # Переходим на страницу
-            await page.goto(url, timeout=self.timeout)
-            
-            # Случайная задержка
-            await asyncio.sleep(random.uniform(2, 4))
-            
-            # Имитируем человеческое поведение
-            await self._human_like_behavior(page)
-            
-            # Ждем загрузки контента
-            if not await self._wait_for_content(page):
-                logger.warning("Контент не загружен, но продолжаем...")
-            
-            # Ищем товары
-            product_selectors = [
-                '[data-component-type="s-search-result"]',
-                '.s-result-item',
-                '[data-asin]',
-                '.s-search-result'
-            ]
-            
-            product_elements = []
-            for selector in product_selectors:
-                try:
-                    elements = await page.query_selector_all(selector)
-                    if elements:
-                        product_elements = elements
-                        logger.info(f"📦 Найдено {len(elements)} товаров")
-                        break
-                except:
-                    continue
-            
-            if not product_elements:
-                logger.warning("❌ Товары не найдены")
-                return products
-            
-            # Извлекаем данные из первых 10 товаров
-            for i, element in enumerate(product_elements[:10]):
-                try:
-                    product_data = await self._extract_amazon_product_data(element, i)
-                    if product_data:
-                        products.append(product_data)
-                        logger.info(f"✅ Товар {i+1}: {product_data['name'][:50]}...")
-                except Exception as e:
-                    logger.error(f"❌ Ошибка товара {i+1}: {e}")
-                    continue
-            
-            logger.info(f"🎉 Успешно извлечено {len(products)} товаров")
-            
-        except Exception as e:
-            logger.error(f"❌ Ошибка парсинга: {e}")
-            
-        finally:
-            if 'page' in locals():
-                await page.close()
+        if not product_elements:
+            logger.warning("❌ Товары не найдены")
+            return products
         
+        # Извлекаем данные из первых limit товаров
+        for i, element in enumerate(product_elements[:limit]):
+            try:
+                product_data = await self._extract_amazon_product_data(element, i, page.url)
+                if product_data:
+                    products.append(product_data)
+                    logger.info(f"✅ Товар {i+1}: {product_data['name'][:50]}...")
+            except Exception as e:
+                logger.error(f"❌ Ошибка товара {i+1}: {e}")
+                continue
+        
+        logger.info(f"🎉 Успешно извлечено {len(products)} товаров")
         return products
     
-    async def _extract_amazon_product_data(self, element, index):
+    def _product_from_snapshot(self, snapshot, index):
+        """Построение товара Amazon из снимка карточки (логика _extract_amazon_product_data)"""
+        attributes = snapshot['attributes']
+        
+        # ID товара
+        asin = attributes.get('data-asin')
+        if not asin:
+            # Пробуем найти в ссылке
+            href = snapshot['nested'][0]
+            if href and '/dp/' in href:
+                asin = href.split('/dp/')[1].split('/')[0]
+        
+        id_fields = self._id_fields(asin, index, 'amazon_{}')
+        asin = id_fields["id"]
+        
+        # Название товара
+        name = ""
+        for _, text in snapshot['fields']['name']:
+            name = text
+            if name and name.strip():
+                break
+        
+        if not name:
+            name = f"Товар Amazon {asin}"
+        
+        # Цена товара
+        price = ""
+        price_source = None
+        for _, price_text in snapshot['fields']['price']:
+            if price_text and price_text.strip():
+                price = self._extract_price(price_text)
+                if price:
+                    price_source = price_text
+                    break
+        
+        # Если цена не найдена, ищем в data-атрибутах
+        if not price:
+            for attr in self.PRICE_ATTRIBUTES:
+                price_value = attributes.get(attr)
+                if price_value:
+                    price = self._extract_price(price_value)
+                    if price:
+                        price_source = price_value
+                        break
+        
+        return {
+            **id_fields,
+            "name": name.strip(),
+            **self._price_fields(price, price_source)
+        }
+    
+    async def _extract_amazon_product_data(self, element, index, url=''):
         """Извлечение данных товара Amazon"""
         try:
             # ID товара
+            metrics.count(metrics.IPC_CALLS)
             asin = await element.get_attribute('data-asin')
             if not asin:
                 # Пробуем найти в ссылке
+                metrics.count(metrics.IPC_CALLS)
                 link = await element.query_selector('h2 a')
                 if link:
+                    metrics.count(metrics.IPC_CALLS)
                     href = await link.get_attribute('href')
                     if href and '/dp/' in href:
                         asin = href.split('/dp/')[1].split('/')[0]
             
-            if not asin:
-                asin = f"amazon_{index + 1}"
+            id_fields = self._id_fields(asin, index, 'amazon_{}')
+            asin = id_fields["id"]
             
             # Название товара
             name = ""
-            name_selectors = [
-                'h2 a span',
-                'h2 span',
-                '[data-cy="title-recipe-title"] span',
-                '.s-size-mini .s-link-style .s-color-base',
-                'h2 a[title]'
-            ]
-            
+            name_selectors = self._selectors_for(url, 'name', self.NAME_SELECTORS)
             for selector in name_selectors:
                 try:
+                    metrics.count(metrics.SELECTOR_PROBES)
+                    metrics.count(metrics.IPC_CALLS)
                     name_el = await element.query_selector(selector)
                     if name_el:
+                        metrics.count(metrics.SELECTOR_MATCHES)
+                        metrics.count(metrics.IPC_CALLS)
                         name = await name_el.inner_text()
                         if name and name.strip():
+                            self._learn_selector(url, 'name', name_selectors, selector)
                             break
                 except:
                     continue
@@ -242,45 +372,44 @@ class AdvancedAmazonParser(ProductParser):
             
             # Цена товара
             price = ""
-            price_selectors = [
-                '.a-price-whole',
-                '.a-price .a-offscreen',
-                '.a-price-range',
-                '[data-cy="price-recipe"] .a-price .a-offscreen',
-                '.a-price-symbol + .a-price-whole',
-                '.a-price .a-price-whole',
-                '.a-price .a-price-symbol'
-            ]
-            
+            price_source = None
+            price_selectors = self._selectors_for(url, 'price', self.PRICE_SELECTORS)
             for selector in price_selectors:
                 try:
+                    metrics.count(metrics.SELECTOR_PROBES)
+                    metrics.count(metrics.IPC_CALLS)
                     price_el = await element.query_selector(selector)
                     if price_el:
+                        metrics.count(metrics.SELECTOR_MATCHES)
+                        metrics.count(metrics.IPC_CALLS)
                         price_text = await price_el.inner_text()
                         if price_text and price_text.strip():
                             price = self._extract_price(price_text)
                             if price:
+                                price_source = price_text
+                                self._learn_selector(url, 'price', price_selectors, selector)
                                 break
                 except:
                     continue
             
             # Если цена не найдена, ищем в data-атрибутах
             if not price:
-                price_attrs = ['data-price', 'data-asin-price', 'data-price-amount']
-                for attr in price_attrs:
+                for attr in self.PRICE_ATTRIBUTES:
                     try:
+                        metrics.count(metrics.IPC_CALLS)
                         price_value = await element.get_attribute(attr)
                         if price_value:
                             price = self._extract_price(price_value)
                             if price:
+                                price_source = price_value
                                 break
                     except:
                         continue
             
             return {
-                "id": asin,
+                **id_fields,
                 "name": name.strip(),
-                "price": price or "Цена не указана"
+                **self._price_fields(price, price_source)
             }
             
         except Exception as e:
@@ -331,4 +460,5 @@ async def main():
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     asyncio.run(main())
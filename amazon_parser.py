@@ -18,8 +18,8 @@ class AmazonProductParser(ProductParser):
     Настроен под структуру и селекторы Amazon
     """
     
-    def __init__(self, headless: bool = True, timeout: int = 30000):
-        super().__init__(headless, timeout)
+    def __init__(self, headless: bool = True, timeout: int = 30000, **kwargs):
+        super().__init__(headless, timeout, **kwargs)
     
     async def _wait_for_content(self, page):
         """Ожидание загрузки товаров Amazon"""
@@ -63,8 +63,8 @@ class AmazonProductParser(ProductParser):
                     if href and '/dp/' in href:
                         product_id = href.split('/dp/')[1].split('/')[0]
             
-            if not product_id:
-                product_id = f"amazon_{index + 1}"
+            id_fields = self._id_fields(product_id, index, 'amazon_{}')
+            product_id = id_fields["id"]
             
             # Название товара
             name = ""
@@ -135,7 +135,7 @@ class AmazonProductParser(ProductParser):
                     pass
             
             return {
-                "id": product_id,
+                **id_fields,
                 "name": name.strip(),
                 "price": price or "Цена не указана"
             }
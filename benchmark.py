@@ -0,0 +1,705 @@
+"""
+Бенчмарк парсеров на локальных тестовых страницах
+Не требует доступа в интернет
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+
+def build_cards(cards: int = 60, markup: str = 'generic', seed: int = 42) -> List[str]:
+    """
+    HTML карточек товаров для синтетической страницы
+
+    Args:
+        cards: Количество карточек товаров
+        markup: Разметка карточек: 'generic' или 'amazon'
+        seed: Зерно генератора случайных цен
+
+    Returns:
+        HTML каждой карточки
+    """
+    rng = random.Random(seed)
+    items = []
+
+    for i in range(cards):
+        price = f"{rng.randint(5, 500)}.{rng.randint(0, 99):02d}"
+        if markup == 'amazon':
+            asin = f"B{i:09d}"
+            items.append(
+                f'<div data-component-type="s-search-result" data-asin="{asin}" class="s-result-item">'
+                f'<h2><a href="/item/dp/{asin}/ref=sr_1"><span>Test Shoe {i} Running Edition</span></a></h2>'
+                f'<span class="a-price"><span class="a-offscreen">${price}</span>'
+                f'<span class="a-price-whole">{price.split(".")[0]}.</span></span>'
+                f'</div>'
+            )
+        else:
+            items.append(
+                f'<div class="product-card" data-product-id="sku-{i}">'
+                f'<h3 class="title">Test product {i}</h3>'
+                f'<span class="price">{price} ₽</span>'
+                f'</div>'
+            )
+
+    return items
+
+
+def build_listing_html(cards: int = 60, markup: str = 'generic', seed: int = 42) -> str:
+    """
+    Генерация синтетической страницы со списком товаров
+
+    Args:
+        cards: Количество карточек товаров
+        markup: Разметка карточек: 'generic' или 'amazon'
+        seed: Зерно генератора случайных цен
+
+    Returns:
+        HTML страницы
+    """
+    return (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>Fixture</title></head>'
+        '<body><main>' + ''.join(build_cards(cards, markup, seed)) + '</main></body></html>'
+    )
+
+
+def write_fixture(directory: str, cards: int = 60, markup: str = 'generic') -> str:
+    """
+    Запись тестовой страницы на диск
+
+    Args:
+        directory: Каталог для файла
+        cards: Количество карточек товаров
+        markup: Разметка карточек: 'generic' или 'amazon'
+
+    Returns:
+        file:// URL страницы
+    """
+    path = os.path.join(directory, f"fixture_{markup}_{cards}.html")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(build_listing_html(cards, markup))
+    return 'file://' + os.path.abspath(path)
+
+
+def build_js_listing_html(cards: int = 60, markup: str = 'generic', seed: int = 42,
+                          delay_ms: int = 200, chunks: int = 3) -> str:
+    """
+    Страница, карточки которой добавляет JavaScript после загрузки
+
+    Карточки вставляются порциями с интервалом delay_ms, поэтому
+    статический разбор их не видит, а браузер должен дождаться
+    стабилизации числа товаров.
+
+    Args:
+        cards: Количество карточек товаров
+        markup: Разметка карточек: 'generic' или 'amazon'
+        seed: Зерно генератора случайных цен
+        delay_ms: Интервал между порциями карточек в миллисекундах
+        chunks: Количество порций
+
+    Returns:
+        HTML страницы
+    """
+    items = build_cards(cards, markup, seed)
+    size = max(1, -(-len(items) // chunks))
+    parts = [''.join(items[i:i + size]) for i in range(0, len(items), size)]
+
+    script = (
+        f'const parts = {json.dumps(parts)};'
+        'parts.forEach((html, i) => setTimeout(() => '
+        'document.querySelector("main").insertAdjacentHTML("beforeend", html), '
+        f'{delay_ms} * (i + 1)));'
+    )
+    return (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>Fixture</title></head>'
+        f'<body><main></main><script>{script}</script></body></html>'
+    )
+
+
+# Страница проверки на робота (как у Amazon)
+CAPTCHA_HTML = (
+    '<!DOCTYPE html><html><head><meta charset="utf-8"><title>Robot Check</title></head><body>'
+    '<h4>Enter the characters you see below</h4>'
+    '<form method="get" action="/errors/validateCaptcha"><input id="captchacharacters" name="field-keywords"></form>'
+    '</body></html>'
+)
+
+
+class FixtureServer:
+    """
+    Локальный HTTP сервер с синтетическими страницами списков
+
+    Пути: /generic, /amazon - готовая разметка, /js/generic, /js/amazon -
+    карточки добавляет JavaScript, /captcha - страница проверки на робота
+    Amazon. Параметры запроса: cards (количество карточек), latency
+    (задержка ответа в мс), page (номер страницы, меняет цены и делает
+    URL уникальным), fail (сколько первых запросов этого URL ответят 503).
+
+    Пример:
+        with FixtureServer(latency=50) as server:
+            url = server.url('amazon', cards=48, page=1)
+    """
+
+    def __init__(self, cards: int = 60, latency: float = 0.0, host: str = '127.0.0.1', port: int = 0):
+        """
+        Инициализация сервера
+
+        Args:
+            cards: Количество карточек по умолчанию
+            latency: Задержка ответа по умолчанию в миллисекундах
+            host: Адрес
+            port: Порт (0 - любой свободный)
+        """
+        self.cards = cards
+        self.latency = latency
+        self.requests = 0
+        self._hits: Dict[str, int] = {}
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    def _handler(self):
+        """Класс обработчика запросов, привязанный к этому серверу"""
+        fixture = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+                path = parts.path.strip('/').split('/')
+                javascript = path[0] == 'js'
+                markup = path[-1] if path[-1] in ('generic', 'amazon', 'captcha') else None
+                if markup is None:
+                    self.send_error(404)
+                    return
+
+                fixture.requests += 1
+                hits = fixture._hits[self.path] = fixture._hits.get(self.path, 0) + 1
+                latency = float(query.get('latency', fixture.latency))
+                if latency:
+                    time.sleep(latency / 1000)
+                if hits <= int(query.get('fail', 0)):
+                    self.send_error(503)
+                    return
+
+                cards = int(query.get('cards', fixture.cards))
+                seed = int(query.get('page', 1))
+                if markup == 'captcha':
+                    html = CAPTCHA_HTML
+                elif javascript:
+                    html = build_js_listing_html(cards, markup, seed, int(query.get('delay', 200)))
+                else:
+                    html = build_listing_html(cards, markup, seed)
+
+                body = html.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    @property
+    def base_url(self) -> str:
+        """Адрес сервера"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, path: str = 'generic', **params: Any) -> str:
+        """
+        URL страницы сервера
+
+        Args:
+            path: 'generic', 'amazon', 'js/generic', 'js/amazon' или 'captcha'
+            **params: Параметры запроса (cards, latency, page, delay, fail)
+
+        Returns:
+            Полный URL
+        """
+        query = f"?{urlencode(params)}" if params else ''
+        return f"{self.base_url}/{path}{query}"
+
+    def start(self):
+        """Запуск сервера в фоновом потоке"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Остановка сервера"""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+async def _time_extraction(parser, url: str, rounds: int) -> List[float]:
+    """Время извлечения товаров (без загрузки страницы) для каждого раунда"""
+    timings = []
+    page = await parser.browser.new_page()
+    try:
+        await page.goto(url)
+        for _ in range(rounds):
+            start = time.perf_counter()
+            if parser._use_batch_extraction():
+                await parser._extract_products_batch(page)
+            else:
+                await parser._extract_products_by_element(page)
+            timings.append(time.perf_counter() - start)
+    finally:
+        await page.close()
+    return timings
+
+
+async def bench_extraction(cards: int = 60, rounds: int = 5):
+    """
+    Сравнение поэлементного и пакетного извлечения товаров
+
+    Args:
+        cards: Количество карточек на тестовой странице
+        rounds: Количество повторов для каждого режима
+    """
+    import logging
+    from product_parser import ProductParser
+    from amazon_advanced import AdvancedAmazonParser
+
+    logging.getLogger('product_parser').setLevel(logging.WARNING)
+    logging.getLogger('amazon_advanced').setLevel(logging.WARNING)
+
+    print(f"📊 Бенчмарк извлечения: {cards} карточек, {rounds} раундов")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as directory:
+        cases = [
+            ('ProductParser', ProductParser, write_fixture(directory, cards, 'generic')),
+            ('AdvancedAmazonParser', AdvancedAmazonParser, write_fixture(directory, cards, 'amazon')),
+        ]
+
+        for title, parser_class, url in cases:
+            results = {}
+            outputs = {}
+            for mode in ('element', 'batch'):
+                async with parser_class(headless=True, extraction_mode=mode) as parser:
+                    timings = await _time_extraction(parser, url, rounds)
+                    outputs[mode] = await parser.parse(url)
+                results[mode] = sorted(timings)[len(timings) // 2]
+
+            speedup = results['element'] / results['batch'] if results['batch'] else float('inf')
+            same = "да" if outputs['element'] == outputs['batch'] else "НЕТ"
+            print(f"{title}:")
+            print(f"   • element: {results['element'] * 1000:.1f} мс")
+            print(f"   • batch:   {results['batch'] * 1000:.1f} мс")
+            print(f"   • ускорение: x{speedup:.1f}, результаты совпадают: {same}")
+
+
+# Режимы для сравнения: (название, класс, страница сервера, параметры парсера)
+THROUGHPUT_MODES = [
+    ('ProductParser static', 'product_parser.ProductParser', 'generic', {'backend': 'static'}),
+    ('ProductParser batch', 'product_parser.ProductParser', 'generic', {'extraction_mode': 'batch'}),
+    ('ProductParser element', 'product_parser.ProductParser', 'generic', {'extraction_mode': 'element'}),
+    ('ProductParser batch JS', 'product_parser.ProductParser', 'js/generic', {'extraction_mode': 'batch'}),
+    ('AdvancedAmazonParser static', 'amazon_advanced.AdvancedAmazonParser', 'amazon', {'backend': 'static'}),
+    ('AdvancedAmazonParser batch', 'amazon_advanced.AdvancedAmazonParser', 'amazon', {'extraction_mode': 'batch'}),
+    ('AdvancedAmazonParser element', 'amazon_advanced.AdvancedAmazonParser', 'amazon', {'extraction_mode': 'element'}),
+    ('AdvancedAmazonParser batch JS', 'amazon_advanced.AdvancedAmazonParser', 'js/amazon', {'extraction_mode': 'batch'}),
+]
+
+
+def percentile(values: Sequence[float], p: float) -> float:
+    """
+    Перцентиль с линейной интерполяцией
+
+    Args:
+        values: Значения
+        p: Перцентиль от 0 до 100
+
+    Returns:
+        Значение перцентиля (0.0 для пустого списка)
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * p / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class RssMonitor:
+    """
+    Пиковая память (RSS) за время замера
+
+    С psutil память опрашивается в фоновом потоке и включает дочерние
+    процессы (браузер). Без psutil - пиковый RSS процесса Python за все
+    время его работы (ru_maxrss).
+    """
+
+    def __init__(self, interval: float = 0.05):
+        """
+        Args:
+            interval: Период опроса в секундах
+        """
+        self.interval = interval
+        self.peak = 0
+        self.includes_children = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self, process: Any) -> int:
+        """Текущий RSS процесса и его потомков в байтах"""
+        total = 0
+        for proc in [process] + process.children(recursive=True):
+            try:
+                total += proc.memory_info().rss
+            except Exception:
+                pass
+        return total
+
+    def _run(self, process: Any):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self._sample(process))
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        try:
+            import psutil
+        except ImportError:
+            return self
+        self.includes_children = True
+        self._thread = threading.Thread(target=self._run, args=(psutil.Process(),), daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._thread:
+            self._stop.set()
+            self._thread.join()
+        else:
+            # ru_maxrss в Linux - в килобайтах, в macOS - в байтах
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            self.peak = maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+    @property
+    def peak_mb(self) -> float:
+        """Пиковый RSS в мегабайтах"""
+        return self.peak / 1024 / 1024
+
+
+def _load_class(path: str) -> Any:
+    """Класс парсера по пути 'модуль.Класс'"""
+    import importlib
+    module, name = path.rsplit('.', 1)
+    return getattr(importlib.import_module(module), name)
+
+
+async def bench_mode(parser_class: Any, urls: List[str], concurrency: int = 4,
+                     **options: Any) -> Dict[str, Any]:
+    """
+    Замер одного режима парсера на списке URL
+
+    Args:
+        parser_class: Класс парсера
+        urls: Страницы для обхода
+        concurrency: Одновременно загружаемых страниц
+        **options: Параметры конструктора парсера
+
+    Returns:
+        pages, errors, products, elapsed, pages_per_sec, products_per_sec,
+        p50/p95/p99 (задержка страницы в секундах), peak_rss_mb,
+        phases (среднее время фаз на страницу в секундах)
+    """
+    options.setdefault('headless', True)
+    options.setdefault('max_products', None)
+    latencies = []
+    products = 0
+    errors = 0
+
+    with RssMonitor() as rss:
+        start = time.perf_counter()
+        async with parser_class(**options) as parser:
+            async for result in parser.parse_many(urls, concurrency=concurrency):
+                latencies.append(result.elapsed)
+                products += len(result.products)
+                errors += 0 if result.ok else 1
+            registry = parser.metrics
+        elapsed = time.perf_counter() - start
+
+    return {
+        'pages': len(latencies),
+        'errors': errors,
+        'products': products,
+        'elapsed': elapsed,
+        'pages_per_sec': len(latencies) / elapsed if elapsed else 0.0,
+        'products_per_sec': products / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+        'peak_rss_mb': rss.peak_mb,
+        'rss_includes_browser': rss.includes_children,
+        'phases': {name: seconds / registry.parses for name, seconds in registry.phase_seconds.items()},
+    }
+
+
+async def bench_throughput(pages: int = 20, cards: int = 60, latency: float = 0.0,
+                           concurrency: int = 4, modes: Optional[Iterable[str]] = None,
+                           json_output: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Пропускная способность и задержки парсеров на локальном HTTP сервере
+
+    Args:
+        pages: Страниц на режим
+        cards: Карточек на странице
+        latency: Задержка ответа сервера в миллисекундах
+        concurrency: Одновременно загружаемых страниц
+        modes: Названия режимов из THROUGHPUT_MODES (None - все)
+        json_output: Файл для результатов в формате JSON lines
+
+    Returns:
+        Результаты bench_mode с полем mode для каждого режима
+    """
+    import logging
+    for name in ('product_parser', 'amazon_advanced', 'browser_pool', 'static_parser', 'readiness'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    selected = set(modes) if modes else None
+    results = []
+
+    print(f"📊 Бенчмарк пропускной способности: {pages} страниц x {cards} карточек, "
+          f"задержка {latency:g} мс, параллельно {concurrency}")
+    print("=" * 60)
+
+    with FixtureServer(cards=cards, latency=latency) as server:
+        for title, class_path, path, options in THROUGHPUT_MODES:
+            if selected is not None and title not in selected:
+                continue
+            urls = [server.url(path, page=page) for page in range(1, pages + 1)]
+            try:
+                result = await bench_mode(_load_class(class_path), urls, concurrency, **options)
+            except Exception as e:
+                print(f"{title}: пропущен ({str(e).splitlines()[0]})")
+                continue
+
+            result['mode'] = title
+            results.append(result)
+            rss_note = '' if result['rss_includes_browser'] else ' (только Python)'
+            print(f"{title}:")
+            print(f"   • {result['pages_per_sec']:.1f} стр/с, {result['products_per_sec']:.0f} товаров/с "
+                  f"({result['products']} товаров, ошибок: {result['errors']})")
+            print(f"   • задержка p50/p95/p99: {result['p50'] * 1000:.0f} / {result['p95'] * 1000:.0f} / "
+                  f"{result['p99'] * 1000:.0f} мс")
+            print(f"   • пиковый RSS: {result['peak_rss_mb']:.0f} МБ{rss_note}")
+            if result['phases']:
+                phases = ', '.join(f"{name} {seconds * 1000:.0f}" for name, seconds in result['phases'].items())
+                print(f"   • фазы на страницу, мс: {phases}")
+
+    if json_output:
+        with open(json_output, 'a', encoding='utf-8') as f:
+            for result in results:
+                f.write(json.dumps(dict(result, at=time.time()), ensure_ascii=False) + '\n')
+        print(f"💾 Результаты добавлены в: {json_output}")
+
+    return results
+
+
+def _read_back(filename: str, format: str) -> int:
+    """Чтение экспортированного файла целиком, возвращает число строк"""
+    if format == 'xlsx':
+        from openpyxl import load_workbook
+        workbook = load_workbook(filename, read_only=True)
+        rows = sum(1 for _ in workbook.worksheets[0].iter_rows(values_only=True)) - 1
+        workbook.close()
+        return rows
+    if format == 'csv':
+        import csv
+        with open(filename, encoding='utf-8-sig', newline='') as f:
+            return sum(1 for _ in csv.reader(f)) - 1
+    if format == 'jsonl':
+        import json
+        with open(filename, encoding='utf-8') as f:
+            return sum(1 for line in f if json.loads(line))
+    if format == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.read_table(filename).num_rows
+    raise ValueError(f"Неизвестный формат: {format}")
+
+
+def bench_export(rows: int = 100000, formats: Iterable[str] = ('xlsx', 'csv', 'jsonl', 'parquet')):
+    """
+    Сравнение форматов экспорта: время записи, чтения и размер файла
+
+    Args:
+        rows: Количество строк
+        formats: Форматы для сравнения
+    """
+    from exporters import export_products
+
+    rng = random.Random(42)
+    products = [
+        {
+            'id': f"B{i:09d}",
+            'name': f"Test Shoe {i} Running Edition {rng.choice(['Black', 'White', 'Blue'])}",
+            'price': f"{rng.randint(5, 500)}.{rng.randint(0, 99):02d}"
+        }
+        for i in range(rows)
+    ]
+    columns = [('№', 8, 'int'), ('ID товара', 15), ('Название товара', 60), ('Цена', 15)]
+
+    print(f"📊 Бенчмарк экспорта: {rows} строк")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as directory:
+        for format in formats:
+            filename = os.path.join(directory, f"products.{format}")
+            try:
+                start = time.perf_counter()
+                export_products(
+                    filename, products, columns,
+                    row=lambda number, product: [number, product['id'], product['name'], product['price']],
+                    format=format
+                )
+                write_time = time.perf_counter() - start
+
+                start = time.perf_counter()
+                read_rows = _read_back(filename, format)
+                read_time = time.perf_counter() - start
+            except ImportError as e:
+                print(f"{format}: пропущен ({e})")
+                continue
+
+            size = os.path.getsize(filename) / 1024 / 1024
+            print(f"{format}:")
+            print(f"   • запись: {write_time:.2f} с, чтение: {read_time:.2f} с")
+            print(f"   • размер: {size:.1f} МБ, строк прочитано: {read_rows}")
+
+
+# Команды и модули для замера времени запуска
+STARTUP_TARGETS = [
+    ('cli.py --help', ['cli.py', '--help']),
+    ('cli.py report --help', ['cli.py', 'report', '--help']),
+    ('import cli', ['-c', 'import cli']),
+    ('import product_parser', ['-c', 'import product_parser']),
+    ('import amazon_advanced', ['-c', 'import amazon_advanced']),
+    ('import export_to_excel', ['-c', 'import export_to_excel']),
+    ('import final_report', ['-c', 'import final_report']),
+]
+
+# Тяжелые зависимости, которые не должны загружаться без необходимости
+HEAVY_MODULES = ('playwright', 'pandas', 'numpy', 'openpyxl', 'lxml', 'pyarrow')
+
+
+def _heavy_modules(args: List[str]) -> List[str]:
+    """Тяжелые модули, загруженные командой (для импортов модулей)"""
+    if args[0] != '-c':
+        return []
+    code = (f"{args[1]}; import sys; "
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    return [name for name in output.stdout.strip().split(',') if name]
+
+
+def bench_startup(runs: int = 10, json_output: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Бенчмарк времени запуска: CLI и импорт модулей в новом процессе
+
+    Из времени вычитается запуск пустого интерпретатора, поэтому
+    результат - стоимость импортов самого проекта и его зависимостей.
+
+    Args:
+        runs: Запусков на команду (берется медиана)
+        json_output: Файл для результатов в формате JSON lines
+
+    Returns:
+        Словари с полями target, median_ms, min_ms и heavy_modules
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+
+    def measure(args: List[str]) -> List[float]:
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, *args], cwd=directory, capture_output=True, check=True)
+            times.append(time.perf_counter() - start)
+        return times
+
+    baseline = statistics.median(measure(['-c', 'pass']))
+    results = []
+
+    print(f"📊 Бенчмарк запуска: медиана {runs} запусков, интерпретатор {baseline * 1000:.0f} мс вычтен")
+    print("=" * 60)
+
+    for title, args in STARTUP_TARGETS:
+        try:
+            times = measure(args)
+        except subprocess.CalledProcessError as e:
+            error = e.stderr.decode(errors='replace').strip().splitlines()
+            print(f"{title}: пропущен ({error[-1] if error else e})")
+            continue
+        result = {
+            'target': title,
+            'median_ms': (statistics.median(times) - baseline) * 1000,
+            'min_ms': (min(times) - baseline) * 1000,
+            'heavy_modules': _heavy_modules(args),
+        }
+        results.append(result)
+        heavy = f" (загружены: {', '.join(result['heavy_modules'])})" if result['heavy_modules'] else ''
+        print(f"{title}: {result['median_ms']:.0f} мс, минимум {result['min_ms']:.0f} мс{heavy}")
+
+    if json_output:
+        with open(json_output, 'a', encoding='utf-8') as f:
+            for result in results:
+                f.write(json.dumps(dict(result, at=time.time()), ensure_ascii=False) + '\n')
+        print(f"💾 Результаты добавлены в: {json_output}")
+
+    return results
+
+
+def main():
+    """Запуск бенчмарков из командной строки"""
+    parser = argparse.ArgumentParser(description="Бенчмарк парсеров на локальных страницах")
+    parser.add_argument('suites', nargs='*', default=['extraction', 'throughput', 'export'],
+                        choices=['extraction', 'throughput', 'export', 'startup'], help="Какие бенчмарки запускать")
+    parser.add_argument('--pages', type=int, default=20, help="Страниц на режим")
+    parser.add_argument('--cards', type=int, default=60, help="Карточек на странице")
+    parser.add_argument('--latency', type=float, default=0.0, help="Задержка ответа сервера, мс")
+    parser.add_argument('--concurrency', type=int, default=4, help="Одновременно загружаемых страниц")
+    parser.add_argument('--mode', action='append', dest='modes', help="Режим из THROUGHPUT_MODES (можно несколько)")
+    parser.add_argument('--runs', type=int, default=10, help="Запусков на команду в бенчмарке запуска")
+    parser.add_argument('--json', dest='json_output', help="Дописать результаты в файл JSON lines")
+    args = parser.parse_args()
+
+    if 'extraction' in args.suites:
+        asyncio.run(bench_extraction(args.cards))
+    if 'throughput' in args.suites:
+        asyncio.run(bench_throughput(args.pages, args.cards, args.latency, args.concurrency,
+                                     args.modes, args.json_output))
+    if 'export' in args.suites:
+        bench_export()
+    if 'startup' in args.suites:
+        bench_startup(args.runs, args.json_output)
+
+
+if __name__ == "__main__":
+    main()
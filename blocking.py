@@ -0,0 +1,151 @@
+"""
+Политика блокировки ресурсов страницы
+Один обработчик маршрутов вместо нескольких glob-маршрутов
+"""
+
+import logging
+import re
+from fnmatch import translate
+from typing import Any, Dict, Iterable, Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Рекламные и аналитические домены (блокируются вместе с поддоменами)
+AD_TRACKER_DOMAINS = [
+    'doubleclick.net',
+    'googlesyndication.com',
+    'googleadservices.com',
+    'google-analytics.com',
+    'googletagmanager.com',
+    'googletagservices.com',
+    'amazon-adsystem.com',
+    'facebook.net',
+    'connect.facebook.net',
+    'scorecardresearch.com',
+    'criteo.com',
+    'criteo.net',
+    'adnxs.com',
+    'taboola.com',
+    'outbrain.com',
+    'hotjar.com',
+    'mc.yandex.ru',
+    'top-fwz1.mail.ru'
+]
+
+# Средний размер ресурса по типу для оценки сэкономленного трафика (байт)
+ESTIMATED_SIZES = {
+    'image': 40 * 1024,
+    'media': 500 * 1024,
+    'font': 50 * 1024,
+    'stylesheet': 30 * 1024,
+    'script': 60 * 1024,
+}
+
+
+class BlockingPolicy:
+    """
+    Правила блокировки запросов по типу ресурса, домену и шаблону URL
+
+    Считает заблокированные запросы и оценку сэкономленного трафика
+    для каждой страницы отдельно и в сумме.
+    """
+
+    def __init__(self, resource_types: Iterable[str] = ('image', 'media', 'font'),
+                 domains: Iterable[str] = AD_TRACKER_DOMAINS,
+                 url_patterns: Iterable[str] = (),
+                 estimated_sizes: Optional[Dict[str, int]] = None):
+        """
+        Инициализация политики
+
+        Args:
+            resource_types: Типы ресурсов Playwright ('image', 'media', 'font',
+                'stylesheet', 'script' ...)
+            domains: Домены, запросы к которым блокируются (с поддоменами)
+            url_patterns: Шаблоны URL в стиле fnmatch, например '*/ads/*'
+            estimated_sizes: Оценка размера ресурса по типу в байтах
+        """
+        self.resource_types = set(resource_types)
+        self.domains = tuple(domain.lower().lstrip('.') for domain in domains)
+        self.url_patterns = [re.compile(translate(pattern)) for pattern in url_patterns]
+        self.estimated_sizes = estimated_sizes or ESTIMATED_SIZES
+        self.totals = self._empty_stats()
+        self._page_stats: Dict[Any, Dict[str, Any]] = {}
+
+    @staticmethod
+    def _empty_stats() -> Dict[str, Any]:
+        """Пустая статистика блокировок"""
+        return {'blocked': 0, 'bytes_saved': 0, 'by_reason': {}}
+
+    def _match_domain(self, url: str) -> bool:
+        """Относится ли URL к одному из блокируемых доменов"""
+        host = (urlsplit(url).hostname or '').lower()
+        return any(host == domain or host.endswith('.' + domain) for domain in self.domains)
+
+    def reason(self, url: str, resource_type: str) -> Optional[str]:
+        """
+        Причина блокировки запроса
+
+        Args:
+            url: URL запроса
+            resource_type: Тип ресурса Playwright
+
+        Returns:
+            'type', 'domain', 'pattern' или None, если запрос разрешен
+        """
+        if resource_type in self.resource_types:
+            return 'type'
+        if self.domains and self._match_domain(url):
+            return 'domain'
+        if any(pattern.match(url) for pattern in self.url_patterns):
+            return 'pattern'
+        return None
+
+    def _record(self, page: Any, resource_type: str, reason: str):
+        """Учет заблокированного запроса"""
+        size = self.estimated_sizes.get(resource_type, 5 * 1024)
+        targets = [self.totals]
+        if page is not None:
+            targets.append(self._page_stats.setdefault(page, self._empty_stats()))
+        for stats in targets:
+            stats['blocked'] += 1
+            stats['bytes_saved'] += size
+            stats['by_reason'][reason] = stats['by_reason'].get(reason, 0) + 1
+
+    def pop_stats(self, page: Any) -> Dict[str, Any]:
+        """
+        Статистика блокировок страницы с обнулением
+
+        Args:
+            page: Страница Playwright
+
+        Returns:
+            blocked - число запросов, bytes_saved - оценка трафика,
+            by_reason - разбивка по причинам
+        """
+        return self._page_stats.pop(page, None) or self._empty_stats()
+
+    async def handle_route(self, route: Any) -> bool:
+        """
+        Блокировка запроса, если он подпадает под правила
+
+        Args:
+            route: Маршрут Playwright
+
+        Returns:
+            True если запрос заблокирован
+        """
+        request = route.request
+        reason = self.reason(request.url, request.resource_type)
+        if not reason:
+            return False
+
+        try:
+            page = request.frame.page
+        except Exception:
+            # Запросы service worker не привязаны к странице
+            page = None
+
+        self._record(page, request.resource_type, reason)
+        await route.abort('blockedbyclient')
+        return True
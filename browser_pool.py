@@ -0,0 +1,227 @@
+"""
+Пул прогретых контекстов и страниц Playwright
+Заголовки, viewport и маршруты настраиваются один раз на контекст
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from playwright.async_api import Browser, BrowserContext, Page
+
+logger = logging.getLogger(__name__)
+
+
+class PooledPage:
+    """
+    Страница пула вместе с ее контекстом и счетчиком навигаций
+    """
+
+    def __init__(self, context: 'BrowserContext', page: 'Page'):
+        self.navigations = 0
+        self.attach(context, page)
+
+    def attach(self, context: 'BrowserContext', page: 'Page'):
+        """Привязка нового контекста и страницы (счетчик навигаций сохраняется)"""
+        self.context = context
+        self.page = page
+        self.crashed = False
+        page.on('crash', self._on_crash)
+
+    def _on_crash(self, *_):
+        """Обработчик падения процесса рендеринга страницы"""
+        self.crashed = True
+        logger.warning("Страница пула упала и будет пересоздана")
+
+    def is_usable(self, max_navigations: int) -> bool:
+        """
+        Проверка, можно ли отдать страницу следующему потребителю
+
+        Args:
+            max_navigations: Лимит навигаций до пересоздания
+
+        Returns:
+            True если страница жива и не исчерпала лимит
+        """
+        return (
+            not self.crashed
+            and not self.page.is_closed()
+            and self.navigations < max_navigations
+        )
+
+    async def close(self):
+        """Закрытие контекста вместе со страницей"""
+        try:
+            await self.context.close()
+        except Exception as e:
+            logger.debug(f"Ошибка закрытия контекста: {e}")
+
+
+class PagePool:
+    """
+    Пул контекстов браузера с одной страницей на контекст
+
+    Контексты создаются заранее, переиспользуются между вызовами parse()
+    и пересоздаются после max_navigations навигаций или при падении страницы.
+    """
+
+    def __init__(self, browser: 'Browser', size: int = 1, max_navigations: int = 50,
+                 context_options: Optional[Callable[[], Dict[str, Any]]] = None,
+                 setup_context: Optional[Callable[['BrowserContext'], Awaitable[None]]] = None):
+        """
+        Инициализация пула
+
+        Args:
+            browser: Браузер Playwright
+            size: Количество контекстов в пуле
+            max_navigations: Навигаций на страницу до ее пересоздания
+            context_options: Фабрика параметров browser.new_context
+            setup_context: Корутина разовой настройки нового контекста
+        """
+        if size < 1:
+            raise ValueError("Размер пула должен быть не меньше 1")
+
+        self.browser = browser
+        self.size = size
+        self.max_navigations = max_navigations
+        self.context_options = context_options or dict
+        self.setup_context = setup_context
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._slots: List[PooledPage] = []
+        self._creating = 0
+        self._closed = False
+
+    async def _new_context(self) -> 'Page':
+        """Создание и настройка нового контекста со страницей"""
+        context = await self.browser.new_context(**self.context_options())
+        try:
+            if self.setup_context:
+                await self.setup_context(context)
+            return await context.new_page()
+        except Exception:
+            await context.close()
+            raise
+
+    async def _create_slot(self) -> PooledPage:
+        """Создание слота пула с новым контекстом"""
+        self._creating += 1
+        try:
+            page = await self._new_context()
+        finally:
+            self._creating -= 1
+
+        slot = PooledPage(page.context, page)
+        self._slots.append(slot)
+        return slot
+
+    def _has_capacity(self) -> bool:
+        """Можно ли создать еще один контекст без превышения размера пула"""
+        return len(self._slots) + self._creating < self.size
+
+    async def start(self):
+        """Прогрев пула: создание всех контекстов заранее"""
+        while self._has_capacity():
+            self._idle.put_nowait(await self._create_slot())
+        logger.info(f"Пул страниц прогрет: {self.size}")
+
+    def ensure_size(self, size: int):
+        """
+        Увеличение размера пула (новые контексты создаются по требованию)
+
+        Args:
+            size: Минимальный требуемый размер пула
+        """
+        self.size = max(self.size, size)
+
+    async def _replace(self, slot: PooledPage) -> PooledPage:
+        """Пересоздание исчерпанной или упавшей страницы"""
+        self._slots.remove(slot)
+        await slot.close()
+        return await self._create_slot()
+
+    async def acquire(self) -> PooledPage:
+        """
+        Получение свободной страницы (ожидает, если все заняты)
+
+        Returns:
+            Страница пула
+        """
+        if self._closed:
+            raise RuntimeError("Пул страниц закрыт")
+
+        if self._idle.empty() and self._has_capacity():
+            slot = await self._create_slot()
+        else:
+            slot = await self._idle.get()
+            if slot is None:
+                # Место освободилось после неудачного пересоздания
+                slot = await self._create_slot()
+
+        if not slot.is_usable(self.max_navigations):
+            slot = await self._replace(slot)
+
+        slot.navigations += 1
+        return slot
+
+    async def release(self, slot: PooledPage):
+        """
+        Возврат страницы в пул
+
+        Args:
+            slot: Страница, полученная через acquire
+        """
+        if self._closed:
+            await slot.close()
+            return
+
+        if not slot.is_usable(self.max_navigations):
+            try:
+                slot = await self._replace(slot)
+            except Exception as e:
+                logger.error(f"Не удалось пересоздать страницу пула: {e}")
+                # Будим ожидающего потребителя, чтобы он создал страницу сам
+                self._idle.put_nowait(None)
+                return
+
+        self._idle.put_nowait(slot)
+
+    async def renew(self, page: 'Page') -> 'Page':
+        """
+        Замена контекста занятой страницы новым: без cookies, localStorage
+        и скриптов инициализации, добавленных после setup_context
+
+        Args:
+            page: Страница, полученная через page() или acquire
+
+        Returns:
+            Новая страница, которая вернется в пул вместо старой
+        """
+        slot = next(slot for slot in self._slots if slot.page is page)
+        await slot.close()
+        # Если новый контекст не создался, закрытая страница пересоздается при release
+        page = await self._new_context()
+        slot.attach(page.context, page)
+        return page
+
+    @asynccontextmanager
+    async def page(self):
+        """
+        Асинхронный контекстный менеджер для работы со страницей пула
+
+        Yields:
+            Страница Playwright
+        """
+        slot = await self.acquire()
+        try:
+            yield slot.page
+        finally:
+            await self.release(slot)
+
+    async def close(self):
+        """Закрытие всех контекстов пула"""
+        self._closed = True
+        slots, self._slots = self._slots, []
+        for slot in slots:
+            await slot.close()
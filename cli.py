@@ -0,0 +1,197 @@
+"""
+Единая точка входа: парсинг, экспорт и отчет из командной строки
+Тяжелые модули (Playwright, pandas) импортируются только командами,
+которым они нужны
+
+Примеры:
+    python cli.py parse https://www.amazon.com/s?k=shoes --site amazon -o shoes.jsonl
+    python cli.py export https://www.amazon.com/s?k=shoes -o shoes.csv
+    python cli.py report --no-summary
+    python cli.py daemon start --pool-size 4
+"""
+
+import argparse
+import logging
+import sys
+from typing import List, Optional
+
+from sites import SITES, parser_class
+
+
+async def _parse(args: argparse.Namespace) -> int:
+    """Парсинг URL через планировщик с записью товаров в JSON lines"""
+    import json
+
+    from rate_limiter import RateLimiter
+    from scheduler import CrawlScheduler
+
+    options = {'headless': not args.show_browser, 'backend': args.backend}
+    if args.max_products is not None:
+        options['max_products'] = args.max_products or None
+    if args.rate is not None:
+        options['rate_limiter'] = RateLimiter(args.rate, args.burst) if args.rate > 0 else False
+    if args.browser_endpoint:
+        options['browser_endpoint'] = args.browser_endpoint
+    if args.sessions:
+        from session_store import SessionStore
+
+        options['sessions'] = SessionStore(args.sessions)
+
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    crawled = []
+    products = 0
+    try:
+        async with parser_class(args.site)(**options) as parser:
+            scheduler = CrawlScheduler(parser, concurrency=args.concurrency)
+            async for result in scheduler.run(args.urls):
+                if not result.ok:
+                    continue
+                crawled.append((result.url, result.products))
+                products += len(result.products)
+                for product in result.products:
+                    output.write(json.dumps(dict(product, url=result.url), ensure_ascii=False) + '\n')
+                output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    if args.database:
+        from product_store import save_products
+
+        save_products(crawled, args.database)
+
+    print(f"✅ Страниц: {len(crawled)}/{len(args.urls)}, товаров: {products}", file=sys.stderr)
+    for letter in scheduler.dead_letters:
+        print(f"❌ {letter.url}: {letter.error}", file=sys.stderr)
+    return 1 if scheduler.dead_letters else 0
+
+
+def cmd_parse(args: argparse.Namespace) -> int:
+    """Команда parse"""
+    import asyncio
+
+    return asyncio.run(_parse(args))
+
+
+def cmd_export(args: argparse.Namespace) -> int:
+    """Команда export"""
+    import asyncio
+
+    from export_to_excel import parse_multiple_urls
+
+    filename = asyncio.run(parse_multiple_urls(args.urls, args.output, args.concurrency, args.format,
+                                               database=args.database))
+    return 0 if filename else 1
+
+
+def cmd_report(args: argparse.Namespace) -> int:
+    """Команда report"""
+    from final_report import main as report
+
+    report(args.database, summary=not args.no_summary)
+    return 0
+
+
+def cmd_daemon(args: argparse.Namespace) -> int:
+    """Команда daemon: запуск, состояние и остановка демона парсера"""
+    from parser_daemon import DaemonClient, DaemonError, ParserDaemon
+
+    if args.action == 'start':
+        import asyncio
+
+        options = {}
+        if args.browser_endpoint:
+            options['browser_endpoint'] = args.browser_endpoint
+        if args.sessions:
+            from session_store import SessionStore
+
+            options['sessions'] = SessionStore(args.sessions)
+        asyncio.run(ParserDaemon(args.socket, pool_size=args.pool_size, idle_timeout=args.idle_timeout,
+                                 parser_options=options).serve())
+        return 0
+
+    client = DaemonClient(args.socket, timeout=10.0)
+    try:
+        if args.action == 'stop':
+            client.shutdown()
+            print("✅ Демон остановлен")
+            return 0
+        status = client.call('ping')
+        parsers = client.call('stats')['parsers']
+    except DaemonError as e:
+        print(f"❌ {e}")
+        return 1
+
+    print(f"✅ Демон работает: PID {status['pid']}, {status['uptime']:.0f} с, запросов: {status['requests']}")
+    for parser in parsers:
+        print(f"   • {parser['site']} (headless={parser['headless']}, {parser['backend']}): "
+              f"{parser['parses']} страниц, ошибок: {parser['errors']}")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Разбор аргументов командной строки"""
+    parser = argparse.ArgumentParser(prog='cli.py', description="Парсер товаров: парсинг, экспорт, отчеты и демон")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Подробный лог (DEBUG)")
+    parser.add_argument('-q', '--quiet', action='store_true', help="Только предупреждения и ошибки")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    parse = commands.add_parser('parse', help="Парсинг страниц в JSON lines")
+    parse.add_argument('urls', nargs='+', help="URL страниц со списком товаров")
+    parse.add_argument('--site', choices=sorted(SITES), default='generic', help="Парсер сайта")
+    parse.add_argument('--backend', choices=['browser', 'static', 'auto'], default='browser',
+                       help="Способ загрузки страниц")
+    parse.add_argument('-o', '--output', help="Файл JSON lines (по умолчанию stdout)")
+    parse.add_argument('--concurrency', type=int, default=4, help="Одновременно загружаемых страниц")
+    parse.add_argument('--max-products', type=int, help="Товаров со страницы (0 - все)")
+    parse.add_argument('--rate', type=float, help="Запросов в секунду на домен (0 - без ограничения)")
+    parse.add_argument('--burst', type=int, default=1, help="Запросов подряд без ожидания")
+    parse.add_argument('--database', help="Сохранить товары в базу SQLite")
+    parse.add_argument('--show-browser', action='store_true', help="Запускать браузер в видимом режиме")
+    parse.add_argument('--browser-endpoint', help="Подключиться к запущенному Chromium (CDP или сервер Playwright)")
+    parse.add_argument('--sessions', metavar='DIR', help="Сохранять и загружать cookies по доменам из папки")
+    parse.set_defaults(handler=cmd_parse)
+
+    export = commands.add_parser('export', help="Парсинг Amazon и экспорт в один файл")
+    export.add_argument('urls', nargs='+', help="URL страниц со списком товаров")
+    export.add_argument('-o', '--output', help="Имя файла (по умолчанию с датой и временем)")
+    export.add_argument('--format', choices=['xlsx', 'csv', 'jsonl', 'parquet'],
+                        help="Формат (по умолчанию по расширению файла, иначе xlsx)")
+    export.add_argument('--concurrency', type=int, default=3, help="Одновременно загружаемых страниц")
+    export.add_argument('--database', help="Сохранить товары в базу SQLite")
+    export.set_defaults(handler=cmd_export)
+
+    report = commands.add_parser('report', help="Итоговый отчет по базе товаров или Excel файлам")
+    report.add_argument('--database', default='products.sqlite', help="База товаров")
+    report.add_argument('--no-summary', action='store_true', help="Без сводного Excel файла")
+    report.set_defaults(handler=cmd_report)
+
+    daemon = commands.add_parser('daemon', help="Демон с запущенными браузерами для parse_products")
+    daemon.add_argument('action', choices=['start', 'status', 'stop'], help="Действие")
+    daemon.add_argument('--socket', help="Путь к Unix сокету (по умолчанию $PARSER_DAEMON_SOCKET, $XDG_RUNTIME_DIR или /tmp)")
+    daemon.add_argument('--pool-size', type=int, default=4, help="Прогретых страниц в каждом парсере")
+    daemon.add_argument('--idle-timeout', type=float, help="Завершение после стольких секунд без запросов")
+    daemon.add_argument('--browser-endpoint', help="Подключиться к запущенному Chromium (CDP или сервер Playwright)")
+    daemon.add_argument('--sessions', metavar='DIR', help="Сохранять и загружать cookies по доменам из папки")
+    daemon.set_defaults(handler=cmd_daemon)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Запуск команды
+
+    Args:
+        argv: Аргументы (по умолчанию sys.argv[1:])
+
+    Returns:
+        Код завершения процесса
+    """
+    args = build_parser().parse_args(argv)
+    level = logging.DEBUG if args.verbose else logging.WARNING if args.quiet else logging.INFO
+    logging.basicConfig(level=level)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
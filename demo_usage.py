@@ -4,6 +4,7 @@
 
 from product_parser import parse_products
 import asyncio
+import logging
 from product_parser import ProductParser
 
 
@@ -153,6 +154,8 @@ class MySiteParser(ProductParser):
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    
     print("🚀 Демонстрация парсера товаров")
     print("=" * 50)
     
@@ -4,6 +4,7 @@
 
 from product_parser import ProductParser, parse_products
 import asyncio
+import logging
 
 
 async def example_async_usage():
@@ -94,6 +95,8 @@ def example_custom_selectors():
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    
     print("Выберите пример:")
     print("1. Синхронное использование")
     print("2. Асинхронное использование") 
@@ -2,29 +2,34 @@
 Улучшенный экспорт данных парсера в Excel
 """
 
-import pandas as pd
 from amazon_advanced import AdvancedAmazonParser
+from exporters import export_products, export_filename
 import asyncio
 import logging
 from datetime import datetime
 import os
 
-# Настройка логирования
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-async def parse_and_export_improved(url: str, filename: str = None):
+async def parse_and_export_improved(url: str, filename: str = None, format: str = None,
+                                    database: str = None):
     """
     Улучшенный парсинг и экспорт в Excel
+    
+    Args:
+        url: URL для парсинга
+        filename: Имя файла (опционально)
+        format: Формат: 'xlsx', 'csv', 'jsonl' или 'parquet'
+            (по умолчанию по расширению файла, иначе xlsx)
+        database: База товаров для истории цен (None - не сохранять)
     """
     
     if not filename:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"amazon_products_improved_{timestamp}.xlsx"
+        filename = export_filename("amazon_products_improved", format or 'xlsx')
     
     print(f"🚀 Улучшенный парсинг: {url}")
-    print(f"📊 Экспорт в Excel: {filename}")
+    print(f"📊 Экспорт в файл: {filename}")
     print("=" * 60)
     
     try:
@@ -38,89 +43,50 @@ async def parse_and_export_improved(url: str, filename: str = None):
         
         print(f"✅ Найдено товаров: {len(products)}")
         
-        # Создаем DataFrame
-        df = pd.DataFrame(products)
-        
-        # Добавляем дополнительные колонки
-        df['Дата парсинга'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        df['URL источника'] = url
-        df['Номер'] = range(1, len(df) + 1)
-        
-        # Переупорядочиваем колонки
-        columns_order = ['Номер', 'id', 'name', 'price', 'Дата парсинга', 'URL источника']
-        df = df[columns_order]
+        # История цен копится в базе товаров, если она указана
+        if database:
+            from product_store import save_products
+            
+            save_products([(url, products)], database)
         
-        # Переименовываем колонки
-        df.columns = ['№', 'ID товара', 'Название товара', 'Цена', 'Дата парсинга', 'URL источника']
+        parsed_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
-        # Создаем Excel файл с форматированием
-        with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-            # Основной лист с данными
-            df.to_excel(writer, sheet_name='Товары Amazon', index=False)
-            
-            # Получаем объект workbook и worksheet
-            workbook = writer.book
-            worksheet = writer.sheets['Товары Amazon']
-            
-            # Настройка ширины колонок
-            column_widths = {
-                'A': 8,   # №
-                'B': 15,  # ID товара
-                'C': 80,  # Название товара
-                'D': 20,  # Цена
-                'E': 20,  # Дата парсинга
-                'F': 40   # URL источника
-            }
-            
-            for col, width in column_widths.items():
-                worksheet.column_dimensions[col].width = width
-            
-            # Создаем лист со статистикой
-            stats_data = {
-                'Параметр': [
-                    'Общее количество товаров',
-                    'Товары с указанной ценой',
-                    'Товары без цены',
-                    'Дата парсинга',
-                    'URL источника',
-                    'Время выполнения'
-                ],
-                'Значение': [
-                    len(products),
-                    len([p for p in products if p['price'] != 'Цена не указана']),
-                    len([p for p in products if p['price'] == 'Цена не указана']),
-                    datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    url,
-                    f"~{len(products) * 3} секунд"
-                ]
-            }
-            
-            stats_df = pd.DataFrame(stats_data)
-            stats_df.to_excel(writer, sheet_name='Статистика', index=False)
-            
-            # Форматируем лист статистики
-            stats_worksheet = writer.sheets['Статистика']
-            stats_worksheet.column_dimensions['A'].width = 30
-            stats_worksheet.column_dimensions['B'].width = 40
-            
-            # Создаем лист с примерами товаров
-            if len(products) > 0:
-                examples_df = df.head(5).copy()
-                examples_df.to_excel(writer, sheet_name='Примеры товаров', index=False)
-                
-                # Форматируем лист примеров
-                examples_worksheet = writer.sheets['Примеры товаров']
-                for col, width in column_widths.items():
-                    examples_worksheet.column_dimensions[col].width = width
+        # Создаем Excel файл построчно: товары, статистика, первые 5 товаров
+        stats = export_products(
+            filename,
+            products,
+            columns=[
+                ('№', 8, 'int'),
+                ('ID товара', 15),
+                ('Название товара', 80),
+                ('Цена', 20),
+                ('Дата парсинга', 20),
+                ('URL источника', 40)
+            ],
+            row=lambda number, product: [
+                number, product['id'], product['name'], product['price'], parsed_at, url
+            ],
+            sheet_name='Товары Amazon',
+            stats=lambda stats: [
+                ('Общее количество товаров', stats.total),
+                ('Товары с указанной ценой', stats.with_price),
+                ('Товары без цены', stats.without_price),
+                ('Дата парсинга', parsed_at),
+                ('URL источника', url),
+                ('Время выполнения', f"~{stats.total * 3} секунд")
+            ],
+            examples=5,
+            format=format
+        )
         
         print(f"✅ Данные успешно экспортированы в: {filename}")
         print(f"📁 Полный путь: {os.path.abspath(filename)}")
         
         # Показываем статистику
         print("\n📊 Статистика:")
-        print(f"   • Всего товаров: {len(products)}")
-        print(f"   • С ценой: {len([p for p in products if p['price'] != 'Цена не указана'])}")
-        print(f"   • Без цены: {len([p for p in products if p['price'] == 'Цена не указана'])}")
+        print(f"   • Всего товаров: {stats.total}")
+        print(f"   • С ценой: {stats.with_price}")
+        print(f"   • Без цены: {stats.without_price}")
         
         # Показываем все товары
         print("\n🔍 Все товары:")
@@ -164,4 +130,5 @@ def main():
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     main()
@@ -2,33 +2,36 @@
 Экспорт данных парсера в Excel таблицу
 """
 
-import pandas as pd
 from amazon_advanced import AdvancedAmazonParser
+from exporters import ExportStats, export_filename, export_products, get_exporter
+from records import ProductRecord
+from scheduler import CrawlScheduler
 import asyncio
 import logging
 from datetime import datetime
 import os
 
-# Настройка логирования
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-async def parse_and_export_to_excel(url: str, filename: str = None):
+async def parse_and_export_to_excel(url: str, filename: str = None, format: str = None,
+                                    database: str = None):
     """
     Парсинг товаров и экспорт в Excel
     
     Args:
         url: URL для парсинга
         filename: Имя файла Excel (опционально)
+        format: Формат: 'xlsx', 'csv', 'jsonl' или 'parquet'
+            (по умолчанию по расширению файла, иначе xlsx)
+        database: База товаров для истории цен (None - не сохранять)
     """
     
     if not filename:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"amazon_products_{timestamp}.xlsx"
+        filename = export_filename("amazon_products", format or 'xlsx')
     
     print(f"🚀 Парсинг товаров с: {url}")
-    print(f"📊 Экспорт в Excel: {filename}")
+    print(f"📊 Экспорт в файл: {filename}")
     print("=" * 60)
     
     try:
@@ -42,79 +45,48 @@ async def parse_and_export_to_excel(url: str, filename: str = None):
         
         print(f"✅ Найдено товаров: {len(products)}")
         
-        # Создаем DataFrame
-        df = pd.DataFrame(products)
-        
-        # Добавляем дополнительные колонки
-        df['Дата парсинга'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        df['URL источника'] = url
-        df['Номер'] = range(1, len(df) + 1)
-        
-        # Переупорядочиваем колонки
-        columns_order = ['Номер', 'id', 'name', 'price', 'Дата парсинга', 'URL источника']
-        df = df[columns_order]
+        # История цен копится в базе товаров, если она указана
+        if database:
+            from product_store import save_products
+            
+            save_products([(url, products)], database)
         
-        # Переименовываем колонки для красоты
-        df.columns = ['№', 'ID товара', 'Название товара', 'Цена', 'Дата парсинга', 'URL источника']
+        parsed_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
-        # Создаем Excel файл с форматированием
-        with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-            # Основной лист с данными
-            df.to_excel(writer, sheet_name='Товары', index=False)
-            
-            # Получаем объект workbook и worksheet для форматирования
-            workbook = writer.book
-            worksheet = writer.sheets['Товары']
-            
-            # Настройка ширины колонок
-            column_widths = {
-                'A': 8,   # №
-                'B': 15,  # ID товара
-                'C': 60,  # Название товара
-                'D': 15,  # Цена
-                'E': 20,  # Дата парсинга
-                'F': 30   # URL источника
-            }
-            
-            for col, width in column_widths.items():
-                worksheet.column_dimensions[col].width = width
-            
-            # Создаем лист со статистикой
-            stats_data = {
-                'Параметр': [
-                    'Общее количество товаров',
-                    'Товары с указанной ценой',
-                    'Товары без цены',
-                    'Дата парсинга',
-                    'URL источника',
-                    'Время выполнения'
-                ],
-                'Значение': [
-                    len(products),
-                    len([p for p in products if p['price'] != 'Цена не указана']),
-                    len([p for p in products if p['price'] == 'Цена не указана']),
-                    datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    url,
-                    f"~{len(products) * 2} секунд"
-                ]
-            }
-            
-            stats_df = pd.DataFrame(stats_data)
-            stats_df.to_excel(writer, sheet_name='Статистика', index=False)
-            
-            # Форматируем лист статистики
-            stats_worksheet = writer.sheets['Статистика']
-            stats_worksheet.column_dimensions['A'].width = 30
-            stats_worksheet.column_dimensions['B'].width = 40
+        # Создаем Excel файл построчно: лист товаров и лист статистики
+        stats = export_products(
+            filename,
+            products,
+            columns=[
+                ('№', 8, 'int'),
+                ('ID товара', 15),
+                ('Название товара', 60),
+                ('Цена', 15),
+                ('Дата парсинга', 20),
+                ('URL источника', 30)
+            ],
+            row=lambda number, product: [
+                number, product['id'], product['name'], product['price'], parsed_at, url
+            ],
+            stats=lambda stats: [
+                ('Общее количество товаров', stats.total),
+                ('Товары с указанной ценой', stats.with_price),
+                ('Товары без цены', stats.without_price),
+                ('Дата парсинга', parsed_at),
+                ('URL источника', url),
+                ('Время выполнения', f"~{stats.total * 2} секунд")
+            ],
+            format=format
+        )
         
         print(f"✅ Данные успешно экспортированы в: {filename}")
         print(f"📁 Полный путь: {os.path.abspath(filename)}")
         
         # Показываем статистику
         print("\n📊 Статистика:")
-        print(f"   • Всего товаров: {len(products)}")
-        print(f"   • С ценой: {len([p for p in products if p['price'] != 'Цена не указана'])}")
-        print(f"   • Без цены: {len([p for p in products if p['price'] == 'Цена не указана'])}")
+        print(f"   • Всего товаров: {stats.total}")
+        print(f"   • С ценой: {stats.with_price}")
+        print(f"   • Без цены: {stats.without_price}")
         
         # Показываем первые 5 товаров
         print("\n🔍 Первые 5 товаров:")
@@ -128,82 +100,106 @@ async def parse_and_export_to_excel(url: str, filename: str = None):
         return None
 
 
-async def parse_multiple_urls(urls: list, base_filename: str = None):
+async def parse_multiple_urls(urls: list, base_filename: str = None, concurrency: int = 3,
+                              format: str = None, database: str = None):
     """
     Парсинг нескольких URL и экспорт в один Excel файл
     
     Args:
         urls: Список URL для парсинга
         base_filename: Базовое имя файла
+        concurrency: Количество страниц, загружаемых одновременно
+        format: Формат: 'xlsx', 'csv', 'jsonl' или 'parquet'
+            (по умолчанию по расширению файла, иначе xlsx)
+        database: База товаров для истории цен (None - не сохранять)
     """
     
     if not base_filename:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        base_filename = f"amazon_products_multiple_{timestamp}.xlsx"
+        base_filename = export_filename("amazon_products_multiple", format or 'xlsx')
+    exporter_class = get_exporter(format or os.path.splitext(base_filename)[1] or 'xlsx')
+    existed = os.path.exists(base_filename)
     
-    print(f"🚀 Парсинг {len(urls)} URL")
-    print(f"📊 Экспорт в Excel: {base_filename}")
+    print(f"🚀 Парсинг {len(urls)} URL (параллельно: {concurrency})")
+    print(f"📊 Экспорт в файл: {base_filename}")
     print("=" * 60)
     
-    all_products = []
+    parsed_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    stats = ExportStats()
+    
+    # Готовые результаты, которые ждут записи предыдущих по порядку URL
+    pending = {}
+    next_index = 0
+    # Успешные обходы для базы товаров
+    crawled = []
+    
+    def flush(exporter):
+        """Запись готовых результатов в порядке входного списка"""
+        nonlocal next_index
+        while next_index in pending:
+            for product in pending.pop(next_index):
+                stats.add(product)
+                exporter.write_row([
+                    stats.total, product['id'], product['name'], product['price'],
+                    product.category, product.url, parsed_at
+                ])
+            next_index += 1
     
     try:
-        async with AdvancedAmazonParser(headless=True) as parser:
-            for i, url in enumerate(urls, 1):
-                print(f"\n📦 Парсинг {i}/{len(urls)}: {url}")
-                
-                try:
-                    products = await parser.parse(url)
-                    if products:
-                        # Добавляем информацию об источнике
-                        for product in products:
-                            product['URL источника'] = url
-                            product['Категория'] = f"Категория {i}"
-                        
-                        all_products.extend(products)
-                        print(f"   ✅ Найдено: {len(products)} товаров")
+        columns = [
+            ('№', 8, 'int'),
+            ('ID товара', 15),
+            ('Название товара', 60),
+            ('Цена', 15),
+            ('Категория', 20),
+            ('URL источника', 30),
+            ('Дата парсинга', 20)
+        ]
+        
+        with exporter_class(base_filename, columns, 'Все товары') as exporter:
+            async with AdvancedAmazonParser(headless=True) as parser:
+                # Временные ошибки повторяются, заблокированный домен ставится на паузу
+                scheduler = CrawlScheduler(parser, concurrency=concurrency)
+                async for result in scheduler.run(urls):
+                    i = result.index + 1
+                    print(f"\n📦 Готово {i}/{len(urls)}: {result.url}")
+                    
+                    products = []
+                    if not result.ok:
+                        print(f"   ❌ Ошибка (попыток: {result.attempts}): {result.error}")
+                    elif result.products:
+                        # Источник и категория - общие строки для всех товаров страницы
+                        products = [
+                            ProductRecord.from_dict(product, url=result.url, category=f"Категория {i}")
+                            for product in result.products
+                        ]
+                        crawled.append((result.url, result.products))
+                        print(f"   ✅ Найдено: {len(result.products)} товаров")
                     else:
                         print(f"   ❌ Товары не найдены")
-                        
-                except Exception as e:
-                    print(f"   ❌ Ошибка: {e}")
-                    continue
-        
-        if not all_products:
-            print("❌ Товары не найдены ни на одном URL")
-            return None
-        
-        # Создаем DataFrame
-        df = pd.DataFrame(all_products)
+                    
+                    pending[result.index] = products
+                    flush(exporter)
         
-        # Добавляем дополнительные колонки
-        df['Дата парсинга'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        df['Номер'] = range(1, len(df) + 1)
-        
-        # Переупорядочиваем колонки
-        columns_order = ['Номер', 'id', 'name', 'price', 'Категория', 'URL источника', 'Дата парсинга']
-        df = df[columns_order]
+        # Все страницы - одной транзакцией
+        if database:
+            from product_store import save_products
+            
+            save_products(crawled, database)
         
-        # Переименовываем колонки
-        df.columns = ['№', 'ID товара', 'Название товара', 'Цена', 'Категория', 'URL источника', 'Дата парсинга']
+        if scheduler.dead_letters:
+            print(f"\n⚠️ Не обработано URL: {len(scheduler.dead_letters)} (повторов: {scheduler.retries})")
+            for letter in scheduler.dead_letters:
+                print(f"   • {letter.url} ({letter.reason}): {letter.error}")
         
-        # Создаем Excel файл
-        with pd.ExcelWriter(base_filename, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Все товары', index=False)
-            
-            # Форматируем
-            worksheet = writer.sheets['Все товары']
-            worksheet.column_dimensions['A'].width = 8   # №
-            worksheet.column_dimensions['B'].width = 15  # ID товара
-            worksheet.column_dimensions['C'].width = 60  # Название товара
-            worksheet.column_dimensions['D'].width = 15  # Цена
-            worksheet.column_dimensions['E'].width = 20  # Категория
-            worksheet.column_dimensions['F'].width = 30  # URL источника
-            worksheet.column_dimensions['G'].width = 20  # Дата парсинга
+        if not stats.total:
+            if not existed:
+                os.remove(base_filename)
+            print("❌ Товары не найдены ни на одном URL")
+            return None
         
         print(f"\n✅ Все данные экспортированы в: {base_filename}")
         print(f"📁 Полный путь: {os.path.abspath(base_filename)}")
-        print(f"📊 Всего товаров: {len(all_products)}")
+        print(f"📊 Всего товаров: {stats.total}")
         
         return base_filename
         
@@ -257,4 +253,5 @@ def main():
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     main()
@@ -0,0 +1,396 @@
+"""
+Потоковая запись результатов парсинга: Excel, CSV, JSONL, Parquet
+Строки пишутся в файл по мере поступления, без pandas и без полной модели книги
+"""
+
+import csv
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from prices import NO_PRICE
+
+logger = logging.getLogger(__name__)
+
+# Ширина колонок статистики
+STATS_COLUMNS = [('Параметр', 30), ('Значение', 40)]
+
+
+def _column_letter(index: int) -> str:
+    """Буква колонки Excel по номеру (с 1)"""
+    letters = ''
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+
+class ExportStats:
+    """
+    Статистика экспорта, считаемая по ходу записи
+
+    Хранит только счетчики, поэтому не зависит от числа товаров.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.with_price = 0
+
+    @property
+    def without_price(self) -> int:
+        """Товары без цены"""
+        return self.total - self.with_price
+
+    def add(self, product: Dict[str, Any]):
+        """
+        Учет записанного товара
+
+        Args:
+            product: Словарь товара
+        """
+        self.total += 1
+        if product.get('price') != NO_PRICE:
+            self.with_price += 1
+
+
+class ExcelStreamWriter:
+    """
+    Запись книги Excel в режиме openpyxl write_only
+
+    Каждый лист сбрасывается на диск по мере добавления строк, поэтому
+    память не растет с числом товаров. Ширины колонок задаются при
+    создании листа - в режиме write_only их нельзя поменять после записи.
+    """
+
+    def __init__(self, filename: str):
+        """
+        Инициализация
+
+        Args:
+            filename: Путь к файлу .xlsx
+        """
+        try:
+            from openpyxl import Workbook
+        except ImportError as e:
+            raise ImportError("Для экспорта в Excel нужен openpyxl: pip install openpyxl") from e
+
+        self.filename = filename
+        self.workbook = Workbook(write_only=True)
+        self.sheets: Dict[str, Any] = {}
+        self.rows: Dict[str, int] = {}
+        self._closed = False
+
+    def add_sheet(self, name: str, columns: Sequence[Tuple[str, int]]) -> Any:
+        """
+        Создание листа с заголовком и шириной колонок
+
+        Args:
+            name: Название листа
+            columns: Пары (заголовок, ширина)
+
+        Returns:
+            Лист openpyxl
+        """
+        sheet = self.workbook.create_sheet(name)
+        for i, (_, width) in enumerate(columns, 1):
+            sheet.column_dimensions[_column_letter(i)].width = width
+        sheet.append([title for title, _ in columns])
+        self.sheets[name] = sheet
+        self.rows[name] = 0
+        return sheet
+
+    def append(self, name: str, row: Iterable[Any]):
+        """
+        Добавление строки в лист
+
+        Args:
+            name: Название листа
+            row: Значения ячеек
+        """
+        self.sheets[name].append(list(row))
+        self.rows[name] += 1
+
+    def add_stats_sheet(self, rows: Sequence[Tuple[str, Any]], name: str = 'Статистика'):
+        """
+        Лист статистики 'Параметр' / 'Значение'
+
+        Args:
+            rows: Пары (параметр, значение)
+            name: Название листа
+        """
+        self.add_sheet(name, STATS_COLUMNS)
+        for row in rows:
+            self.append(name, row)
+
+    def close(self):
+        """Сохранение книги"""
+        if self._closed:
+            return
+        self._closed = True
+        self.workbook.save(self.filename)
+        logger.info(f"Excel файл сохранен: {self.filename} ({sum(self.rows.values())} строк)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # Книгу сохраняем и при ошибке, чтобы не терять уже записанные строки
+        self.close()
+
+
+class Exporter:
+    """
+    Базовый потоковый экспортер таблицы товаров
+
+    Колонки задаются парами (заголовок, ширина) или тройками
+    (заголовок, ширина, тип), тип - 'str', 'int' или 'float'.
+    Ширина используется только в Excel, тип - в Parquet.
+    """
+
+    extension = ''
+
+    def __init__(self, filename: str, columns: Sequence[Tuple], sheet_name: str = 'Товары'):
+        """
+        Инициализация
+
+        Args:
+            filename: Путь к файлу
+            columns: Описание колонок
+            sheet_name: Название листа (для форматов с листами)
+        """
+        self.filename = filename
+        self.columns = [tuple(column) for column in columns]
+        self.headers = [column[0] for column in self.columns]
+        self.sheet_name = sheet_name
+        self.rows = 0
+
+    def write_row(self, row: Sequence[Any]):
+        """
+        Запись строки
+
+        Args:
+            row: Значения в порядке колонок
+        """
+        raise NotImplementedError
+
+    def add_stats(self, rows: Sequence[Tuple[str, Any]]):
+        """Лист статистики (только для форматов с листами)"""
+
+    def add_examples(self, rows: Sequence[Sequence[Any]]):
+        """Лист примеров товаров (только для форматов с листами)"""
+
+    def close(self):
+        """Завершение записи"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # Файл закрываем и при ошибке, чтобы не терять уже записанные строки
+        self.close()
+
+
+class ExcelExporter(Exporter):
+    """Excel (.xlsx) через ExcelStreamWriter, с листами статистики и примеров"""
+
+    extension = 'xlsx'
+
+    def __init__(self, filename: str, columns: Sequence[Tuple], sheet_name: str = 'Товары'):
+        super().__init__(filename, columns, sheet_name)
+        self.writer = ExcelStreamWriter(filename)
+        self.writer.add_sheet(sheet_name, [column[:2] for column in self.columns])
+
+    def write_row(self, row: Sequence[Any]):
+        self.writer.append(self.sheet_name, row)
+        self.rows += 1
+
+    def add_stats(self, rows: Sequence[Tuple[str, Any]]):
+        self.writer.add_stats_sheet(rows)
+
+    def add_examples(self, rows: Sequence[Sequence[Any]]):
+        self.writer.add_sheet('Примеры товаров', [column[:2] for column in self.columns])
+        for row in rows:
+            self.writer.append('Примеры товаров', row)
+
+    def close(self):
+        self.writer.close()
+
+
+class CSVExporter(Exporter):
+    """CSV в UTF-8 с BOM (корректно открывается в Excel)"""
+
+    extension = 'csv'
+
+    def __init__(self, filename: str, columns: Sequence[Tuple], sheet_name: str = 'Товары'):
+        super().__init__(filename, columns, sheet_name)
+        self._file = open(filename, 'w', encoding='utf-8-sig', newline='')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(self.headers)
+
+    def write_row(self, row: Sequence[Any]):
+        self._writer.writerow(row)
+        self.rows += 1
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+class JSONLExporter(Exporter):
+    """
+    JSON Lines: один товар на строку
+
+    Файл открывается на дозапись, поэтому несколько запусков
+    накапливают товары в одном файле.
+    """
+
+    extension = 'jsonl'
+
+    def __init__(self, filename: str, columns: Sequence[Tuple], sheet_name: str = 'Товары'):
+        super().__init__(filename, columns, sheet_name)
+        self._file = open(filename, 'a', encoding='utf-8')
+
+    def write_row(self, row: Sequence[Any]):
+        self._file.write(json.dumps(dict(zip(self.headers, row)), ensure_ascii=False))
+        self._file.write('\n')
+        self.rows += 1
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+class ParquetExporter(Exporter):
+    """
+    Parquet с типизированными колонками и сжатием (pyarrow)
+
+    Строки копятся пачками по batch_size и пишутся отдельными row group.
+    """
+
+    extension = 'parquet'
+
+    def __init__(self, filename: str, columns: Sequence[Tuple], sheet_name: str = 'Товары',
+                 compression: str = 'zstd', batch_size: int = 10000):
+        super().__init__(filename, columns, sheet_name)
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Для экспорта в Parquet нужен pyarrow: pip install pyarrow") from e
+
+        types = {'str': pa.string(), 'int': pa.int64(), 'float': pa.float64()}
+        self._pa = pa
+        self.schema = pa.schema([
+            (column[0], types[column[2] if len(column) > 2 else 'str'])
+            for column in self.columns
+        ])
+        self.batch_size = batch_size
+        self._batch: List[List[Any]] = [[] for _ in self.columns]
+        self._writer = pq.ParquetWriter(filename, self.schema, compression=compression)
+
+    def write_row(self, row: Sequence[Any]):
+        for values, value in zip(self._batch, row):
+            values.append(value)
+        self.rows += 1
+        if len(self._batch[0]) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        """Запись накопленной пачки строк"""
+        if not self._batch[0]:
+            return
+        table = self._pa.Table.from_arrays(
+            [self._pa.array(values, type=field.type) for values, field in zip(self._batch, self.schema)],
+            schema=self.schema
+        )
+        self._writer.write_table(table)
+        self._batch = [[] for _ in self.columns]
+
+    def close(self):
+        if self._writer is None:
+            return
+        self._flush()
+        self._writer.close()
+        self._writer = None
+
+
+# Форматы экспорта по расширению файла
+EXPORTERS = {
+    exporter.extension: exporter
+    for exporter in (ExcelExporter, CSVExporter, JSONLExporter, ParquetExporter)
+}
+
+
+def get_exporter(format: str) -> type:
+    """
+    Класс экспортера по названию формата
+
+    Args:
+        format: 'xlsx', 'csv', 'jsonl' или 'parquet'
+
+    Returns:
+        Класс экспортера
+    """
+    exporter = EXPORTERS.get(format.lower().lstrip('.'))
+    if not exporter:
+        raise ValueError(f"Неизвестный формат экспорта: {format} (доступны: {', '.join(EXPORTERS)})")
+    return exporter
+
+
+def export_filename(prefix: str, format: str = 'xlsx') -> str:
+    """
+    Имя файла экспорта с отметкой времени
+
+    Args:
+        prefix: Начало имени файла
+        format: Формат экспорта
+
+    Returns:
+        Имя файла вида prefix_20240101_120000.xlsx
+    """
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return f"{prefix}_{timestamp}.{get_exporter(format).extension}"
+
+
+def export_products(filename: str, products: Iterable[Dict[str, Any]],
+                    columns: Sequence[Tuple], row: Any,
+                    sheet_name: str = 'Товары',
+                    stats: Optional[Any] = None,
+                    examples: int = 0,
+                    format: Optional[str] = None) -> ExportStats:
+    """
+    Потоковый экспорт товаров в выбранный формат
+
+    Args:
+        filename: Путь к файлу
+        products: Товары (список или генератор)
+        columns: Описание колонок (см. Exporter)
+        row: Функция (номер, товар) -> значения строки
+        sheet_name: Название листа товаров
+        stats: Функция ExportStats -> строки листа 'Статистика' (None - без листа)
+        examples: Сколько первых строк продублировать на лист 'Примеры товаров'
+        format: Формат экспорта (по умолчанию по расширению файла)
+
+    Returns:
+        Статистика записанных товаров
+    """
+    exporter_class = get_exporter(format or os.path.splitext(filename)[1] or 'xlsx')
+    export_stats = ExportStats()
+    example_rows: List[List[Any]] = []
+
+    with exporter_class(filename, columns, sheet_name) as exporter:
+        for number, product in enumerate(products, 1):
+            values = list(row(number, product))
+            exporter.write_row(values)
+            export_stats.add(product)
+            if len(example_rows) < examples:
+                example_rows.append(values)
+
+        if stats:
+            exporter.add_stats(stats(export_stats))
+        if example_rows:
+            exporter.add_examples(example_rows)
+
+    return export_stats
@@ -2,147 +2,179 @@
 Итоговый отчет по парсингу Amazon
 """
 
-import pandas as pd
 import os
 from datetime import datetime
+from typing import TYPE_CHECKING, Optional
 
-def analyze_excel_files():
+from prices import format_price, normalize_prices, price_stats, price_stats_by_currency
+from product_store import ProductStore
+
+if TYPE_CHECKING:
+    # pandas импортируется в функциях отчета: модуль загружается без него
+    import pandas as pd
+    from report_store import ReportStore
+
+# База товаров, которую пополняют скрипты экспорта
+DATABASE = 'products.sqlite'
+
+# Бренды для топа; название относится к первому совпавшему в этом порядке
+BRANDS = [
+    ('adidas', 'adidas'),
+    ('Nike', 'nike'),
+    ('Skechers', 'skechers'),
+    ('New Balance', 'new balance'),
+    ('Under Armour', 'under armour'),
+]
+
+
+def _column(df: 'pd.DataFrame', name: str) -> 'pd.Series':
+    """Колонка DataFrame или пустые строки, если ее нет"""
+    import pandas as pd
+    
+    if name in df.columns:
+        return df[name].fillna('').astype(str)
+    return pd.Series('', index=df.index, dtype=object)
+
+
+def brand_counts(names: 'pd.Series') -> 'pd.Series':
+    """
+    Количество товаров по брендам
+    
+    Args:
+        names: Колонка названий
+        
+    Returns:
+        Число товаров по бренду (по убыванию)
+    """
+    import numpy as np
+    import pandas as pd
+    
+    lowered = names.str.lower()
+    conditions = [lowered.str.contains(pattern, regex=False) for _, pattern in BRANDS]
+    brands = np.select(conditions, [brand for brand, _ in BRANDS], default='')
+    counts = pd.Series(brands)
+    return counts[counts != ''].value_counts()
+
+
+def _print_price_range(values: 'pd.Series', currencies: 'pd.Series'):
+    """Вывод диапазона и перцентилей цен отдельно по каждой валюте"""
+    groups = price_stats_by_currency(values, currencies)
+    for currency, stats in groups.items():
+        title = f" ({currency or 'валюта не указана'}, {stats['count']} товаров)" if len(groups) > 1 else ""
+        price = {key: format_price(value, currency) for key, value in stats.items() if key != 'count'}
+        print(f"\n💵 Диапазон цен{title}:")
+        print(f"   Минимальная: {price['min']}")
+        print(f"   Максимальная: {price['max']}")
+        print(f"   Средняя: {price['mean']}")
+        print(f"   Медиана: {price['p50']}")
+        print(f"   25-75%: {price['p25']} - {price['p75']}")
+        print(f"   90% / 95%: {price['p90']} / {price['p95']}")
+
+
+def _print_brands(names: 'pd.Series'):
+    """Вывод топа брендов"""
+    brands = brand_counts(names)
+    if len(brands):
+        print("\n🏷️ Топ брендов:")
+        for brand, count in brands.items():
+            print(f"   {brand}: {count} товаров")
+
+
+def analyze_excel_files(store: Optional['ReportStore'] = None):
     """Анализ созданных Excel файлов"""
+    import pandas as pd
+    from report_store import ReportStore, SOURCE_COLUMN
     
     print("📊 ИТОГОВЫЙ ОТЧЕТ ПО ПАРСИНГУ AMAZON")
     print("=" * 60)
     
-    # Находим все Excel файлы
-    excel_files = [f for f in os.listdir('.') if f.endswith('.xlsx')]
+    # Разбираем только новые и измененные файлы
+    store = store or ReportStore('.')
+    counts = store.refresh()
     
-    if not excel_files:
+    if not store.manifest and not store.errors:
         print("❌ Excel файлы не найдены")
         return
     
-    print(f"📁 Найдено Excel файлов: {len(excel_files)}")
+    print(f"📁 Найдено Excel файлов: {len(store.manifest) + len(store.errors)}")
+    print(f"   (новых: {counts['added']}, измененных: {counts['updated']}, из кэша: {counts['unchanged']})")
     print()
     
+    df = store.frame()
+    first_rows = df.groupby(SOURCE_COLUMN, sort=False).head(3)
+    names = _column(first_rows, 'Название товара')
+    prices = first_rows['Цена'] if 'Цена' in first_rows.columns else pd.Series('Не указана', index=first_rows.index)
+    
     # Анализируем каждый файл
-    for i, filename in enumerate(excel_files, 1):
+    for i, filename in enumerate(sorted(store.manifest), 1):
+        entry = store.manifest[filename]
         print(f"📋 Файл {i}: {filename}")
         print("-" * 40)
         
-        try:
-            # Читаем Excel файл
-            df = pd.read_excel(filename, sheet_name=0)
-            
-            print(f"   📊 Товаров в файле: {len(df)}")
-            print(f"   📅 Дата создания: {os.path.getctime(filename)}")
-            print(f"   💾 Размер файла: {os.path.getsize(filename)} байт")
-            
-            # Показываем первые 3 товара
-            if len(df) > 0:
-                print("   🔍 Первые товары:")
-                for idx, row in df.head(3).iterrows():
-                    name = row.get('Название товара', row.get('Название', 'Неизвестно'))
-                    price = row.get('Цена', 'Не указана')
-                    print(f"      {idx+1}. {name[:50]}{'...' if len(str(name)) > 50 else ''} - {price}")
-            
-            print()
-            
-        except Exception as e:
-            print(f"   ❌ Ошибка чтения файла: {e}")
-            print()
+        print(f"   📊 Товаров в файле: {entry['rows']}")
+        print(f"   📅 Дата изменения: {datetime.fromtimestamp(entry['mtime']).strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f"   💾 Размер файла: {entry['size']} байт")
+        
+        # Показываем первые 3 товара
+        mask = first_rows[SOURCE_COLUMN] == filename
+        if mask.any():
+            print("   🔍 Первые товары:")
+            for idx, (name, price) in enumerate(zip(names[mask], prices[mask].fillna('Не указана'))):
+                print(f"      {idx+1}. {name[:50]}{'...' if len(name) > 50 else ''} - {price}")
+        
+        print()
+    
+    for filename, error in store.errors.items():
+        print(f"📋 Файл: {filename}")
+        print(f"   ❌ Ошибка чтения файла: {error}")
+        print()
     
     # Создаем сводный отчет
     print("📈 СВОДНЫЙ ОТЧЕТ")
     print("=" * 30)
     
-    all_products = []
-    for filename in excel_files:
-        try:
-            df = pd.read_excel(filename, sheet_name=0)
-            all_products.extend(df.to_dict('records'))
-        except:
-            continue
-    
-    if all_products:
-        print(f"📊 Общее количество товаров: {len(all_products)}")
+    if len(df):
+        print(f"📊 Общее количество товаров: {len(df)}")
         
         # Статистика по ценам
-        prices = [p.get('Цена', p.get('price', '')) for p in all_products]
-        valid_prices = [p for p in prices if p and str(p).replace('$', '').replace('.', '').isdigit()]
+        prices = normalize_prices(_column(df, 'Цена'), default_currency='USD')
+        stats = price_stats(prices['price_value'])
         
-        print(f"💰 Товаров с ценой: {len(valid_prices)}")
-        print(f"❌ Товаров без цены: {len(all_products) - len(valid_prices)}")
+        print(f"💰 Товаров с ценой: {stats['count']}")
+        print(f"❌ Товаров без цены: {len(df) - stats['count']}")
         
         # Топ брендов
-        brands = {}
-        for product in all_products:
-            name = str(product.get('Название товара', product.get('name', '')))
-            if 'adidas' in name.lower():
-                brands['adidas'] = brands.get('adidas', 0) + 1
-            elif 'nike' in name.lower():
-                brands['Nike'] = brands.get('Nike', 0) + 1
-            elif 'skechers' in name.lower():
-                brands['Skechers'] = brands.get('Skechers', 0) + 1
-            elif 'new balance' in name.lower():
-                brands['New Balance'] = brands.get('New Balance', 0) + 1
-            elif 'under armour' in name.lower():
-                brands['Under Armour'] = brands.get('Under Armour', 0) + 1
-        
-        if brands:
-            print("\n🏷️ Топ брендов:")
-            for brand, count in sorted(brands.items(), key=lambda x: x[1], reverse=True):
-                print(f"   {brand}: {count} товаров")
+        _print_brands(_column(df, 'Название товара'))
         
         # Диапазон цен
-        if valid_prices:
-            price_values = []
-            for price in valid_prices:
-                try:
-                    price_str = str(price).replace('$', '').replace(',', '')
-                    if price_str.isdigit():
-                        price_values.append(int(price_str))
-                except:
-                    continue
-            
-            if price_values:
-                print(f"\n💵 Диапазон цен:")
-                print(f"   Минимальная: ${min(price_values)}")
-                print(f"   Максимальная: ${max(price_values)}")
-                print(f"   Средняя: ${sum(price_values) // len(price_values)}")
+        _print_price_range(prices['price_value'], prices['currency'])
     
     print("\n✅ Анализ завершен!")
     print(f"📁 Все файлы находятся в: {os.path.abspath('.')}")
 
 
-def create_summary_excel():
+def create_summary_excel(store: Optional['ReportStore'] = None):
     """Создание сводного Excel файла"""
+    import pandas as pd
+    from report_store import ReportStore
     
     print("\n📊 Создание сводного Excel файла...")
     
-    # Находим все Excel файлы
-    excel_files = [f for f in os.listdir('.') if f.endswith('.xlsx')]
+    store = store or ReportStore('.')
+    store.refresh()
     
-    if not excel_files:
+    if not store.manifest:
         print("❌ Excel файлы не найдены")
         return
     
-    all_products = []
-    for filename in excel_files:
-        try:
-            df = pd.read_excel(filename, sheet_name=0)
-            for _, row in df.iterrows():
-                product = row.to_dict()
-                product['Источник файла'] = filename
-                all_products.append(product)
-        except:
-            continue
-    
-    if not all_products:
+    all_products = store.frame()
+    
+    if not len(all_products):
         print("❌ Данные не найдены")
         return
     
-    # Создаем сводный DataFrame
-    df = pd.DataFrame(all_products)
-    
     # Удаляем дубликаты по ID товара
+    df = all_products
     if 'ID товара' in df.columns:
         df = df.drop_duplicates(subset=['ID товара'], keep='first')
     
@@ -166,7 +198,7 @@ def create_summary_excel():
             'Значение': [
                 len(all_products),
                 len(df),
-                len(excel_files),
+                len(store.manifest),
                 datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
                 'https://www.amazon.com/s?k=shoes'
             ]
@@ -186,13 +218,141 @@ def create_summary_excel():
     print(f"📊 Товаров в сводном файле: {len(df)}")
 
 
-if __name__ == "__main__":
-    # Анализируем файлы
-    analyze_excel_files()
+def analyze_store(store: ProductStore):
+    """
+    Анализ товаров из базы (без разбора Excel файлов)
     
-    # Создаем сводный файл
-    create_summary_excel()
+    Args:
+        store: База товаров
+    """
+    import pandas as pd
+    
+    print("📊 ИТОГОВЫЙ ОТЧЕТ ПО ПАРСИНГУ AMAZON")
+    print("=" * 60)
+    
+    summary = store.summary()
+    if not summary['total']:
+        print("❌ В базе нет товаров")
+        return
+    
+    print(f"🗄️ База: {os.path.abspath(store.path)}")
+    print(f"🔄 Обходов: {summary['crawls']}, "
+          f"последний: {datetime.fromtimestamp(summary['last_crawl']).strftime('%Y-%m-%d %H:%M:%S')}")
+    print()
+    
+    for i, source in enumerate(store.sources(), 1):
+        print(f"📋 Источник {i}: {source['url']}")
+        print(f"   📊 Товаров: {source['products']}")
+        if source['last_crawl']:
+            print(f"   📅 Последний обход: {datetime.fromtimestamp(source['last_crawl']).strftime('%Y-%m-%d %H:%M:%S')}")
+        print()
+    
+    print("📈 СВОДНЫЙ ОТЧЕТ")
+    print("=" * 30)
+    
+    df = pd.DataFrame(store.products(), columns=['id', 'name', 'price_value', 'currency'])
+    stats = price_stats(df['price_value'].astype(float))
+    
+    print(f"📊 Товаров в наличии: {summary['active']}")
+    print(f"🗑️ Исчезнувших: {summary['gone']}")
+    print(f"💰 Товаров с ценой: {stats['count']}")
+    print(f"❌ Товаров без цены: {summary['active'] - stats['count']}")
+    
+    _print_brands(df['name'].fillna('').astype(str))
+    _print_price_range(df['price_value'].astype(float), df['currency'].fillna('USD'))
+    
+    print("\n✅ Анализ завершен!")
+
+
+def create_summary_from_store(store: ProductStore):
+    """
+    Создание сводного Excel файла из базы товаров
+    
+    Args:
+        store: База товаров
+    """
+    from exporters import export_filename, export_products
+    
+    print("\n📊 Создание сводного Excel файла...")
+    
+    products = store.products()
+    if not products:
+        print("❌ Данные не найдены")
+        return
+    
+    summary = store.summary()
+    summary_filename = export_filename("amazon_summary")
+    
+    stats = export_products(
+        summary_filename,
+        products,
+        columns=[
+            ('№', 8, 'int'),
+            ('ID товара', 15),
+            ('Название товара', 60),
+            ('Цена', 15),
+            ('Цена (число)', 12, 'float'),
+            ('Валюта', 8),
+            ('URL источника', 40),
+            ('Впервые найден', 20),
+            ('Обновлен', 20)
+        ],
+        row=lambda number, product: [
+            number, product['id'], product['name'], product['price'], product['price_value'],
+            product['currency'], product['url'],
+            datetime.fromtimestamp(product['first_seen']).strftime("%Y-%m-%d %H:%M:%S"),
+            datetime.fromtimestamp(product['updated']).strftime("%Y-%m-%d %H:%M:%S")
+        ],
+        sheet_name='Все товары',
+        stats=lambda stats: [
+            ('Товаров в наличии', stats.total),
+            ('Товары с указанной ценой', stats.with_price),
+            ('Исчезнувших товаров', summary['gone']),
+            ('Страниц списков', summary['urls']),
+            ('Обходов', summary['crawls']),
+            ('Дата создания отчета', datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        ]
+    )
+    
+    print(f"✅ Сводный файл создан: {summary_filename}")
+    print(f"📁 Путь: {os.path.abspath(summary_filename)}")
+    print(f"📊 Товаров в сводном файле: {stats.total}")
+
+
+def main(database: str = DATABASE, summary: bool = True):
+    """
+    Итоговый отчет: по базе товаров, а если ее нет - по Excel файлам
+    
+    Args:
+        database: Путь к базе товаров
+        summary: Создавать сводный Excel файл
+    """
+    if os.path.exists(database):
+        # Отчет по базе товаров: запросы вместо разбора файлов
+        store = ProductStore(database)
+        try:
+            analyze_store(store)
+            if summary:
+                create_summary_from_store(store)
+        finally:
+            store.close()
+    else:
+        from report_store import ReportStore
+        
+        # Один манифест на оба шага: файлы разбираются один раз
+        store = ReportStore('.')
+        
+        # Анализируем файлы
+        analyze_excel_files(store)
+        
+        # Создаем сводный файл
+        if summary:
+            create_summary_excel(store)
     
     print("\n🎉 ОТЧЕТ ЗАВЕРШЕН!")
     print("📊 Excel файлы готовы к использованию")
     print("💡 Откройте файлы в Excel для детального просмотра")
+
+
+if __name__ == "__main__":
+    main()
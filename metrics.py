@@ -0,0 +1,265 @@
+"""
+Метрики парсинга: время по фазам и счетчики для каждого вызова parse()
+Экспорт в текстовый формат Prometheus и JSON lines
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Фазы обработки страницы
+NAVIGATION = 'navigation'
+WAIT = 'wait'
+HUMAN = 'human'
+EXTRACTION = 'extraction'
+FETCH = 'fetch'
+BROWSER_START = 'browser_start'
+RATE_LIMIT = 'rate_limit'
+
+# Счетчики
+SELECTOR_PROBES = 'selector_probes'
+SELECTOR_MATCHES = 'selector_matches'
+IPC_CALLS = 'ipc_calls'
+PRODUCTS = 'products'
+RETRIES = 'retries'
+BACKEND_FALLBACKS = 'backend_fallbacks'
+BLOCKED_REQUESTS = 'blocked_requests'
+BLOCKED_BYTES = 'blocked_bytes'
+SESSIONS_RESTORED = 'sessions_restored'
+SESSIONS_DROPPED = 'sessions_dropped'
+
+# Границы гистограммы длительности parse() в секундах
+DURATION_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_current: ContextVar[Optional['ParseMetrics']] = ContextVar('parse_metrics', default=None)
+
+
+@dataclass
+class ParseMetrics:
+    """
+    Метрики одного вызова parse()
+
+    Attributes:
+        url: URL страницы
+        started: Время начала (unix time)
+        elapsed: Общее время в секундах
+        phases: Суммарное время по фазам в секундах
+        counters: Счетчики (пробы селекторов, вызовы в браузер, товары ...)
+        error: Тип исключения, если парсинг не удался
+    """
+    url: str
+    started: float = field(default_factory=time.time)
+    elapsed: float = 0.0
+    phases: Dict[str, float] = field(default_factory=dict)
+    counters: Dict[str, int] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    def add_time(self, name: str, seconds: float):
+        """Добавление времени к фазе"""
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def count(self, name: str, value: int = 1):
+        """Увеличение счетчика"""
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Замер времени блока как фазы name"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Метрики в виде словаря"""
+        return asdict(self)
+
+    def to_json(self) -> str:
+        """Метрики одной строкой JSON"""
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+
+def current() -> Optional[ParseMetrics]:
+    """Метрики текущего вызова parse() (None вне его)"""
+    return _current.get()
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """
+    Замер фазы в метриках текущего вызова (вне parse() ничего не делает)
+
+    Args:
+        name: Название фазы
+    """
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    with metrics.phase(name):
+        yield
+
+
+def count(name: str, value: int = 1):
+    """
+    Увеличение счетчика текущего вызова (вне parse() ничего не делает)
+
+    Args:
+        name: Название счетчика
+        value: Приращение
+    """
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.count(name, value)
+
+
+@contextmanager
+def collect(url: str) -> Iterator[ParseMetrics]:
+    """
+    Сбор метрик вызова: фазы и счетчики внутри блока попадают в результат
+
+    Метрики хранятся в contextvar, поэтому параллельные задачи
+    parse_many и потоки asyncio.to_thread не смешивают свои значения.
+
+    Args:
+        url: URL страницы
+
+    Yields:
+        Метрики вызова (заполняются до выхода из блока)
+    """
+    metrics = ParseMetrics(url)
+    token = _current.set(metrics)
+    start = time.perf_counter()
+    try:
+        yield metrics
+    except BaseException as e:
+        metrics.error = type(e).__name__
+        raise
+    finally:
+        metrics.elapsed = time.perf_counter() - start
+        _current.reset(token)
+
+
+def write_jsonl(path: str, metrics: ParseMetrics):
+    """
+    Дописывание метрик вызова в файл JSON lines
+
+    Args:
+        path: Путь к файлу
+        metrics: Метрики вызова
+    """
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(metrics.to_json() + '\n')
+
+
+def _escape(value: str) -> str:
+    """Экранирование значения метки Prometheus"""
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class MetricsRegistry:
+    """
+    Накопленные метрики всех вызовов parse() парсера
+
+    Хранит суммы по фазам и счетчикам и гистограмму длительности,
+    а не отдельные вызовы, поэтому память не растет с числом страниц.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DURATION_BUCKETS):
+        """
+        Args:
+            buckets: Границы гистограммы длительности в секундах
+        """
+        self.buckets = tuple(sorted(buckets))
+        self.parses = 0
+        self.errors = 0
+        self.duration_sum = 0.0
+        self.bucket_counts = [0] * len(self.buckets)
+        self.phase_seconds: Dict[str, float] = {}
+        self.phase_calls: Dict[str, int] = {}
+        self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, metrics: ParseMetrics):
+        """
+        Учет метрик вызова
+
+        Args:
+            metrics: Метрики вызова
+        """
+        with self._lock:
+            self.parses += 1
+            if metrics.error:
+                self.errors += 1
+            self.duration_sum += metrics.elapsed
+            for i, bound in enumerate(self.buckets):
+                if metrics.elapsed <= bound:
+                    self.bucket_counts[i] += 1
+            for name, seconds in metrics.phases.items():
+                self.phase_seconds[name] = self.phase_seconds.get(name, 0.0) + seconds
+                self.phase_calls[name] = self.phase_calls.get(name, 0) + 1
+            for name, value in metrics.counters.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_prometheus(self, prefix: str = 'parser') -> str:
+        """
+        Метрики в текстовом формате Prometheus
+
+        Args:
+            prefix: Префикс имен метрик
+
+        Returns:
+            Текст для /metrics или textfile collector
+        """
+        with self._lock:
+            lines: List[str] = []
+
+            def metric(name: str, kind: str, help_text: str, samples: List[Tuple[str, float]]):
+                lines.append(f"# HELP {prefix}_{name} {help_text}")
+                lines.append(f"# TYPE {prefix}_{name} {kind}")
+                for suffix, value in samples:
+                    lines.append(f"{prefix}_{name}{suffix} {value}")
+
+            metric('parses_total', 'counter', 'Number of parse calls', [('', self.parses)])
+            metric('parse_errors_total', 'counter', 'Number of failed parse calls', [('', self.errors)])
+
+            histogram = []
+            for bound, value in zip(self.buckets, self.bucket_counts):
+                histogram.append((f'_bucket{{le="{bound:g}"}}', value))
+            histogram.append(('_bucket{le="+Inf"}', self.parses))
+            histogram.append(('_sum', self.duration_sum))
+            histogram.append(('_count', self.parses))
+            metric('parse_duration_seconds', 'histogram', 'Duration of parse calls', histogram)
+
+            metric('phase_seconds_total', 'counter', 'Time spent per parse phase', [
+                (f'{{phase="{_escape(name)}"}}', value) for name, value in sorted(self.phase_seconds.items())
+            ])
+            metric('phase_calls_total', 'counter', 'Parse calls that entered the phase', [
+                (f'{{phase="{_escape(name)}"}}', value) for name, value in sorted(self.phase_calls.items())
+            ])
+            metric('events_total', 'counter', 'Parse counters (selector probes, IPC calls, products ...)', [
+                (f'{{name="{_escape(name)}"}}', value) for name, value in sorted(self.counters.items())
+            ])
+            return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str, prefix: str = 'parser'):
+        """
+        Атомарная запись метрик в файл (для textfile collector node_exporter)
+
+        Args:
+            path: Путь к файлу .prom
+            prefix: Префикс имен метрик
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus(prefix))
+        os.replace(tmp_path, path)
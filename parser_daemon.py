@@ -0,0 +1,373 @@
+"""
+Демон парсера: браузеры остаются запущенными между вызовами
+Задания принимаются через Unix сокет, по строке JSON на запрос и ответ
+
+Запуск:
+    python cli.py daemon start --pool-size 4
+Использование:
+    from parser_daemon import parse_products
+    products = parse_products("https://example.com/catalog")
+"""
+
+import json
+import logging
+import os
+import socket
+import stat
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Переменная окружения с путем к сокету демона
+SOCKET_ENV = 'PARSER_DAEMON_SOCKET'
+
+
+def default_socket_path() -> str:
+    """
+    Путь к сокету: из PARSER_DAEMON_SOCKET, в $XDG_RUNTIME_DIR или в личной
+    папке пользователя (0700) во временной папке
+    """
+    if os.environ.get(SOCKET_ENV):
+        return os.environ[SOCKET_ENV]
+    if os.environ.get('XDG_RUNTIME_DIR'):
+        return os.path.join(os.environ['XDG_RUNTIME_DIR'], 'product_parser.sock')
+    return os.path.join(tempfile.gettempdir(), f"product_parser_{os.getuid()}", 'daemon.sock')
+
+
+def _ensure_private_dir(path: str):
+    """
+    Создание папки сокета с правами 0700 и проверка, что она наша
+
+    Raises:
+        RuntimeError: Папка принадлежит другому пользователю, доступна
+            другим или это не папка (например, символическая ссылка)
+    """
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise RuntimeError(f"Папка сокета {path} должна принадлежать пользователю и иметь права 0700")
+
+
+def _check_owner(path: str):
+    """
+    Проверка, что по пути лежит сокет текущего пользователя
+
+    Raises:
+        FileNotFoundError: Сокета нет
+        PermissionError: Это не сокет или его создал другой пользователь
+    """
+    info = os.lstat(path)
+    if not stat.S_ISSOCK(info.st_mode) or info.st_uid != os.getuid():
+        raise PermissionError(f"{path} - не сокет текущего пользователя")
+
+
+class DaemonError(RuntimeError):
+    """Демон вернул ошибку или не ответил на запрос"""
+
+
+class DaemonUnavailableError(DaemonError):
+    """Демон не запущен: запрос не был отправлен"""
+
+
+class DaemonTimeoutError(DaemonError, TimeoutError):
+    """Демон принял запрос, но не ответил за timeout секунд"""
+
+
+class ParserDaemon:
+    """
+    Долгоживущий процесс с открытыми парсерами
+
+    Для каждого сочетания (сайт, headless, способ загрузки) парсер
+    создается при первом запросе и дальше переиспользуется: браузер
+    и прогретые страницы пула не пересоздаются между заданиями.
+    Запросы разных клиентов выполняются параллельно в пределах пула.
+
+    Пример:
+        asyncio.run(ParserDaemon(pool_size=4).serve())
+    """
+
+    def __init__(self, path: Optional[str] = None, pool_size: int = 4, idle_timeout: Optional[float] = None,
+                 parser_options: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            path: Путь к Unix сокету (по умолчанию default_socket_path())
+            pool_size: Прогретых страниц в каждом парсере
+            idle_timeout: Завершение после стольких секунд без запросов (None - не завершать)
+            parser_options: Дополнительные параметры конструктора парсеров
+        """
+        self.path = path or default_socket_path()
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.parser_options = parser_options or {}
+        self.requests = 0
+        self.started = time.time()
+        self._parsers: Dict[Tuple[str, bool, str], Any] = {}
+        self._active = 0
+        self._writers: set = set()
+        self._last_request = time.monotonic()
+        self._parser_lock = None
+        self._stopping = None
+
+    async def _parser(self, site: str, headless: bool, backend: str) -> Any:
+        """Открытый парсер для сочетания параметров (создается при первом запросе)"""
+        from sites import parser_class
+
+        key = (site, headless, backend)
+        async with self._parser_lock:
+            if key not in self._parsers:
+                logger.info(f"Запускаем парсер {site} (headless={headless}, backend={backend})")
+                parser = parser_class(site)(headless=headless, backend=backend, pool_size=self.pool_size,
+                                            **self.parser_options)
+                await parser.__aenter__()
+                self._parsers[key] = parser
+            return self._parsers[key]
+
+    async def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Выполнение одного запроса
+
+        Args:
+            request: {'method': 'parse' | 'ping' | 'stats' | 'shutdown', 'params': {...}}
+
+        Returns:
+            Ответ: {'ok': True, ...} или {'ok': False, 'error': ..., 'type': ...}
+        """
+        method = request.get('method')
+        params = request.get('params') or {}
+
+        if method == 'parse':
+            parser = await self._parser(params.get('site', 'generic'), bool(params.get('headless', True)),
+                                        params.get('backend', 'browser'))
+            result = await parser._parse_result(0, params['url'])
+            if not result.ok:
+                return {'ok': False, 'error': str(result.error), 'type': type(result.error).__name__}
+            return {'ok': True, 'products': [dict(product) for product in result.products],
+                    'elapsed': result.elapsed}
+        if method == 'ping':
+            return {'ok': True, 'pid': os.getpid(), 'uptime': time.time() - self.started,
+                    'requests': self.requests, 'active': self._active}
+        if method == 'stats':
+            return {'ok': True, 'parsers': [
+                {'site': site, 'headless': headless, 'backend': backend,
+                 'parses': parser.metrics.parses, 'errors': parser.metrics.errors,
+                 'browser': parser.browser is not None}
+                for (site, headless, backend), parser in self._parsers.items()
+            ]}
+        if method == 'shutdown':
+            self._stopping.set()
+            return {'ok': True}
+        raise ValueError(f"Неизвестный метод: {method}")
+
+    async def _serve_client(self, reader: Any, writer: Any):
+        """Обработка соединения: запросы выполняются по очереди до закрытия"""
+        self._writers.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self.requests += 1
+                self._active += 1
+                self._last_request = time.monotonic()
+                try:
+                    response = await self.handle(json.loads(line))
+                except Exception as e:
+                    logger.error(f"Ошибка запроса: {e}")
+                    response = {'ok': False, 'error': str(e), 'type': type(e).__name__}
+                finally:
+                    self._active -= 1
+                    self._last_request = time.monotonic()
+                writer.write(json.dumps(response, ensure_ascii=False, default=str).encode('utf-8') + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    def _check_socket(self):
+        """Подготовка папки сокета и удаление сокета, оставшегося от упавшего демона"""
+        if self.path == default_socket_path() and SOCKET_ENV not in os.environ:
+            # Временная папка общая: сокет лежит в личной папке пользователя
+            _ensure_private_dir(os.path.dirname(self.path))
+        if not os.path.lexists(self.path):
+            return
+        try:
+            _check_owner(self.path)
+        except PermissionError as e:
+            raise RuntimeError(f"Путь сокета занят: {e}") from e
+        if DaemonClient(self.path, timeout=1.0).is_running():
+            raise RuntimeError(f"Демон уже запущен: {self.path}")
+        os.unlink(self.path)
+
+    async def _wait_idle(self):
+        """Ожидание команды остановки или простоя дольше idle_timeout"""
+        import asyncio
+
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.idle_timeout)
+            except asyncio.TimeoutError:
+                if not self._active and time.monotonic() - self._last_request >= self.idle_timeout:
+                    logger.info(f"Нет запросов {self.idle_timeout:g} с, завершаем работу")
+                    return
+
+    async def serve(self):
+        """Работа до команды shutdown, SIGTERM/SIGINT или простоя"""
+        import asyncio
+        import signal
+
+        self._parser_lock = asyncio.Lock()
+        self._stopping = asyncio.Event()
+        self._check_socket()
+
+        # Сокет сразу создается с правами 0600, без окна между bind и chmod
+        umask = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(self._serve_client, path=self.path)
+        finally:
+            os.umask(umask)
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, self._stopping.set)
+        logger.info(f"Демон парсера слушает {self.path} (PID {os.getpid()})")
+
+        try:
+            async with server:
+                await self._wait_idle()
+                # Открытые соединения закрываются, их обработчики завершаются сами
+                for writer in list(self._writers):
+                    writer.close()
+                await asyncio.sleep(0.1)
+        finally:
+            for parser in self._parsers.values():
+                await parser.__aexit__(None, None, None)
+            self._parsers.clear()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            logger.info("Демон парсера остановлен")
+
+
+class DaemonClient:
+    """
+    Синхронный клиент демона (без asyncio и Playwright в процессе клиента)
+
+    Пример:
+        client = DaemonClient()
+        if client.is_running():
+            products = client.parse("https://example.com/catalog")
+    """
+
+    def __init__(self, path: Optional[str] = None, timeout: float = 300.0):
+        """
+        Args:
+            path: Путь к сокету демона (по умолчанию default_socket_path())
+            timeout: Таймаут ответа в секундах
+        """
+        self.path = path or default_socket_path()
+        self.timeout = timeout
+
+    def call(self, method: str, **params: Any) -> Dict[str, Any]:
+        """
+        Запрос к демону
+
+        Args:
+            method: Метод ('parse', 'ping', 'stats', 'shutdown')
+            **params: Параметры метода
+
+        Returns:
+            Ответ демона
+
+        Raises:
+            DaemonUnavailableError: Демон не запущен (запрос не отправлен)
+            DaemonTimeoutError: Демон принял запрос, но не ответил вовремя
+            DaemonError: Демон вернул ошибку или оборвал соединение
+        """
+        request = json.dumps({'method': method, 'params': params}, ensure_ascii=False).encode('utf-8') + b'\n'
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.settimeout(self.timeout)
+            try:
+                # Сокет другого пользователя - не наш демон: запрос ему не отправляется
+                _check_owner(self.path)
+                connection.connect(self.path)
+            except (FileNotFoundError, ConnectionRefusedError, PermissionError) as e:
+                raise DaemonUnavailableError(f"Демон недоступен ({self.path}): {e}") from e
+            except OSError as e:
+                raise DaemonError(f"Не удалось подключиться к демону ({self.path}): {e}") from e
+            # Запрос мог уже выполняться: после подключения ошибки не означают, что демона нет
+            try:
+                connection.sendall(request)
+                with connection.makefile('rb') as stream:
+                    line = stream.readline()
+            except socket.timeout as e:
+                raise DaemonTimeoutError(f"Демон не ответил за {self.timeout:g} с ({self.path})") from e
+            except OSError as e:
+                raise DaemonError(f"Соединение с демоном оборвано ({self.path}): {e}") from e
+        if not line:
+            raise DaemonError(f"Демон закрыл соединение без ответа ({self.path})")
+
+        response = json.loads(line)
+        if not response.get('ok'):
+            raise DaemonError(f"{response.get('type')}: {response.get('error')}")
+        return response
+
+    def is_running(self) -> bool:
+        """Демон запущен и отвечает"""
+        try:
+            self.call('ping')
+            return True
+        except DaemonUnavailableError:
+            return False
+
+    def parse(self, url: str, site: str = 'generic', headless: bool = True,
+              backend: str = 'browser') -> List[Dict[str, Any]]:
+        """
+        Парсинг страницы в демоне
+
+        Args:
+            url: URL страницы с товарами
+            site: Парсер сайта ('generic' или 'amazon')
+            headless: Запускать браузер в фоновом режиме
+            backend: Способ загрузки страниц ('browser', 'static', 'auto')
+
+        Returns:
+            Список словарей с информацией о товарах
+        """
+        return self.call('parse', url=url, site=site, headless=headless, backend=backend)['products']
+
+    def shutdown(self):
+        """Остановка демона"""
+        self.call('shutdown')
+
+
+def parse_products(url: str, headless: bool = True) -> List[Dict[str, str]]:
+    """
+    Синхронный парсинг через демон (та же сигнатура, что у product_parser.parse_products)
+
+    Если демон не запущен, страница разбирается в своем браузере,
+    как раньше. Если демон принял задание, но не ответил, страница
+    повторно не разбирается.
+
+    Args:
+        url: URL страницы с товарами
+        headless: Запускать браузер в фоновом режиме
+
+    Returns:
+        Список словарей с информацией о товарах
+    """
+    try:
+        return DaemonClient().parse(url, headless=headless)
+    except DaemonUnavailableError as e:
+        logger.info(f"{e}; парсим без демона")
+    except DaemonError as e:
+        logger.error(f"Ошибка парсинга страницы {url}: {e}")
+        return []
+
+    from product_parser import parse_products as parse_locally
+
+    return parse_locally(url, headless=headless)
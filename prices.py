@@ -0,0 +1,270 @@
+"""
+Разбор и нормализация цен
+Одиночный разбор при извлечении товара и векторный - для истории в pandas
+"""
+
+import re
+from typing import Any, Dict, Optional, Tuple
+
+# Значение цены, когда она не найдена на странице
+NO_PRICE = 'Цена не указана'
+
+# Символы и обозначения валют (проверяются по порядку)
+CURRENCY_SYMBOLS = [
+    ('US$', 'USD'),
+    ('$', 'USD'),
+    ('€', 'EUR'),
+    ('£', 'GBP'),
+    ('₽', 'RUB'),
+    ('руб', 'RUB'),
+    ('¥', 'JPY'),
+    ('₹', 'INR'),
+    ('₴', 'UAH'),
+    ('₸', 'KZT'),
+]
+
+_CURRENCY_CODES = ('USD', 'EUR', 'GBP', 'RUB', 'JPY', 'INR', 'UAH', 'KZT', 'CAD', 'AUD', 'CNY')
+
+_CURRENCY_RE = re.compile(
+    '|'.join([re.escape(symbol) for symbol, _ in CURRENCY_SYMBOLS] + [rf'\b{code}\b' for code in _CURRENCY_CODES]),
+    re.IGNORECASE
+)
+
+# Пробелы внутри чисел, включая неразрывные (символами, а не \u-экранированием,
+# чтобы шаблоны работали и в движке регулярных выражений pyarrow)
+_SPACES = '\\s\u00a0\u202f'
+
+# Разделители групп разрядов: один пробел, неразрывный или узкий неразрывный
+_GROUP_SPACES = ' \u00a0\u202f'
+
+# Число с разделителями тысяч и дробной части. Пробел допустим только между
+# группами из трех цифр ("1 299,99"), поэтому две цены через перевод строки
+# или несколько пробелов не сливаются в одно число
+_NUMBER = rf'(?:\d{{1,3}}(?:[{_GROUP_SPACES}]\d{{3}})+(?:[.,]\d+)?|\d+(?:[.,]\d+)*)[.,]?'
+_NUMBER_RE = re.compile(_NUMBER)
+
+# Диапазон: "10,99 € - 24,99 €", "$10.99–$24.99"
+_RANGE_RE = re.compile(rf'({_NUMBER})(?:\D{{0,4}}?\s*[-–—]\s*\D{{0,4}}?({_NUMBER}))?')
+
+_SPACES_RE = re.compile(f'[{_SPACES}]')
+
+
+def detect_currency(text: Optional[str]) -> Optional[str]:
+    """
+    Код валюты по тексту цены
+
+    Args:
+        text: Текст с ценой
+
+    Returns:
+        Код ISO 4217 или None
+    """
+    if not text:
+        return None
+    match = _CURRENCY_RE.search(text)
+    if not match:
+        return None
+    found = match.group()
+    for symbol, code in CURRENCY_SYMBOLS:
+        if found.lower() == symbol.lower():
+            return code
+    return found.upper()
+
+
+def normalize_number(token: str) -> Optional[str]:
+    """
+    Число из токена с локальными разделителями
+
+    Если есть и точка, и запятая, дробная часть отделена последним из них.
+    Один разделитель считается дробным, если после него не три цифры
+    ("12,99", "0.299"), иначе это разделитель тысяч ("1,299", "1.299").
+
+    Args:
+        token: Токен вида '1,299.99', '1.299,99', '1 299,99', '29.'
+
+    Returns:
+        Число с точкой в дробной части ('1299.99') или None
+    """
+    token = _SPACES_RE.sub('', token).rstrip('.,')
+    if not token:
+        return None
+
+    dot, comma = token.rfind('.'), token.rfind(',')
+    if dot >= 0 and comma >= 0:
+        decimal = '.' if dot > comma else ','
+    elif dot >= 0 or comma >= 0:
+        separator = '.' if dot >= 0 else ','
+        position = max(dot, comma)
+        single = token.count(separator) == 1
+        fraction = len(token) - position - 1
+        decimal = separator if single and (fraction != 3 or token[:position] == '0') else None
+    else:
+        decimal = None
+
+    if decimal is None:
+        return re.sub(r'[.,]', '', token)
+    thousands = ',' if decimal == '.' else '.'
+    return token.replace(thousands, '').replace(decimal, '.')
+
+
+def parse_price(text: Optional[str]) -> Tuple[Optional[str], Optional[float], Optional[str]]:
+    """
+    Разбор текста цены
+
+    Для диапазона берется нижняя граница.
+
+    Args:
+        text: Сырой текст с ценой
+
+    Returns:
+        Нормализованная строка, числовое значение и код валюты
+    """
+    if not text:
+        return None, None, None
+    match = _NUMBER_RE.search(text)
+    if not match:
+        return None, None, None
+    number = normalize_number(match.group())
+    if number is None:
+        return None, None, None
+    return number, float(number), detect_currency(text)
+
+
+def normalize_prices(prices: Any, default_currency: Optional[str] = None) -> Any:
+    """
+    Векторная нормализация колонки цен
+
+    Те же правила, что в normalize_number, но операциями pandas над всей
+    колонкой сразу; каждая уникальная строка разбирается один раз.
+
+    Args:
+        prices: pandas.Series с текстами цен ('$1,299.99', '10,99 € - 24,99 €', 'Цена не указана')
+        default_currency: Валюта для цен без символа валюты
+
+    Returns:
+        DataFrame с колонками price_value, price_max (верх диапазона
+        или price_value) и currency
+    """
+    import numpy as np
+    import pandas as pd
+
+    # Цены в истории сильно повторяются: разбираем только уникальные строки
+    codes, uniques = pd.factorize(prices.astype('string').fillna(''))
+    text = pd.Series(uniques, dtype='string')
+    bounds = text.str.extract(_RANGE_RE)
+
+    def to_number(tokens):
+        tokens = tokens.fillna('').str.replace(_SPACES_RE.pattern, '', regex=True).str.rstrip('.,')
+        dot = tokens.str.rfind('.')
+        comma = tokens.str.rfind(',')
+        both = (dot >= 0) & (comma >= 0)
+        position = np.maximum(dot, comma)
+        dots = tokens.str.count(r'\.')
+        commas = tokens.str.count(',')
+        fraction = tokens.str.len() - position - 1
+        zero_integer = (position == 1) & tokens.str.startswith('0')
+        single = ~both & ((dots + commas) == 1) & ((fraction != 3) | zero_integer)
+
+        comma_decimal = (both & (comma > dot)) | (single & (commas == 1))
+        dot_decimal = (both & (dot > comma)) | (single & (dots == 1))
+        normalized = np.select(
+            [comma_decimal.to_numpy(dtype=bool), dot_decimal.to_numpy(dtype=bool)],
+            [
+                tokens.str.replace('.', '', regex=False).str.replace(',', '.', regex=False),
+                tokens.str.replace(',', '', regex=False),
+            ],
+            default=tokens.str.replace(r'[.,]', '', regex=True)
+        )
+        return pd.to_numeric(pd.Series(normalized, index=tokens.index), errors='coerce')
+
+    low = to_number(bounds[0])
+    high = to_number(bounds[1]).fillna(low)
+
+    currency = text.str.extract(f'({_CURRENCY_RE.pattern})', flags=re.IGNORECASE)[0]
+    lookup = {symbol.lower(): code for symbol, code in CURRENCY_SYMBOLS}
+    currency = currency.str.lower().map(lookup).fillna(currency.str.upper())
+    if default_currency:
+        currency = currency.where(currency.notna() | low.isna(), default_currency)
+
+    unique = pd.DataFrame({
+        'price_value': low,
+        'price_max': np.maximum(low, high),
+        'currency': currency,
+    })
+    result = unique.take(codes)
+    result.index = prices.index
+    return result
+
+
+# Знак валюты для вывода цен
+CURRENCY_SIGNS = {code: symbol for symbol, code in CURRENCY_SYMBOLS if len(symbol) == 1}
+
+
+def format_price(value: float, currency: Optional[str]) -> str:
+    """
+    Цена со знаком валюты для отчетов
+
+    Args:
+        value: Числовое значение
+        currency: Код валюты (None - без знака)
+
+    Returns:
+        '$21.00', '€19.99', '150.00 CAD' или '21.00'
+    """
+    sign = CURRENCY_SIGNS.get(currency or '')
+    if sign:
+        return f"{sign}{value:.2f}"
+    return f"{value:.2f} {currency}" if currency else f"{value:.2f}"
+
+
+def price_stats(values: Any, percentiles: Tuple[int, ...] = (25, 50, 75, 90, 95)) -> Dict[str, float]:
+    """
+    Статистика цен по всей колонке
+
+    Args:
+        values: Числовые цены (NaN пропускаются)
+        percentiles: Перцентили для расчета
+
+    Returns:
+        count, min, max, mean и p<N> для каждого перцентиля
+    """
+    import numpy as np
+
+    array = np.asarray(values, dtype=float)
+    array = array[~np.isnan(array)]
+    stats: Dict[str, float] = {'count': int(array.size)}
+    if not array.size:
+        return stats
+    stats.update(min=float(array.min()), max=float(array.max()), mean=float(array.mean()))
+    for percentile, value in zip(percentiles, np.percentile(array, percentiles)):
+        stats[f'p{percentile}'] = float(value)
+    return stats
+
+
+def price_stats_by_currency(values: Any, currencies: Any,
+                            percentiles: Tuple[int, ...] = (25, 50, 75, 90, 95)) -> Dict[Optional[str], Dict[str, float]]:
+    """
+    Статистика цен отдельно по каждой валюте
+
+    Цены в разных валютах несравнимы, поэтому минимум, среднее
+    и перцентили считаются внутри валюты.
+
+    Args:
+        values: Числовые цены (NaN пропускаются)
+        currencies: Коды валют той же длины (None - валюта не определена)
+        percentiles: Перцентили для расчета
+
+    Returns:
+        Статистика price_stats по коду валюты, от самой частой валюты
+    """
+    import pandas as pd
+
+    frame = pd.DataFrame({
+        'value': pd.to_numeric(pd.Series(list(values)), errors='coerce'),
+        'currency': pd.Series(list(currencies), dtype=object).fillna(''),
+    }).dropna(subset=['value'])
+
+    groups = {}
+    for currency, group in frame.groupby('currency', sort=False):
+        groups[currency or None] = price_stats(group['value'], percentiles)
+    return dict(sorted(groups.items(), key=lambda item: -item[1]['count']))
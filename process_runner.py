@@ -0,0 +1,204 @@
+"""
+Многопроцессный запуск парсера
+URL распределяются между K процессами, у каждого свой браузер
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from product_parser import ProductParser, ParseResult
+from amazon_advanced import AdvancedAmazonParser
+from rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WorkerStats:
+    """
+    Статистика одного процесса-воркера
+
+    Attributes:
+        worker: Номер воркера
+        pid: PID процесса
+        urls: Количество URL в шарде
+        succeeded: Успешно обработанные URL
+        failed: URL с ошибкой
+        products: Количество извлеченных товаров
+        elapsed: Время работы воркера в секундах
+        error: Ошибка, из-за которой воркер не завершился
+    """
+    worker: int
+    pid: Optional[int] = None
+    urls: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    products: int = 0
+    elapsed: float = 0.0
+    error: Optional[str] = None
+
+
+def shard_urls(urls: List[str], workers: int) -> List[List[Tuple[int, str]]]:
+    """
+    Распределение URL по воркерам по кругу
+
+    Args:
+        urls: Список URL
+        workers: Количество воркеров
+
+    Returns:
+        Для каждого воркера список пар (индекс URL, URL)
+    """
+    shards: List[List[Tuple[int, str]]] = [[] for _ in range(workers)]
+    for index, url in enumerate(urls):
+        shards[index % workers].append((index, url))
+    return [shard for shard in shards if shard]
+
+
+async def _run_shard(worker: int, shard: List[Tuple[int, str]], parser_class: Type[ProductParser],
+                     concurrency: int, parser_kwargs: Dict[str, Any]) -> Tuple[List[ParseResult], WorkerStats]:
+    """Обработка шарда в отдельном браузере текущего процесса"""
+    stats = WorkerStats(worker=worker, pid=os.getpid(), urls=len(shard))
+    results = []
+    start = time.perf_counter()
+
+    async with parser_class(**parser_kwargs) as parser:
+        async for result in parser.parse_many([url for _, url in shard], concurrency=concurrency):
+            # Возвращаем глобальный индекс URL и сериализуемую ошибку
+            result.index = shard[result.index][0]
+            if result.ok:
+                stats.succeeded += 1
+                stats.products += len(result.products)
+            else:
+                stats.failed += 1
+                result.error = RuntimeError(f"{type(result.error).__name__}: {result.error}")
+            results.append(result)
+
+    stats.elapsed = time.perf_counter() - start
+    return results, stats
+
+
+def _worker_main(worker: int, shard: List[Tuple[int, str]], parser_class: Type[ProductParser],
+                 concurrency: int, parser_kwargs: Dict[str, Any]) -> Tuple[List[ParseResult], WorkerStats]:
+    """Точка входа процесса-воркера"""
+    return asyncio.run(_run_shard(worker, shard, parser_class, concurrency, parser_kwargs))
+
+
+def parse_sharded(urls: List[str], parser_class: Type[ProductParser] = AdvancedAmazonParser,
+                  workers: Optional[int] = None, concurrency: int = 2,
+                  **parser_kwargs) -> Tuple[List[ParseResult], List[WorkerStats]]:
+    """
+    Парсинг списка URL в нескольких процессах
+
+    Каждый процесс запускает свой браузер и обрабатывает свой шард
+    через parse_many. Результаты объединяются в родительском процессе.
+    Лимит запросов по доменам (rate_limiter или RATE_LIMIT класса)
+    делится между процессами, чтобы общий темп к домену не рос с их числом.
+
+    Args:
+        urls: Список URL для парсинга
+        parser_class: Класс парсера (должен быть доступен для импорта)
+        workers: Количество процессов (по умолчанию - число ядер)
+        concurrency: Одновременно открытых страниц в каждом процессе
+        **parser_kwargs: Параметры конструктора парсера
+
+    Returns:
+        Результаты по всем URL в исходном порядке и статистика воркеров
+    """
+    if not urls:
+        return [], []
+
+    workers = min(workers or os.cpu_count() or 1, len(urls))
+    shards = shard_urls(urls, workers)
+
+    limiter = parser_kwargs.get('rate_limiter')
+    if limiter is None and parser_class.RATE_LIMIT:
+        limiter = RateLimiter(*parser_class.RATE_LIMIT)
+
+    logger.info(f"Запускаем {len(shards)} процессов для {len(urls)} URL")
+
+    results: List[ParseResult] = []
+    stats: List[WorkerStats] = []
+
+    # spawn: в дочернем процессе не должно быть унаследованного состояния Playwright
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=len(shards), mp_context=context) as executor:
+        futures = {}
+        for worker, shard in enumerate(shards):
+            kwargs = parser_kwargs
+            if limiter:
+                # Своя доля лимита и свои слоты у каждого процесса
+                kwargs = dict(parser_kwargs, rate_limiter=limiter.for_workers(len(shards), worker))
+            future = executor.submit(_worker_main, worker, shard, parser_class, concurrency, kwargs)
+            futures[future] = (worker, shard)
+
+        for future in as_completed(futures):
+            worker, shard = futures[future]
+            try:
+                shard_results, shard_stats = future.result()
+            except Exception as e:
+                logger.error(f"Воркер {worker} завершился с ошибкой: {e}")
+                error = RuntimeError(f"{type(e).__name__}: {e}")
+                shard_results = [ParseResult(index, url, error=error) for index, url in shard]
+                shard_stats = WorkerStats(worker=worker, urls=len(shard), failed=len(shard), error=str(e))
+
+            results.extend(shard_results)
+            stats.append(shard_stats)
+            logger.info(
+                f"Воркер {worker}: {shard_stats.succeeded}/{shard_stats.urls} URL, "
+                f"{shard_stats.products} товаров за {shard_stats.elapsed:.1f} с"
+            )
+
+    results.sort(key=lambda result: result.index)
+    stats.sort(key=lambda item: item.worker)
+    return results, stats
+
+
+def merge_products(results: List[ParseResult]) -> List[Dict[str, str]]:
+    """
+    Объединение товаров из результатов в один список
+
+    Args:
+        results: Результаты parse_sharded
+
+    Returns:
+        Товары всех успешно обработанных URL в порядке URL
+    """
+    return [product for result in results if result.ok for product in result.products]
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    # Файл со списком URL (по одному на строку) или демонстрационный набор
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], encoding='utf-8') as f:
+            urls = [line.strip() for line in f if line.strip()]
+    else:
+        urls = [
+            "https://www.amazon.com/s?k=shoes",
+            "https://www.amazon.com/s?k=sneakers",
+            "https://www.amazon.com/s?k=boots",
+            "https://www.amazon.com/s?k=sandals"
+        ]
+
+    print(f"🚀 Многопроцессный парсинг {len(urls)} URL")
+    print("=" * 50)
+
+    results, stats = parse_sharded(urls, headless=True)
+    products = merge_products(results)
+
+    print(f"\n📊 Всего товаров: {len(products)}")
+    for item in stats:
+        print(f"   • Воркер {item.worker} (PID {item.pid}): {item.succeeded}/{item.urls} URL, "
+              f"{item.products} товаров, {item.elapsed:.1f} с")
+    for result in results:
+        if not result.ok:
+            print(f"   ❌ {result.url}: {result.error}")
@@ -4,15 +4,136 @@
 """
 
 import asyncio
-import re
-from typing import List, Dict, Optional, Any
-from playwright.async_api import async_playwright, Browser, Page
+import time
+import weakref
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, List, Dict, Optional, Any, Tuple, Set, Iterable, AsyncIterator, Iterator
+from urllib.parse import urljoin
 import logging
 
-# Настройка логирования
-logging.basicConfig(level=logging.INFO)
+from browser_pool import PagePool
+from static_parser import StaticProductParser
+from selector_cache import SelectorCache, selector_domain
+from readiness import ReadinessEngine
+from response_cache import ResponseCache
+from blocking import BlockingPolicy
+from rate_limiter import RateLimiter
+from session_store import Session, SessionStore, cookie_domain_pattern
+from prices import NO_PRICE, detect_currency, parse_price
+import metrics
+from metrics import MetricsRegistry, ParseMetrics
+from records import FALLBACK_ID, ProductBatch
+from scheduler import BlockedPageError
+
+if TYPE_CHECKING:
+    # Playwright импортируется при запуске браузера: статическому разбору
+    # и утилитам он не нужен
+    from playwright.async_api import Browser, BrowserContext, Page
+
 logger = logging.getLogger(__name__)
 
+# Победители селекторов страницы, которая сейчас разбирается в этой задаче:
+# поле -> (селекторы в порядке перебора, сколько карточек выиграл каждый)
+_page_winners: ContextVar[Optional[Dict[str, Tuple[List[str], Counter]]]] = ContextVar('page_winners', default=None)
+
+
+# JavaScript для пакетного извлечения данных всех карточек за один вызов
+# page.evaluate. Повторяет логику поэлементного пути: первый селектор
+# карточек, давший совпадения, значения атрибутов и тексты (innerText)
+# вложенных элементов по спискам селекторов. Нормализация цены и выбор
+# итоговых значений выполняются в Python, чтобы результат совпадал
+# с поэлементным извлечением.
+_BATCH_EXTRACT_JS = """
+({cardSelectors, spec, limit}) => {
+    let cards = [];
+    let matched = null;
+    for (const selector of cardSelectors) {
+        try {
+            const found = document.querySelectorAll(selector);
+            if (found.length) {
+                cards = Array.from(found);
+                matched = selector;
+                break;
+            }
+        } catch (e) {
+            continue;
+        }
+    }
+    const total = cards.length;
+    if (limit !== null) {
+        cards = cards.slice(0, limit);
+    }
+    const snapshots = cards.map((card) => {
+        const attributes = {};
+        for (const attr of spec.attributes) {
+            attributes[attr] = card.getAttribute(attr);
+        }
+        const nested = spec.nested.map(([selector, attr]) => {
+            try {
+                const el = card.querySelector(selector);
+                return el ? el.getAttribute(attr) : null;
+            } catch (e) {
+                return null;
+            }
+        });
+        const fields = {};
+        for (const [field, {selectors, stop}] of Object.entries(spec.fields)) {
+            const texts = [];
+            for (let i = 0; i < selectors.length; i++) {
+                let el = null;
+                try {
+                    el = card.querySelector(selectors[i]);
+                } catch (e) {
+                    continue;
+                }
+                if (!el) {
+                    continue;
+                }
+                const text = el.innerText;
+                texts.push([i, text]);
+                if (stop && text && text.trim()) {
+                    break;
+                }
+            }
+            fields[field] = texts;
+        }
+        return {attributes, nested, fields};
+    });
+    return {selector: matched, total, snapshots};
+}
+"""
+
+
+@dataclass
+class ParseResult:
+    """
+    Результат парсинга одного URL в parse_many
+    
+    Attributes:
+        index: Позиция URL во входном списке
+        url: URL страницы
+        products: Извлеченные товары
+        error: Исключение, если парсинг не удался
+        elapsed: Время обработки в секундах
+        metrics: Время по фазам и счетчики обработки
+        attempts: Количество попыток (больше 1 - при повторах CrawlScheduler)
+    """
+    index: int
+    url: str
+    products: List[Dict[str, str]] = field(default_factory=list)
+    error: Optional[BaseException] = None
+    elapsed: float = 0.0
+    metrics: Optional[ParseMetrics] = None
+    attempts: int = 1
+    
+    @property
+    def ok(self) -> bool:
+        """Успешно ли обработан URL"""
+        return self.error is None
+
 
 class ProductParser:
     """
@@ -22,78 +143,383 @@ class ProductParser:
     и извлечения информации о товарах с публичных страниц
     """
     
-    def __init__(self, headless: bool = True, timeout: int = 30000):
+    # Список возможных селекторов для товаров
+    # Можно настроить под конкретный сайт
+    PRODUCT_SELECTORS = [
+        '[data-testid*="product"]',
+        '.product',
+        '.item',
+        '[class*="product"]',
+        '[class*="item"]',
+        '.product-item',
+        '.product-card',
+        '.goods-item',
+        '.catalog-item'
+    ]
+    
+    # Селекторы ожидания загрузки товаров (объединяются в один)
+    CONTENT_SELECTORS = [
+        '[data-testid*="product"]',
+        '.product',
+        '.item',
+        '[class*="product"]',
+        '[class*="item"]'
+    ]
+    
+    # Бюджет ожидания товаров на страницу в секундах
+    CONTENT_DEADLINE = 10.0
+    
+    # Список возможных атрибутов для ID
+    ID_ATTRIBUTES = [
+        'data-id', 'data-product-id', 'data-item-id', 'id',
+        'data-sku', 'data-code', 'data-product-code'
+    ]
+    
+    NAME_SELECTORS = [
+        'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+        '.title', '.name', '.product-name', '.item-name',
+        '[class*="title"]', '[class*="name"]',
+        'a[title]', '[data-testid*="title"]', '[data-testid*="name"]'
+    ]
+    
+    PRICE_SELECTORS = [
+        '.price', '.cost', '.value', '.amount',
+        '[class*="price"]', '[class*="cost"]',
+        '[data-testid*="price"]', '[data-testid*="cost"]',
+        '.currency', '.money'
+    ]
+    
+    PRICE_ATTRIBUTES = ['data-price', 'data-cost', 'data-value', 'data-amount']
+    
+    # Ссылки на следующую страницу списка товаров
+    NEXT_PAGE_SELECTORS = [
+        'link[rel="next"]',
+        'a[rel="next"]',
+        '.pagination .next a',
+        '.pagination a.next',
+        'a.next',
+        'a[aria-label="Next"]',
+        'a[aria-label="Следующая страница"]'
+    ]
+    
+    # Признаки страницы блокировки или CAPTCHA: селекторы и фрагменты текста
+    # (проверяются, только если товары не найдены; пусто - не проверяется)
+    BLOCK_SELECTORS: List[str] = []
+    BLOCK_TEXTS: List[str] = []
+    
+    # Валюта цен без символа валюты (None - не определена)
+    DEFAULT_CURRENCY: Optional[str] = None
+    
+    # Лимит запросов к домену по умолчанию: (запросов в секунду, всплеск)
+    # (None - без ограничения)
+    RATE_LIMIT: Optional[Tuple[float, int]] = None
+    
+    # User-Agent для избежания блокировок
+    USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    
+    def __init__(self, headless: bool = True, timeout: int = 30000,
+                 extraction_mode: str = 'batch', pool_size: int = 1,
+                 max_navigations: int = 50, max_products: Optional[int] = None,
+                 backend: str = 'browser', selector_cache: Optional[SelectorCache] = None,
+                 readiness: Optional[ReadinessEngine] = None,
+                 response_cache: Optional[ResponseCache] = None,
+                 blocking: Optional[BlockingPolicy] = None,
+                 metrics_log: Optional[str] = None,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 browser_endpoint: Optional[str] = None,
+                 sessions: Optional[SessionStore] = None):
         """
         Инициализация парсера
         
         Args:
             headless: Запускать браузер в фоновом режиме
             timeout: Таймаут загрузки страницы в миллисекундах
+            extraction_mode: Режим извлечения данных: 'batch' - все карточки
+                за один вызов page.evaluate, 'element' - поэлементно
+            pool_size: Количество прогретых контекстов браузера
+            max_navigations: Навигаций на страницу до ее пересоздания
+            max_products: Максимум товаров с одной страницы в parse() (None - все)
+            backend: Способ загрузки страниц: 'browser' - Playwright,
+                'static' - HTTP/файл и lxml без браузера, 'auto' - сначала
+                статический разбор, браузер только если товары не найдены
+            selector_cache: Кэш сработавших селекторов по доменам; с ним
+                селектор-победитель пробуется первым
+            readiness: Ожидание готовности страницы (по умолчанию по
+                CONTENT_SELECTORS с бюджетом CONTENT_DEADLINE)
+            response_cache: Дисковый кэш ответов для браузера и статической
+                загрузки (в режиме replay_only - без сети)
+            blocking: Политика блокировки ресурсов (по умолчанию
+                _default_blocking(), False - ничего не блокировать)
+            metrics_log: Файл JSON lines, в который дописываются метрики
+                каждого вызова parse() (None - не писать)
+            rate_limiter: Лимит запросов по доменам, общий для всех страниц
+                пула (по умолчанию из RATE_LIMIT, False - без ограничения)
+            browser_endpoint: Адрес уже запущенного Chromium вместо своего:
+                http://host:9222 или ws://.../devtools/browser/... (CDP),
+                иначе ws://... сервера Playwright. Пул создает в нем свои
+                контексты и закрывает только их
+            sessions: Хранилище cookies и localStorage по доменам: сессия
+                загружается в контекст перед страницей домена, сохраняется
+                после успешной и сбрасывается после страницы блокировки
         """
+        if extraction_mode not in ('batch', 'element'):
+            raise ValueError(f"Неизвестный режим извлечения: {extraction_mode}")
+        self._check_backend(backend)
+        
         self.headless = headless
         self.timeout = timeout
-        self.browser: Optional[Browser] = None
+        self.extraction_mode = extraction_mode
+        self.pool_size = pool_size
+        self.max_navigations = max_navigations
+        self.max_products = max_products
+        self.backend = backend
+        self.selector_cache = selector_cache
+        self.readiness = readiness or ReadinessEngine(self.CONTENT_SELECTORS, deadline=self.CONTENT_DEADLINE)
+        self.response_cache = response_cache
+        self.blocking = self._default_blocking() if blocking is None else blocking
+        self.metrics_log = metrics_log
+        if rate_limiter is None and self.RATE_LIMIT:
+            rate_limiter = RateLimiter(*self.RATE_LIMIT)
+        self.rate_limiter = rate_limiter or None
+        self.browser_endpoint = browser_endpoint
+        self.sessions = sessions
+        # Начало загруженной сессии по доменам для каждого контекста пула
+        # (None - контекст начал с пустой сессией)
+        self._context_sessions: 'weakref.WeakKeyDictionary[Any, Dict[str, Optional[float]]]' = \
+            weakref.WeakKeyDictionary()
+        # Домены, чей localStorage восстанавливает скрипт инициализации контекста
+        self._context_scripts: 'weakref.WeakKeyDictionary[Any, Set[str]]' = weakref.WeakKeyDictionary()
+        # Накопленные метрики всех вызовов и метрики последнего из них
+        self.metrics = MetricsRegistry()
+        self.last_metrics: Optional[ParseMetrics] = None
+        self.browser: Optional['Browser'] = None
+        self.pool: Optional[PagePool] = None
+        self._browser_lock = asyncio.Lock()
         
     async def __aenter__(self):
         """Асинхронный контекстный менеджер - вход"""
-        await self._init_browser()
+        # В режимах 'static' и 'auto' браузер запускается только при необходимости
+        if self.backend == 'browser':
+            await self._ensure_browser()
         return self
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Асинхронный контекстный менеджер - выход"""
         await self._close_browser()
+        if self.selector_cache:
+            self.selector_cache.save()
     
     async def _init_browser(self):
         """Инициализация браузера Playwright"""
         try:
+            from playwright.async_api import async_playwright
+            
             self.playwright = await async_playwright().start()
-            self.browser = await self.playwright.chromium.launch(
-                headless=self.headless,
-                args=['--no-sandbox', '--disable-dev-shm-usage']
+            if self.browser_endpoint:
+                self.browser = await self._connect_browser(self.browser_endpoint)
+            else:
+                self.browser = await self.playwright.chromium.launch(
+                    headless=self.headless,
+                    args=['--no-sandbox', '--disable-dev-shm-usage']
+                )
+            self.pool = PagePool(
+                self.browser,
+                size=self.pool_size,
+                max_navigations=self.max_navigations,
+                context_options=self._context_options,
+                setup_context=self._configure_context
             )
+            await self.pool.start()
             logger.info("Браузер успешно инициализирован")
         except Exception as e:
             logger.error(f"Ошибка инициализации браузера: {e}")
             raise
     
+    async def _connect_browser(self, endpoint: str) -> 'Browser':
+        """
+        Подключение к запущенному браузеру
+        
+        Args:
+            endpoint: http(s)://... или ws://.../devtools/... - по CDP,
+                другой ws://... - к серверу Playwright
+            
+        Returns:
+            Подключенный браузер
+        """
+        chromium = self.playwright.chromium
+        if endpoint.startswith(('http://', 'https://')) or '/devtools/' in endpoint:
+            browser = await chromium.connect_over_cdp(endpoint, timeout=self.timeout)
+        else:
+            browser = await chromium.connect(endpoint, timeout=self.timeout)
+        logger.info(f"Подключились к браузеру {endpoint} (версия {browser.version})")
+        return browser
+    
+    async def _ensure_browser(self):
+        """Запуск браузера, если он еще не запущен или отключился"""
+        async with self._browser_lock:
+            if self.browser and not self.browser.is_connected():
+                logger.warning("Браузер отключился, перезапускаем")
+                await self._close_browser()
+            if not self.browser:
+                await self._init_browser()
+    
+    @staticmethod
+    def _check_backend(backend: str):
+        """Проверка названия способа загрузки страниц"""
+        if backend not in ('browser', 'static', 'auto'):
+            raise ValueError(f"Неизвестный способ загрузки: {backend}")
+    
     async def _close_browser(self):
         """Закрытие браузера"""
         try:
+            if self.pool:
+                await self.pool.close()
+                self.pool = None
             if self.browser:
-                await self.browser.close()
-            if hasattr(self, 'playwright'):
-                await self.playwright.stop()
+                browser, self.browser = self.browser, None
+                # Общий браузер не закрываем: свои контексты уже закрыл пул,
+                # соединение разрывается вместе с остановкой Playwright
+                if not self.browser_endpoint:
+                    await browser.close()
+            if getattr(self, 'playwright', None):
+                playwright, self.playwright = self.playwright, None
+                await playwright.stop()
             logger.info("Браузер закрыт")
         except Exception as e:
             logger.error(f"Ошибка закрытия браузера: {e}")
     
+    def _context_options(self) -> Dict[str, Any]:
+        """
+        Параметры нового контекста браузера для пула страниц
+        
+        Returns:
+            Аргументы для browser.new_context
+        """
+        return {'user_agent': self.USER_AGENT}
+    
+    async def _setup_context(self, context: 'BrowserContext'):
+        """
+        Разовая настройка нового контекста (маршруты, скрипты)
+        
+        Args:
+            context: Контекст браузера Playwright
+        """
+        pass
+    
+    def _default_blocking(self) -> Optional[BlockingPolicy]:
+        """
+        Политика блокировки ресурсов по умолчанию
+        
+        Returns:
+            Картинки, шрифты, медиа и рекламные домены не загружаются
+        """
+        return BlockingPolicy()
+    
+    async def _configure_context(self, context: 'BrowserContext'):
+        """
+        Настройка нового контекста пула: хук подкласса и общие маршруты
+        
+        Args:
+            context: Контекст браузера Playwright
+        """
+        await self._setup_context(context)
+        
+        # Общий маршрут регистрируется последним, поэтому проверяется первым;
+        # остальные запросы передаются маршрутам подкласса через fallback
+        if self.blocking or self.response_cache:
+            await context.route("**/*", self._handle_route)
+    
+    async def _handle_route(self, route: Any):
+        """
+        Единый обработчик запросов: блокировка, затем кэш ответов
+        
+        Args:
+            route: Маршрут Playwright
+        """
+        if self.blocking and await self.blocking.handle_route(route):
+            return
+        if self.response_cache:
+            await self.response_cache.handle_route(route)
+        else:
+            await route.fallback()
+    
+    def _report_blocking(self, page: 'Page', url: str):
+        """
+        Вывод статистики блокировок после обработки страницы
+        
+        Args:
+            page: Страница Playwright
+            url: URL страницы
+        """
+        if not self.blocking:
+            return
+        stats = self.blocking.pop_stats(page)
+        metrics.count(metrics.BLOCKED_REQUESTS, stats['blocked'])
+        metrics.count(metrics.BLOCKED_BYTES, stats['bytes_saved'])
+        if stats['blocked']:
+            logger.info(
+                f"Заблокировано запросов: {stats['blocked']} "
+                f"(~{stats['bytes_saved'] // 1024} КБ) на {url}"
+            )
+    
     def _extract_price(self, price_text: str) -> Optional[str]:
         """
         Извлечение и нормализация цены из текста
         
+        Разделители тысяч убираются, дробная часть отделяется точкой
+        ('$1,299.99' и '1 299,99 ₽' -> '1299.99'), у диапазона берется
+        нижняя граница.
+        
         Args:
             price_text: Сырой текст с ценой
             
         Returns:
             Нормализованная цена или None
         """
-        if not price_text:
-            return None
+        return parse_price(price_text)[0]
+    
+    @staticmethod
+    def _id_fields(product_id: Optional[str], index: int, fallback: str = '{}') -> Dict[str, Any]:
+        """
+        Поле ID товара: найденный ID или номер карточки с отметкой FALLBACK_ID
+        
+        Args:
+            product_id: ID с карточки (None или пустой - не найден)
+            index: Индекс товара на странице (с 0)
+            fallback: Шаблон ID по номеру карточки
             
-        # Удаляем все символы кроме цифр, точек, запятых и пробелов
-        cleaned = re.sub(r'[^\d.,\s]', '', price_text.strip())
+        Returns:
+            id и, для номера карточки, FALLBACK_ID
+        """
+        if product_id:
+            return {"id": product_id}
+        return {"id": fallback.format(index + 1), FALLBACK_ID: True}
+    
+    def _price_fields(self, price: Optional[str], price_text: Optional[str]) -> Dict[str, Any]:
+        """
+        Поля цены товара: строка, число и валюта
         
-        # Ищем числа с разделителями
-        price_match = re.search(r'[\d.,]+', cleaned)
-        if price_match:
-            price = price_match.group()
-            # Заменяем запятую на точку для унификации
-            price = price.replace(',', '.')
-            return price
+        Args:
+            price: Нормализованная цена (результат _extract_price)
+            price_text: Текст, из которого она извлечена
             
-        return None
+        Returns:
+            price (строка или 'Цена не указана'), price_value (float или None),
+            currency (код ISO 4217 или None)
+        """
+        if not price:
+            return {"price": NO_PRICE, "price_value": None, "currency": None}
+        try:
+            value = float(price)
+        except ValueError:
+            value = None
+        return {
+            "price": price,
+            "price_value": value,
+            "currency": detect_currency(price_text) or self.DEFAULT_CURRENCY
+        }
     
-    async def _extract_id(self, element: Any, page: Page) -> Optional[str]:
+    async def _extract_id(self, element: Any, page: 'Page') -> Optional[str]:
         """
         Извлечение ID товара из различных атрибутов
         
@@ -104,14 +530,9 @@ class ProductParser:
         Returns:
             ID товара или None
         """
-        # Список возможных атрибутов для ID
-        id_attributes = [
-            'data-id', 'data-product-id', 'data-item-id', 'id',
-            'data-sku', 'data-code', 'data-product-code'
-        ]
-        
-        for attr in id_attributes:
+        for attr in self.ID_ATTRIBUTES:
             try:
+                metrics.count(metrics.IPC_CALLS)
                 id_value = await element.get_attribute(attr)
                 if id_value and id_value.strip():
                     return id_value.strip()
@@ -120,7 +541,7 @@ class ProductParser:
                 
         return None
     
-    async def _wait_for_content(self, page: Page) -> bool:
+    async def _wait_for_content(self, page: 'Page') -> bool:
         """
         Ожидание загрузки контента товаров
         
@@ -130,108 +551,559 @@ class ProductParser:
         Returns:
             True если контент загружен, False иначе
         """
-        try:
-            # Ждем появления хотя бы одного товара
-            # Можно настроить под конкретный сайт
-            await page.wait_for_selector(
-                '[data-testid*="product"], .product, .item, [class*="product"], [class*="item"]',
-                timeout=10000
-            )
-            return True
-        except:
-            # Если не нашли товары, ждем общую загрузку
-            try:
-                await page.wait_for_load_state('networkidle', timeout=5000)
-                return True
-            except:
-                return False
+        # Ждем, пока число товаров перестанет меняться (или истечет бюджет)
+        with metrics.phase(metrics.WAIT):
+            state = await self.readiness.wait(page)
+        metrics.count(metrics.IPC_CALLS)
+        if not state['ready']:
+            logger.warning(f"Товары не появились за {self.readiness.deadline} с")
+        return state['ready']
     
-    async def parse(self, url: str) -> List[Dict[str, str]]:
+    async def parse(self, url: str, backend: Optional[str] = None) -> List[Dict[str, str]]:
         """
         Основной метод парсинга товаров
         
         Args:
             url: URL страницы с товарами
+            backend: Способ загрузки для этого URL (по умолчанию из конструктора)
             
         Returns:
             Список словарей с информацией о товарах
         """
-        if not self.browser:
-            await self._init_browser()
-            
-        products = []
+        try:
+            with self._collect_metrics(url):
+                return await self._parse_url(url, backend)
+        except Exception as e:
+            logger.error(f"Ошибка парсинга страницы {url}: {e}")
+            return []
+    
+    @contextmanager
+    def _collect_metrics(self, url: str) -> Iterator[ParseMetrics]:
+        """
+        Сбор метрик одного вызова с учетом в self.metrics и metrics_log
         
+        Args:
+            url: URL страницы
+            
+        Yields:
+            Метрики вызова (заполняются после выхода из блока)
+        """
+        collected = None
         try:
-            # Создаем новую страницу
-            page = await self.browser.new_page()
+            with metrics.collect(url) as collected:
+                yield collected
+        finally:
+            if collected is not None:
+                self.last_metrics = collected
+                self.metrics.observe(collected)
+                if self.metrics_log:
+                    try:
+                        metrics.write_jsonl(self.metrics_log, collected)
+                    except OSError as e:
+                        logger.warning(f"Не удалось записать метрики в {self.metrics_log}: {e}")
+    
+    async def parse_many(self, urls: Iterable[str], concurrency: int = 4) -> AsyncIterator[ParseResult]:
+        """
+        Параллельный парсинг нескольких URL в одном браузере
+        
+        Одновременно обрабатывается не более concurrency страниц.
+        Результаты отдаются по мере готовности, ошибки сохраняются
+        для каждого URL отдельно.
+        
+        Args:
+            urls: URL страниц с товарами
+            concurrency: Максимальное количество одновременно открытых страниц
             
-            # Устанавливаем User-Agent для избежания блокировок
-            await page.set_extra_http_headers({
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            })
+        Yields:
+            ParseResult для каждого URL в порядке завершения
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency должно быть не меньше 1")
+        
+        self.pool_size = max(self.pool_size, concurrency)
+        if self.pool:
+            self.pool.ensure_size(concurrency)
+        
+        semaphore = asyncio.Semaphore(concurrency)
+        results: asyncio.Queue = asyncio.Queue()
+        tasks = set()
+        
+        async def run(index: int, url: str):
+            try:
+                result = await self._parse_result(index, url)
+            finally:
+                semaphore.release()
+            await results.put(result)
+        
+        async def feed():
+            try:
+                for index, url in enumerate(urls):
+                    await semaphore.acquire()
+                    task = asyncio.create_task(run(index, url))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                if tasks:
+                    await asyncio.gather(*list(tasks))
+            finally:
+                await results.put(None)
+        
+        feeder = asyncio.create_task(feed())
+        try:
+            while True:
+                result = await results.get()
+                if result is None:
+                    break
+                yield result
+            await feeder
+        finally:
+            feeder.cancel()
+            for task in list(tasks):
+                task.cancel()
+    
+    async def parse_batch(self, urls: Iterable[str], concurrency: int = 4,
+                          category: Optional[str] = None) -> ProductBatch:
+        """
+        Параллельный парсинг нескольких URL в колоночный контейнер
+        
+        Для больших выборок: товары хранятся по колонкам, URL источника
+        и категория - один раз на страницу. URL с ошибкой пропускаются.
+        
+        Args:
+            urls: URL страниц с товарами
+            concurrency: Максимальное количество одновременно открытых страниц
+            category: Категория для всех товаров
             
-            logger.info(f"Загружаем страницу: {url}")
+        Returns:
+            Товары в порядке завершения страниц
+        """
+        batch = ProductBatch()
+        async for result in self.parse_many(urls, concurrency=concurrency):
+            if result.ok:
+                batch.extend(result.products, url=result.url, category=category)
+        return batch
+    
+    async def _parse_result(self, index: int, url: str, reserved: bool = False,
+                            attempt: int = 1) -> ParseResult:
+        """
+        Парсинг одного URL с сохранением ошибки в результате
+        
+        Args:
+            index: Позиция URL во входном списке
+            url: URL страницы с товарами
+            reserved: Токен лимита домена уже получен вызывающим (планировщиком)
+            attempt: Номер попытки (больше 1 - повтор CrawlScheduler)
             
-            # Переходим на страницу
-            await page.goto(url, timeout=self.timeout)
+        Returns:
+            Результат парсинга
+        """
+        start = time.perf_counter()
+        collected = None
+        try:
+            with self._collect_metrics(url) as collected:
+                if attempt > 1:
+                    # Считается до выхода из блока, чтобы попасть в self.metrics и metrics_log
+                    metrics.count(metrics.RETRIES)
+                products = await self._parse_url(url, reserved=reserved)
+            return ParseResult(index, url, products, elapsed=time.perf_counter() - start, metrics=collected,
+                               attempts=attempt)
+        except Exception as e:
+            logger.error(f"Ошибка парсинга страницы {url}: {e}")
+            return ParseResult(index, url, error=e, elapsed=time.perf_counter() - start, metrics=collected,
+                               attempts=attempt)
+    
+    async def _parse_url(self, url: str, backend: Optional[str] = None,
+                         reserved: bool = False) -> List[Dict[str, str]]:
+        """
+        Парсинг одной страницы без перехвата ошибок
+        
+        Args:
+            url: URL страницы с товарами
+            backend: Способ загрузки (по умолчанию из конструктора)
+            reserved: Токен лимита на первый запрос уже получен вызывающим
             
-            # Ждем загрузки контента
-            await self._wait_for_content(page)
-            
-            # Список возможных селекторов для товаров
-            # Можно настроить под конкретный сайт
-            product_selectors = [
-                '[data-testid*="product"]',
-                '.product',
-                '.item',
-                '[class*="product"]',
-                '[class*="item"]',
-                '.product-item',
-                '.product-card',
-                '.goods-item',
-                '.catalog-item'
-            ]
-            
-            product_elements = []
-            
-            # Пробуем найти товары по разным селекторам
-            for selector in product_selectors:
-                try:
-                    elements = await page.query_selector_all(selector)
-                    if elements:
-                        product_elements = elements
-                        logger.info(f"Найдено {len(elements)} товаров по селектору: {selector}")
-                        break
-                except Exception as e:
-                    logger.debug(f"Селектор {selector} не сработал: {e}")
-                    continue
+        Returns:
+            Список словарей с информацией о товарах
+        """
+        backend = backend or self.backend
+        self._check_backend(backend)
+        
+        if backend != 'browser' and not self._has_snapshot_extraction():
+            if backend == 'static':
+                raise ValueError(f"{type(self).__name__} не поддерживает статический разбор")
+            backend = 'browser'
+        
+        if backend != 'browser':
+            try:
+                if not reserved:
+                    await self._throttle(url)
+                # Загрузка в браузере после статической - второй запрос к сайту
+                reserved = False
+                products = await self._parse_static(url)
+            except Exception as e:
+                if backend == 'static':
+                    raise
+                logger.info(f"Статический разбор не удался ({e}), загружаем в браузере: {url}")
+                products = []
             
-            if not product_elements:
-                logger.warning("Товары не найдены на странице")
+            if products or backend == 'static':
+                metrics.count(metrics.PRODUCTS, len(products))
                 return products
+            logger.info(f"Статический разбор не нашел товаров, загружаем в браузере: {url}")
+            metrics.count(metrics.BACKEND_FALLBACKS)
+        
+        with metrics.phase(metrics.BROWSER_START):
+            await self._ensure_browser()
+        
+        # Ждем лимит домена до того, как занять страницу пула
+        if not reserved:
+            await self._throttle(url)
+        
+        # Берем прогретую страницу из пула
+        async with self.pool.page() as page:
+            page = await self._restore_session(page, url)
+            await self._load_page(page, url)
+            with metrics.phase(metrics.EXTRACTION):
+                products = await self._extract_products(page, self.max_products)
+            metrics.count(metrics.PRODUCTS, len(products))
+            self._report_blocking(page, url)
+            if not products:
+                reason = await self._detect_block(page)
+                if reason:
+                    await self._drop_session(page, url, reason)
+                    raise BlockedPageError(url, reason)
+            else:
+                await self._save_session(page, url)
+            return products
+    
+    async def _detect_block(self, page: 'Page') -> Optional[str]:
+        """
+        Проверка, не отдал ли сайт страницу блокировки или CAPTCHA
+        
+        Args:
+            page: Страница Playwright
             
-            # Извлекаем информацию о каждом товаре
-            for i, element in enumerate(product_elements):
-                try:
-                    product_data = await self._extract_product_data(element, page, i)
-                    if product_data:
-                        products.append(product_data)
-                except Exception as e:
-                    logger.error(f"Ошибка извлечения данных товара {i}: {e}")
-                    continue
+        Returns:
+            Сработавший признак из BLOCK_SELECTORS/BLOCK_TEXTS или None
+        """
+        if not self.BLOCK_SELECTORS and not self.BLOCK_TEXTS:
+            return None
+        metrics.count(metrics.IPC_CALLS)
+        try:
+            return await page.evaluate("""
+                ({selectors, texts}) => {
+                    for (const selector of selectors) {
+                        try {
+                            if (document.querySelector(selector)) {
+                                return selector;
+                            }
+                        } catch (e) {
+                            continue;
+                        }
+                    }
+                    const body = document.body ? document.body.innerText : '';
+                    return texts.find((text) => body.includes(text)) || null;
+                }
+            """, {'selectors': self.BLOCK_SELECTORS, 'texts': self.BLOCK_TEXTS})
+        except Exception as e:
+            logger.debug(f"Ошибка проверки страницы блокировки: {e}")
+            return None
+    
+    async def iter_products(self, url: str, max_pages: int = 10,
+                            max_items: Optional[int] = None) -> AsyncIterator[Dict[str, str]]:
+        """
+        Потоковый парсинг товаров с переходом по страницам списка
+        
+        Товары отдаются сразу после извлечения каждой страницы,
+        в памяти хранится только текущая страница.
+        
+        Args:
+            url: URL первой страницы с товарами
+            max_pages: Максимальное количество страниц
+            max_items: Максимальное количество товаров (None - без ограничения)
             
-            logger.info(f"Успешно извлечено {len(products)} товаров")
+        Yields:
+            Словари с информацией о товарах
+        """
+        await self._ensure_browser()
+        
+        yielded = 0
+        visited = set()
+        current_url = url
+        
+        async with self.pool.page() as page:
+            for page_number in range(1, max_pages + 1):
+                visited.add(current_url)
+                await self._throttle(current_url)
+                page = await self._restore_session(page, current_url)
+                await self._load_page(page, current_url)
+                
+                limit = None if max_items is None else max_items - yielded
+                products = await self._extract_products(page, limit)
+                self._report_blocking(page, current_url)
+                if not products:
+                    logger.info(f"Страница {page_number} без товаров, завершаем обход")
+                    return
+                await self._save_session(page, current_url)
+                
+                for product in products:
+                    yield product
+                    yielded += 1
+                
+                if max_items is not None and yielded >= max_items:
+                    return
+                
+                next_url = await self._next_page_url(page, current_url, page_number)
+                if not next_url or next_url in visited:
+                    return
+                
+                logger.info(f"Переходим на страницу {page_number + 1}: {next_url}")
+                current_url = next_url
+    
+    async def _restore_session(self, page: 'Page', url: str) -> 'Page':
+        """
+        Загрузка сохраненной сессии домена в контекст страницы
+        
+        Контекст, загрузивший сессию, которая с тех пор ротирована или
+        сброшена, сначала очищает cookies домена. Скрипт инициализации
+        с localStorage старой сессии удалить нельзя, поэтому такой
+        контекст пересоздается.
+        
+        Args:
+            page: Страница пула
+            url: URL, который будет загружен
             
+        Returns:
+            Страница для загрузки URL (новая, если контекст пересоздан)
+        """
+        domain = selector_domain(url)
+        if not self.sessions or domain == 'file':
+            return page
+        loaded = self._context_sessions.setdefault(page.context, {})
+        session = self.sessions.get(domain)
+        created = session.created if session else None
+        if domain in loaded and loaded[domain] == created:
+            return page
+        
+        if domain in self._context_scripts.get(page.context, ()):
+            # Сессии других доменов загрузятся в новый контекст заново
+            page = await self.pool.renew(page)
+            loaded = self._context_sessions.setdefault(page.context, {})
+            metrics.count(metrics.IPC_CALLS)
+        elif loaded.get(domain) is not None:
+            await page.context.clear_cookies(domain=cookie_domain_pattern(domain))
+            metrics.count(metrics.IPC_CALLS)
+        context = page.context
+        loaded[domain] = created
+        if session:
+            if session.cookies:
+                await context.add_cookies(session.cookies)
+            if session.origins:
+                await context.add_init_script(session.local_storage_script())
+                self._context_scripts.setdefault(context, set()).add(domain)
+            metrics.count(metrics.IPC_CALLS, 2)
+            metrics.count(metrics.SESSIONS_RESTORED)
+            logger.info(f"Сессия {domain} загружена ({len(session.cookies)} cookies)")
+        return page
+    
+    async def _save_session(self, page: 'Page', url: str):
+        """
+        Сохранение сессии домена после успешной страницы (не чаще refresh)
+        
+        Args:
+            page: Страница пула
+            url: URL загруженной страницы
+        """
+        domain = selector_domain(url)
+        if not self.sessions or domain == 'file' or not self.sessions.needs_save(domain):
+            return
+        loaded = self._context_sessions.setdefault(page.context, {})
+        try:
+            state = await page.context.storage_state()
         except Exception as e:
-            logger.error(f"Ошибка парсинга страницы {url}: {e}")
+            logger.debug(f"Не удалось получить сессию {domain}: {e}")
+            return
+        metrics.count(metrics.IPC_CALLS)
+        
+        session = Session.from_storage_state(domain, state, created=loaded.get(domain))
+        if not session.cookies and not session.origins:
+            return
+        try:
+            self.sessions.save(session)
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить сессию {domain}: {e}")
+            return
+        loaded[domain] = session.created
+    
+    async def _drop_session(self, page: 'Page', url: str, reason: str):
+        """
+        Сброс сессии домена после страницы блокировки
+        
+        Args:
+            page: Страница пула
+            url: URL заблокированной страницы
+            reason: Сработавший признак блокировки
+        """
+        domain = selector_domain(url)
+        if not self.sessions or domain == 'file':
+            return
+        self.sessions.invalidate(domain, f"страница блокировки ({reason})")
+        try:
+            await page.context.clear_cookies(domain=cookie_domain_pattern(domain))
+        except Exception as e:
+            logger.debug(f"Не удалось очистить cookies {domain}: {e}")
+        metrics.count(metrics.IPC_CALLS)
+        metrics.count(metrics.SESSIONS_DROPPED)
+        # Следующий _restore_session уберет и скрипт localStorage сброшенной сессии
+        self._context_sessions.setdefault(page.context, {}).pop(domain, None)
+    
+    def _active_rate_limiter(self) -> Optional[RateLimiter]:
+        """Лимит запросов, который действует сейчас (None - сайт не ограничивается)"""
+        if self.response_cache and self.response_cache.replay_only:
+            # Страницы берутся из кэша, сайт не запрашивается
+            return None
+        return self.rate_limiter
+    
+    async def _throttle(self, url: str):
+        """
+        Ожидание лимита запросов к домену перед загрузкой страницы
+        
+        Args:
+            url: URL страницы
+        """
+        limiter = self._active_rate_limiter()
+        if limiter is None:
+            return
+        with metrics.phase(metrics.RATE_LIMIT):
+            await limiter.acquire(url)
+    
+    async def _parse_static(self, url: str) -> List[Dict[str, str]]:
+        """
+        Парсинг страницы без браузера (HTTP или файл + lxml)
+        
+        Args:
+            url: URL или путь к сохраненной странице
             
-        finally:
-            if 'page' in locals():
-                await page.close()
-                
+        Returns:
+            Список словарей с информацией о товарах
+        """
+        static_parser = StaticProductParser(self, timeout=self.timeout / 1000)
+        return await asyncio.to_thread(static_parser.parse, url, self.max_products)
+    
+    async def _next_page_url(self, page: 'Page', url: str, page_number: int) -> Optional[str]:
+        """
+        Поиск URL следующей страницы списка
+        
+        Args:
+            page: Страница Playwright
+            url: URL текущей страницы
+            page_number: Номер текущей страницы (с 1)
+            
+        Returns:
+            Абсолютный URL следующей страницы или None
+        """
+        href = await page.evaluate("""
+            (selectors) => {
+                for (const selector of selectors) {
+                    try {
+                        const el = document.querySelector(selector);
+                        if (el && el.getAttribute('href')) {
+                            return el.getAttribute('href');
+                        }
+                    } catch (e) {
+                        continue;
+                    }
+                }
+                return null;
+            }
+        """, self.NEXT_PAGE_SELECTORS)
+        
+        if not href:
+            return None
+        return urljoin(page.url or url, href)
+    
+    async def _extract_products(self, page: 'Page', limit: Optional[int] = None) -> List[Dict[str, str]]:
+        """
+        Извлечение товаров загруженной страницы в выбранном режиме
+        
+        Args:
+            page: Страница Playwright
+            limit: Максимальное количество товаров
+            
+        Returns:
+            Список словарей с информацией о товарах
+        """
+        with self._learning_page(page.url):
+            if self._use_batch_extraction():
+                return await self._extract_products_batch(page, limit)
+            return await self._extract_products_by_element(page, limit)
+    
+    async def _load_page(self, page: 'Page', url: str):
+        """
+        Переход на страницу и ожидание загрузки товаров
+        
+        Args:
+            page: Страница Playwright
+            url: URL страницы с товарами
+        """
+        logger.info(f"Загружаем страницу: {url}")
+        
+        # Переходим на страницу
+        with metrics.phase(metrics.NAVIGATION):
+            await page.goto(url, timeout=self.timeout)
+        metrics.count(metrics.IPC_CALLS)
+        
+        # Ждем загрузки контента
+        await self._wait_for_content(page)
+    
+    async def _extract_products_by_element(self, page: 'Page', limit: Optional[int] = None) -> List[Dict[str, str]]:
+        """
+        Поэлементное извлечение товаров через ElementHandle
+        
+        Args:
+            page: Страница Playwright
+            limit: Максимальное количество товаров
+            
+        Returns:
+            Список словарей с информацией о товарах
+        """
+        products = []
+        product_elements = []
+        card_selectors = self._selectors_for(page.url, 'cards', self.PRODUCT_SELECTORS)
+        
+        # Пробуем найти товары по разным селекторам
+        for selector in card_selectors:
+            try:
+                metrics.count(metrics.SELECTOR_PROBES)
+                metrics.count(metrics.IPC_CALLS)
+                elements = await page.query_selector_all(selector)
+                if elements:
+                    metrics.count(metrics.SELECTOR_MATCHES)
+                    product_elements = elements
+                    self._learn_selector(page.url, 'cards', card_selectors, selector)
+                    logger.info(f"Найдено {len(elements)} товаров по селектору: {selector}")
+                    break
+            except Exception as e:
+                logger.debug(f"Селектор {selector} не сработал: {e}")
+                continue
+        
+        if not product_elements:
+            logger.warning("Товары не найдены на странице")
+            return products
+        
+        # Извлекаем информацию о каждом товаре
+        for i, element in enumerate(product_elements[:limit]):
+            try:
+                product_data = await self._extract_product_data(element, page, i)
+                if product_data:
+                    products.append(product_data)
+            except Exception as e:
+                logger.error(f"Ошибка извлечения данных товара {i}: {e}")
+                continue
+        
+        logger.info(f"Успешно извлечено {len(products)} товаров")
         return products
     
-    async def _extract_product_data(self, element: Any, page: Page, index: int) -> Optional[Dict[str, str]]:
+    async def _extract_product_data(self, element: Any, page: 'Page', index: int) -> Optional[Dict[str, str]]:
         """
         Извлечение данных конкретного товара
         
@@ -244,49 +1116,43 @@ class ProductParser:
             Словарь с данными товара или None
         """
         try:
-            # Извлекаем ID товара
-            product_id = await self._extract_id(element, page)
-            if not product_id:
-                product_id = str(index + 1)  # Fallback ID
+            # Извлекаем ID товара (номер карточки, если ID нет)
+            id_fields = self._id_fields(await self._extract_id(element, page), index)
+            product_id = id_fields["id"]
             
             # Извлекаем название товара
-            name = await self._extract_text_by_selectors(element, [
-                'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
-                '.title', '.name', '.product-name', '.item-name',
-                '[class*="title"]', '[class*="name"]',
-                'a[title]', '[data-testid*="title"]', '[data-testid*="name"]'
-            ])
+            name_selectors = self._selectors_for(page.url, 'name', self.NAME_SELECTORS)
+            name, selector = await self._find_text_by_selectors(element, name_selectors)
+            self._learn_selector(page.url, 'name', name_selectors, selector)
             
             if not name:
                 name = f"Товар {product_id}"
             
             # Извлекаем цену
-            price = await self._extract_text_by_selectors(element, [
-                '.price', '.cost', '.value', '.amount',
-                '[class*="price"]', '[class*="cost"]',
-                '[data-testid*="price"]', '[data-testid*="cost"]',
-                '.currency', '.money'
-            ])
+            price_selectors = self._selectors_for(page.url, 'price', self.PRICE_SELECTORS)
+            price_text, selector = await self._find_text_by_selectors(element, price_selectors)
+            self._learn_selector(page.url, 'price', price_selectors, selector)
             
-            price = self._extract_price(price) if price else None
+            price = self._extract_price(price_text) if price_text else None
             
             # Если цена не найдена, пробуем найти в data-атрибутах
             if not price:
-                price_attrs = ['data-price', 'data-cost', 'data-value', 'data-amount']
-                for attr in price_attrs:
+                for attr in self.PRICE_ATTRIBUTES:
                     try:
+                        metrics.count(metrics.IPC_CALLS)
                         price_value = await element.get_attribute(attr)
                         if price_value:
                             price = self._extract_price(price_value)
                             if price:
+                                price_text = price_value
                                 break
                     except:
                         continue
             
             return {
-                "id": product_id,
+                **id_fields,
                 "name": name.strip(),
-                "price": price or "Цена не указана"
+                **self._price_fields(price, price_text)
             }
             
         except Exception as e:
@@ -304,16 +1170,312 @@ class ProductParser:
         Returns:
             Найденный текст или None
         """
+        text, _ = await self._find_text_by_selectors(element, selectors)
+        return text
+    
+    async def _find_text_by_selectors(self, element: Any, selectors: List[str]) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Поиск текста по списку селекторов с указанием сработавшего
+        
+        Args:
+            element: Родительский элемент
+            selectors: Список CSS селекторов
+            
+        Returns:
+            Найденный текст и селектор (или None, None)
+        """
         for selector in selectors:
             try:
+                metrics.count(metrics.SELECTOR_PROBES)
+                metrics.count(metrics.IPC_CALLS)
                 sub_element = await element.query_selector(selector)
                 if sub_element:
+                    metrics.count(metrics.SELECTOR_MATCHES)
+                    metrics.count(metrics.IPC_CALLS)
                     text = await sub_element.inner_text()
                     if text and text.strip():
-                        return text.strip()
+                        return text.strip(), selector
             except:
                 continue
+        return None, None
+    
+    def _selectors_for(self, url: str, field: str, selectors: List[str]) -> List[str]:
+        """
+        Список селекторов поля с учетом кэша победителей для домена
+        
+        Args:
+            url: URL страницы
+            field: Название поля ('cards', 'name', 'price' ...)
+            selectors: Исходный список селекторов
+            
+        Returns:
+            Селекторы в порядке перебора
+        """
+        if not self.selector_cache:
+            return selectors
+        return self.selector_cache.order(selector_domain(url), field, selectors)
+    
+    def _learn_selector(self, url: str, field: str, selectors: List[str], winner: Optional[str]):
+        """
+        Запоминание сработавшего селектора
+        
+        Args:
+            url: URL страницы
+            field: Название поля
+            selectors: Селекторы в том порядке, в котором их перебирали
+            winner: Сработавший селектор (None - ни один)
+        """
+        if not self.selector_cache or not winner:
+            return
+        winners = _page_winners.get()
+        if winners is not None:
+            # Внутри _learning_page: учитывается один раз после разбора страницы
+            winners.setdefault(field, (selectors, Counter()))[1][winner] += 1
+            return
+        self.selector_cache.record(selector_domain(url), field, winner, selectors[0])
+    
+    @contextmanager
+    def _learning_page(self, url: str) -> Iterator[None]:
+        """
+        Учет селекторов страницы одним попаданием на поле
+        
+        Карточки страницы не учитываются по отдельности: победителем поля
+        считается селектор, сработавший на большинстве карточек (при
+        равенстве - первый по порядку перебора). Так max_misses в
+        SelectorCache - это страницы подряд, а не карточки.
+        
+        Args:
+            url: URL страницы
+        """
+        winners: Dict[str, Tuple[List[str], Counter]] = {}
+        token = _page_winners.set(winners)
+        try:
+            yield
+        finally:
+            _page_winners.reset(token)
+            for field, (selectors, counts) in winners.items():
+                winner = min(counts, key=lambda selector: (-counts[selector], selectors.index(selector)))
+                self._learn_selector(url, field, selectors, winner)
+    
+    def _learn_from_snapshots(self, url: str, card_selectors: List[str], matched: Optional[str],
+                              spec: Dict[str, Any], snapshots: List[Dict[str, Any]]):
+        """
+        Запоминание селекторов, сработавших при пакетном извлечении
+        
+        Победителем поля в карточке считается первый селектор с непустым
+        текстом, страница учитывается один раз (_learning_page). Заодно пробы селекторов учитываются в метриках вызова.
+        
+        Args:
+            url: URL страницы
+            card_selectors: Селекторы карточек в порядке перебора
+            matched: Сработавший селектор карточек
+            spec: Спецификация, по которой снимались карточки
+            snapshots: Снимки карточек
+        """
+        self._count_snapshot_probes(card_selectors, matched, spec, snapshots)
+        if not self.selector_cache:
+            return
+        
+        with self._learning_page(url):
+            self._learn_selector(url, 'cards', card_selectors, matched)
+            for snapshot in snapshots:
+                for field, options in spec['fields'].items():
+                    for index, text in snapshot['fields'][field]:
+                        if text and text.strip():
+                            self._learn_selector(url, field, options['selectors'], options['selectors'][index])
+                            break
+    
+    @staticmethod
+    def _count_snapshot_probes(card_selectors: List[str], matched: Optional[str],
+                               spec: Dict[str, Any], snapshots: List[Dict[str, Any]]):
+        """
+        Учет проб селекторов, выполненных при снятии карточек
+        
+        Снимок хранит только найденные элементы, поэтому число проб
+        восстанавливается по правилам _BATCH_EXTRACT_JS: перебор полей
+        с stop обрывается на первом непустом тексте.
+        
+        Args:
+            card_selectors: Селекторы карточек в порядке перебора
+            matched: Сработавший селектор карточек
+            spec: Спецификация, по которой снимались карточки
+            snapshots: Снимки карточек
+        """
+        if metrics.current() is None:
+            return
+        probes = card_selectors.index(matched) + 1 if matched in card_selectors else len(card_selectors)
+        matches = 1 if matched else 0
+        for snapshot in snapshots:
+            for field_name, options in spec['fields'].items():
+                entries = snapshot['fields'][field_name]
+                matches += len(entries)
+                last = entries[-1] if entries else None
+                if options['stop'] and last and last[1] and last[1].strip():
+                    probes += last[0] + 1
+                else:
+                    probes += len(options['selectors'])
+        metrics.count(metrics.SELECTOR_PROBES, probes)
+        metrics.count(metrics.SELECTOR_MATCHES, matches)
+    
+    def _has_snapshot_extraction(self) -> bool:
+        """
+        Проверка, совпадает ли извлечение товара с логикой снимков карточек
+        
+        Снимки (_product_from_snapshot) повторяют базовый _extract_product_data,
+        поэтому подклассы со своим извлечением работают только поэлементно.
+        
+        Returns:
+            True если товары можно строить из снимков карточек
+        """
+        return type(self)._extract_product_data is ProductParser._extract_product_data
+    
+    def _use_batch_extraction(self) -> bool:
+        """
+        Проверка, можно ли использовать пакетное извлечение
+        
+        Returns:
+            True если карточки извлекаются одним вызовом page.evaluate
+        """
+        return self.extraction_mode == 'batch' and self._has_snapshot_extraction()
+    
+    def _batch_spec(self, url: str = '') -> Dict[str, Any]:
+        """
+        Описание данных, которые нужно собрать с каждой карточки в браузере
+        
+        Args:
+            url: URL страницы (для порядка селекторов из кэша)
+            
+        Returns:
+            Спецификация для _BATCH_EXTRACT_JS
+        """
+        return {
+            'attributes': list(dict.fromkeys(self.ID_ATTRIBUTES + self.PRICE_ATTRIBUTES)),
+            'nested': [],
+            'fields': {
+                'name': {'selectors': self._selectors_for(url, 'name', self.NAME_SELECTORS), 'stop': True},
+                'price': {'selectors': self._selectors_for(url, 'price', self.PRICE_SELECTORS), 'stop': True},
+            },
+        }
+    
+    async def _snapshot_cards(self, page: 'Page', card_selectors: List[str],
+                              spec: Dict[str, Any],
+                              limit: Optional[int] = None) -> Tuple[Optional[str], int, List[Dict[str, Any]]]:
+        """
+        Сбор сырых данных всех карточек товаров за один вызов page.evaluate
+        
+        Args:
+            page: Страница Playwright
+            card_selectors: Селекторы карточек в порядке приоритета
+            spec: Спецификация атрибутов и текстов (см. _batch_spec)
+            limit: Максимальное количество карточек
+            
+        Returns:
+            Сработавший селектор, общее число карточек и их снимки
+        """
+        metrics.count(metrics.IPC_CALLS)
+        result = await page.evaluate(_BATCH_EXTRACT_JS, {
+            'cardSelectors': card_selectors,
+            'spec': spec,
+            'limit': limit,
+        })
+        return result['selector'], result['total'], result['snapshots']
+    
+    @staticmethod
+    def _first_text(entries: List[List[Any]]) -> Optional[str]:
+        """
+        Первый непустой текст из снимка карточки
+        
+        Аналог _extract_text_by_selectors для пакетного режима.
+        
+        Args:
+            entries: Пары [индекс селектора, текст]
+            
+        Returns:
+            Найденный текст или None
+        """
+        for _, text in entries:
+            if text and text.strip():
+                return text.strip()
         return None
+    
+    def _product_from_snapshot(self, snapshot: Dict[str, Any], index: int) -> Optional[Dict[str, str]]:
+        """
+        Построение словаря товара из снимка карточки
+        
+        Args:
+            snapshot: Снимок карточки из _snapshot_cards
+            index: Индекс товара (для fallback ID)
+            
+        Returns:
+            Словарь с данными товара
+        """
+        attributes = snapshot['attributes']
+        
+        product_id = None
+        for attr in self.ID_ATTRIBUTES:
+            id_value = attributes.get(attr)
+            if id_value and id_value.strip():
+                product_id = id_value.strip()
+                break
+        id_fields = self._id_fields(product_id, index)
+        product_id = id_fields["id"]
+        
+        name = self._first_text(snapshot['fields']['name'])
+        if not name:
+            name = f"Товар {product_id}"
+        
+        price_text = self._first_text(snapshot['fields']['price'])
+        price = self._extract_price(price_text) if price_text else None
+        
+        if not price:
+            for attr in self.PRICE_ATTRIBUTES:
+                price_value = attributes.get(attr)
+                if price_value:
+                    price = self._extract_price(price_value)
+                    if price:
+                        price_text = price_value
+                        break
+        
+        return {
+            **id_fields,
+            "name": name.strip(),
+            **self._price_fields(price, price_text)
+        }
+    
+    async def _extract_products_batch(self, page: 'Page', limit: Optional[int] = None) -> List[Dict[str, str]]:
+        """
+        Пакетное извлечение всех товаров страницы за один round trip
+        
+        Args:
+            page: Страница Playwright
+            limit: Максимальное количество товаров
+            
+        Returns:
+            Список словарей с информацией о товарах
+        """
+        card_selectors = self._selectors_for(page.url, 'cards', self.PRODUCT_SELECTORS)
+        spec = self._batch_spec(page.url)
+        selector, total, snapshots = await self._snapshot_cards(page, card_selectors, spec, limit)
+        self._learn_from_snapshots(page.url, card_selectors, selector, spec, snapshots)
+        
+        if not snapshots:
+            logger.warning("Товары не найдены на странице")
+            return []
+        
+        logger.info(f"Найдено {total} товаров по селектору: {selector}")
+        
+        products = []
+        for i, snapshot in enumerate(snapshots):
+            try:
+                product_data = self._product_from_snapshot(snapshot, i)
+                if product_data:
+                    products.append(product_data)
+            except Exception as e:
+                logger.error(f"Ошибка извлечения данных товара {i}: {e}")
+                continue
+        
+        logger.info(f"Успешно извлечено {len(products)} товаров")
+        return products
 
 
 # Синхронная обертка для удобства использования
@@ -336,6 +1498,8 @@ def parse_products(url: str, headless: bool = True) -> List[Dict[str, str]]:
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    
     # Пример использования
     print("=== Универсальный парсер товаров ===")
     print("Введите URL сайта с товарами (или нажмите Enter для тестового URL):")
@@ -0,0 +1,530 @@
+"""
+Хранилище товаров в SQLite: дельта-обход, история цен и запросы для отчетов
+Повторный обход отдает только новые, измененные и исчезнувшие товары
+"""
+
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from records import FALLBACK_ID
+
+logger = logging.getLogger(__name__)
+
+# Виды изменений
+NEW = 'new'
+CHANGED = 'changed'
+GONE = 'gone'
+
+
+def content_hash(product: Dict[str, Any]) -> str:
+    """
+    Хэш содержимого товара (название и цена)
+
+    Args:
+        product: Словарь товара
+
+    Returns:
+        SHA-1 в шестнадцатеричном виде
+    """
+    content = f"{product.get('name', '')}\0{product.get('price', '')}"
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+@dataclass
+class ProductChange:
+    """
+    Изменение товара между обходами
+
+    Attributes:
+        seq: Порядковый номер изменения в хранилище
+        kind: 'new', 'changed' или 'gone'
+        id: ID товара (ASIN для Amazon)
+        url: Страница списка, на которой найден товар
+        name: Название
+        price: Цена (для исчезнувшего - последняя известная)
+        old_price: Прежняя цена (для измененного)
+        at: Время обнаружения (unix time)
+    """
+    seq: int
+    kind: str
+    id: str
+    url: str
+    name: str
+    price: Optional[str]
+    old_price: Optional[str]
+    at: float
+
+
+# Схема базы; номер версии хранится в PRAGMA user_version
+SCHEMA_VERSION = 3
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS products ('
+    ' id TEXT PRIMARY KEY, url TEXT, name TEXT, price TEXT, price_value REAL,'
+    ' currency TEXT, hash TEXT, first_seen REAL, updated REAL, gone INTEGER DEFAULT 0);'
+    'CREATE TABLE IF NOT EXISTS changes ('
+    ' seq INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT, id TEXT, url TEXT,'
+    ' name TEXT, price TEXT, old_price TEXT, at REAL);'
+    'CREATE TABLE IF NOT EXISTS price_history ('
+    ' id TEXT, url TEXT, price TEXT, price_value REAL, currency TEXT, at REAL);'
+    'CREATE TABLE IF NOT EXISTS crawls (url TEXT, at REAL, products INTEGER);'
+    'CREATE INDEX IF NOT EXISTS products_url ON products (url, gone);'
+    'CREATE INDEX IF NOT EXISTS products_updated ON products (updated);'
+    'CREATE INDEX IF NOT EXISTS changes_at ON changes (at);'
+    'CREATE INDEX IF NOT EXISTS changes_id ON changes (id, seq);'
+    'CREATE INDEX IF NOT EXISTS price_history_id ON price_history (id, at);'
+    'CREATE INDEX IF NOT EXISTS price_history_url ON price_history (url, at);'
+    'CREATE INDEX IF NOT EXISTS price_history_at ON price_history (at);'
+    'CREATE INDEX IF NOT EXISTS crawls_url ON crawls (url, at);'
+)
+
+
+class ProductStore:
+    """
+    Товары по ID с хэшем содержимого, журналом изменений и историей цен (SQLite)
+
+    Каждый обход страницы списка сравнивается с ее предыдущим обходом:
+    в базу пишутся только отличающиеся товары, поэтому объем записи
+    и журнал изменений растут с числом изменений, а не с размером каталога.
+    База работает в режиме WAL: отчеты читают ее во время записи обхода.
+    """
+
+    def __init__(self, path: str = 'products.sqlite'):
+        """
+        Инициализация хранилища
+
+        Args:
+            path: Путь к файлу базы
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        # В WAL достаточно: после сбоя теряется максимум последняя транзакция
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._migrate()
+
+    def _migrate(self):
+        """Создание и обновление схемы базы"""
+        version = self._db.execute('PRAGMA user_version').fetchone()[0]
+        if version < 2:
+            tables = {row[0] for row in self._db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            if 'crawls' in tables:
+                # В версии 1 хранился только последний обход каждой страницы
+                self._db.execute('ALTER TABLE crawls RENAME TO crawls_v1')
+                self._db.executescript(_SCHEMA)
+                self._db.execute('INSERT INTO crawls SELECT url, at, products FROM crawls_v1')
+                self._db.execute('DROP TABLE crawls_v1')
+                # Индекс по url расширен до (url, gone)
+                self._db.execute('DROP INDEX IF EXISTS products_url')
+        self._db.executescript(_SCHEMA)
+        if version < 3:
+            # Базы версии 1 (и перенесенные из нее в версию 2) не имели истории цен:
+            # текущая цена товара становится ее первой записью, со временем
+            # последнего изменения товара по журналу
+            self._db.execute(
+                'INSERT INTO price_history (id, url, price, price_value, currency, at)'
+                ' SELECT p.id, p.url, p.price, p.price_value, p.currency, COALESCE('
+                "  (SELECT MAX(c.at) FROM changes c WHERE c.id = p.id AND c.kind IN ('new', 'changed')),"
+                '  p.first_seen)'
+                ' FROM products p'
+                ' WHERE NOT EXISTS (SELECT 1 FROM price_history h WHERE h.id = p.id)'
+            )
+        self._db.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        self._db.commit()
+
+    def sync(self, url: str, products: List[Dict[str, Any]], at: Optional[float] = None) -> List[ProductChange]:
+        """
+        Сравнение обхода страницы с сохраненным состоянием
+
+        Товары, которые раньше были на этой странице, а теперь нет,
+        отмечаются исчезнувшими. Пустой обход исчезновений не создает:
+        скорее всего страница не загрузилась. Товары с ID по номеру
+        карточки (отмечены парсером FALLBACK_ID) не сохраняются: по ним нельзя
+        узнать тот же товар в следующем обходе.
+
+        Args:
+            url: Страница списка
+            products: Товары, извлеченные из нее
+            at: Время обхода (по умолчанию - текущее)
+
+        Returns:
+            Новые, измененные и исчезнувшие товары
+        """
+        return self.sync_many([(url, products)], at)
+
+    def sync_many(self, crawls: Iterable[Tuple[str, List[Dict[str, Any]]]],
+                  at: Optional[float] = None) -> List[ProductChange]:
+        """
+        Сохранение обходов нескольких страниц одной транзакцией
+
+        Args:
+            crawls: Пары (страница списка, товары)
+            at: Время обхода (по умолчанию - текущее)
+
+        Returns:
+            Изменения по всем страницам
+        """
+        at = at or time.time()
+        changes = []
+        with self._lock:
+            try:
+                for url, products in crawls:
+                    changes.extend(self._sync_page(url, products, at))
+                self._db.commit()
+            except BaseException:
+                self._db.rollback()
+                raise
+        return changes
+
+    def _sync_page(self, url: str, products: List[Dict[str, Any]], at: float) -> List[ProductChange]:
+        """Сравнение одной страницы (под блокировкой, без commit)"""
+        current = {}
+        positional = 0
+        for product in products:
+            # Номер карточки: на других страницах и сайтах под ним другие товары
+            if product.get(FALLBACK_ID):
+                positional += 1
+                continue
+            current[str(product['id'])] = product
+        if positional:
+            logger.info(f"{url}: товаров без постоянного ID не сохранено: {positional}")
+
+        known = {}
+        ids = list(current)
+        # Пачками: у SQLite ограничено число параметров запроса
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            for row in self._db.execute(
+                'SELECT id, hash, price, gone, url FROM products WHERE id IN ('
+                + ','.join('?' * len(chunk)) + ')', chunk
+            ):
+                known[row[0]] = row[1:]
+
+        pending = []
+        upserts = []
+        history = []
+        moved = []
+        for product_id, product in current.items():
+            digest = content_hash(product)
+            previous = known.get(product_id)
+            if previous is None or previous[2]:
+                kind, old_price = NEW, None
+            elif previous[0] != digest:
+                kind, old_price = CHANGED, previous[1]
+            else:
+                if previous[3] != url:
+                    # Товар переместился на другую страницу списка
+                    moved.append((url, product_id))
+                continue
+
+            price = product.get('price')
+            upserts.append((product_id, url, product.get('name'), price, product.get('price_value'),
+                            product.get('currency'), digest, at, at))
+            if kind == NEW or price != old_price:
+                history.append((product_id, url, price, product.get('price_value'), product.get('currency'), at))
+            pending.append((kind, product_id, url, product.get('name'), price, old_price, at))
+
+        self._db.executemany(
+            'INSERT INTO products (id, url, name, price, price_value, currency, hash, first_seen, updated, gone)'
+            ' VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)'
+            ' ON CONFLICT(id) DO UPDATE SET url = excluded.url, name = excluded.name,'
+            ' price = excluded.price, price_value = excluded.price_value,'
+            ' currency = excluded.currency, hash = excluded.hash,'
+            ' updated = excluded.updated, gone = 0',
+            upserts
+        )
+        self._db.executemany('UPDATE products SET url = ? WHERE id = ?', moved)
+        self._db.executemany('INSERT INTO price_history VALUES (?, ?, ?, ?, ?, ?)', history)
+
+        if current:
+            gone = [
+                (product_id, name, price)
+                for product_id, name, price in self._db.execute(
+                    'SELECT id, name, price FROM products WHERE url = ? AND gone = 0', (url,)
+                )
+                if product_id not in current
+            ]
+            self._db.executemany(
+                'UPDATE products SET gone = 1, updated = ? WHERE id = ?',
+                [(at, product_id) for product_id, _, _ in gone]
+            )
+            pending.extend((GONE, product_id, url, name, price, None, at) for product_id, name, price in gone)
+        elif not positional:
+            logger.warning(f"Пустой обход {url}: исчезновения товаров не фиксируются")
+
+        changes = []
+        for change in pending:
+            cursor = self._db.execute(
+                'INSERT INTO changes (kind, id, url, name, price, old_price, at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                change
+            )
+            changes.append(ProductChange(cursor.lastrowid, *change))
+
+        self._db.execute('INSERT INTO crawls (url, at, products) VALUES (?, ?, ?)', (url, at, len(current)))
+
+        counts = {kind: sum(1 for change in changes if change.kind == kind) for kind in (NEW, CHANGED, GONE)}
+        logger.info(
+            f"{url}: новых {counts[NEW]}, измененных {counts[CHANGED]}, исчезнувших {counts[GONE]}, "
+            f"без изменений {len(current) - counts[NEW] - counts[CHANGED]}"
+        )
+        return changes
+
+    def _query(self, sql: str, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        """Выполнение запроса, строки - словари"""
+        with self._lock:
+            cursor = self._db.execute(sql, params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def price_history(self, product_id: str) -> List[Dict[str, Any]]:
+        """
+        История цены товара
+
+        Args:
+            product_id: ID товара (ASIN)
+
+        Returns:
+            Записи price, price_value, currency, url, at по времени
+        """
+        return self._query(
+            'SELECT price, price_value, currency, url, at FROM price_history WHERE id = ? ORDER BY at',
+            (product_id,)
+        )
+
+    def products(self, url: Optional[str] = None, since: Optional[float] = None,
+                 until: Optional[float] = None, include_gone: bool = False) -> List[Dict[str, Any]]:
+        """
+        Товары, найденные на страницах за период
+
+        Товар попадает в выборку, если его страница обходилась в этот период
+        и товар был на ней (появился до конца периода и не исчез до начала).
+
+        Args:
+            url: Страница списка (None - все страницы)
+            since: Начало периода (unix time, None - без ограничения)
+            until: Конец периода (unix time, None - без ограничения)
+            include_gone: Включать товары, исчезнувшие к текущему моменту
+
+        Returns:
+            Строки таблицы products
+        """
+        since = since if since is not None else 0.0
+        until = until if until is not None else float('inf')
+        conditions = ['p.first_seen <= ?', '(p.gone = 0 OR p.updated >= ?)']
+        params: List[Any] = [until, since]
+        if url is not None:
+            conditions.append('p.url = ?')
+            params.append(url)
+        if not include_gone:
+            conditions.append('p.gone = 0')
+        conditions.append('p.url IN (SELECT url FROM crawls WHERE at >= ? AND at <= ?)')
+        params.extend([since, until])
+        return self._query(
+            'SELECT p.id, p.url, p.name, p.price, p.price_value, p.currency, p.first_seen, p.updated, p.gone'
+            ' FROM products p WHERE ' + ' AND '.join(conditions) + ' ORDER BY p.url, p.first_seen',
+            params
+        )
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Сводка по базе
+
+        Returns:
+            total, active, gone, with_price, urls, crawls, first_crawl, last_crawl
+        """
+        stats = self._query(
+            'SELECT COUNT(*) AS total, COALESCE(SUM(gone = 0), 0) AS active,'
+            ' COALESCE(SUM(gone), 0) AS gone,'
+            ' COALESCE(SUM(gone = 0 AND price_value IS NOT NULL), 0) AS with_price,'
+            ' COUNT(DISTINCT url) AS urls FROM products'
+        )[0]
+        stats.update(self._query(
+            'SELECT COUNT(*) AS crawls, MIN(at) AS first_crawl, MAX(at) AS last_crawl FROM crawls'
+        )[0])
+        return stats
+
+    def sources(self) -> List[Dict[str, Any]]:
+        """
+        Страницы списков с числом товаров и временем последнего обхода
+
+        Returns:
+            Записи url, products, last_crawl (по url)
+        """
+        return self._query(
+            'SELECT p.url, COUNT(*) AS products,'
+            ' (SELECT MAX(c.at) FROM crawls c WHERE c.url = p.url) AS last_crawl'
+            ' FROM products p WHERE p.gone = 0 GROUP BY p.url ORDER BY p.url'
+        )
+
+    def changes_since(self, since: float = 0.0, after_seq: int = 0,
+                      kinds: Iterable[str] = (NEW, CHANGED, GONE)) -> List[ProductChange]:
+        """
+        Журнал изменений
+
+        Args:
+            since: Время (unix time), начиная с которого нужны изменения
+            after_seq: Номер последнего уже обработанного изменения
+            kinds: Виды изменений
+
+        Returns:
+            Изменения в порядке обнаружения
+        """
+        kinds = list(kinds)
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT seq, kind, id, url, name, price, old_price, at FROM changes'
+                ' WHERE at >= ? AND seq > ? AND kind IN (' + ','.join('?' * len(kinds)) + ') ORDER BY seq',
+                [since, after_seq] + kinds
+            ).fetchall()
+        return [ProductChange(*row) for row in rows]
+
+    def last_seq(self) -> int:
+        """Номер последнего изменения (0 - изменений нет)"""
+        with self._lock:
+            row = self._db.execute('SELECT MAX(seq) FROM changes').fetchone()
+        return row[0] or 0
+
+    def close(self):
+        """Закрытие базы"""
+        with self._lock:
+            self._db.close()
+
+
+def save_products(crawls: Iterable[Tuple[str, List[Dict[str, Any]]]],
+                  path: str = 'products.sqlite') -> List[ProductChange]:
+    """
+    Сохранение результатов парсинга в базу товаров одной транзакцией
+
+    Ошибка базы не прерывает экспорт, а только пишется в лог.
+
+    Args:
+        crawls: Пары (страница списка, товары)
+        path: Путь к файлу базы
+
+    Returns:
+        Изменения относительно прошлых обходов (пустой список при ошибке)
+    """
+    try:
+        store = ProductStore(path)
+        try:
+            return store.sync_many(crawls)
+        finally:
+            store.close()
+    except sqlite3.Error as e:
+        logger.warning(f"Не удалось сохранить товары в {path}: {e}")
+        return []
+
+
+def export_changes(changes: Iterable[ProductChange], filename: str, format: Optional[str] = None) -> int:
+    """
+    Экспорт изменений в файл
+
+    Args:
+        changes: Изменения (например, store.changes_since(...))
+        filename: Имя файла
+        format: Формат экспорта (по умолчанию по расширению файла)
+
+    Returns:
+        Количество записанных изменений
+    """
+    from datetime import datetime
+    from exporters import export_products
+
+    kinds = {NEW: 'Новый', CHANGED: 'Изменен', GONE: 'Исчез'}
+    stats = export_products(
+        filename,
+        (asdict(change) for change in changes),
+        columns=[
+            ('№', 8, 'int'),
+            ('Изменение', 12),
+            ('ID товара', 15),
+            ('Название товара', 60),
+            ('Цена', 15),
+            ('Прежняя цена', 15),
+            ('URL источника', 30),
+            ('Дата', 20)
+        ],
+        row=lambda number, change: [
+            number, kinds[change['kind']], change['id'], change['name'], change['price'],
+            change['old_price'], change['url'],
+            datetime.fromtimestamp(change['at']).strftime("%Y-%m-%d %H:%M:%S")
+        ],
+        sheet_name='Изменения',
+        format=format
+    )
+    return stats.total
+
+
+async def crawl_changes(parser: Any, urls: Iterable[str], store: ProductStore,
+                        concurrency: int = 4) -> AsyncIterator[ProductChange]:
+    """
+    Обход URL с выдачей только изменений
+
+    URL с ошибкой пропускаются и не приводят к исчезновению товаров.
+
+    Args:
+        parser: Открытый парсер (async with ...)
+        urls: Страницы списков
+        store: Хранилище товаров
+        concurrency: Одновременно загружаемых страниц
+
+    Yields:
+        Новые, измененные и исчезнувшие товары
+    """
+    async for result in parser.parse_many(urls, concurrency=concurrency):
+        if not result.ok:
+            logger.warning(f"Пропускаем {result.url}: {result.error}")
+            continue
+        changes = await asyncio.to_thread(store.sync, result.url, result.products)
+        for change in changes:
+            yield change
+
+
+async def _main(urls: List[str]):
+    """Дельта-обход с экспортом изменений"""
+    from datetime import datetime
+    from amazon_advanced import AdvancedAmazonParser
+
+    store = ProductStore()
+    start_seq = store.last_seq()
+    counts = {NEW: 0, CHANGED: 0, GONE: 0}
+
+    print(f"🚀 Дельта-обход {len(urls)} URL")
+    print("=" * 50)
+
+    async with AdvancedAmazonParser(headless=True) as parser:
+        async for change in crawl_changes(parser, urls, store):
+            counts[change.kind] += 1
+
+    print(f"🆕 Новых: {counts[NEW]}")
+    print(f"✏️ Измененных: {counts[CHANGED]}")
+    print(f"🗑️ Исчезнувших: {counts[GONE]}")
+
+    if sum(counts.values()):
+        filename = f"amazon_changes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        export_changes(store.changes_since(after_seq=start_seq), filename)
+        print(f"📊 Изменения экспортированы в: {filename}")
+    else:
+        print("✅ Изменений нет")
+    store.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    # Файл со списком URL (по одному на строку) или демонстрационный набор
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], encoding='utf-8') as f:
+            urls = [line.strip() for line in f if line.strip()]
+    else:
+        urls = ["https://www.amazon.com/s?k=shoes"]
+
+    asyncio.run(_main(urls))
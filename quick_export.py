@@ -2,20 +2,26 @@
 Быстрый экспорт данных парсера в Excel
 """
 
-import pandas as pd
 from amazon_advanced import AdvancedAmazonParser
+from exporters import export_products, export_filename
 import asyncio
+import logging
 from datetime import datetime
 import os
 
 
-async def quick_export(url: str = "https://www.amazon.com/s?k=shoes"):
+async def quick_export(url: str = "https://www.amazon.com/s?k=shoes", format: str = 'xlsx',
+                       database: str = None):
     """
-    Быстрый экспорт в Excel
+    Быстрый экспорт в Excel (или CSV, JSONL, Parquet)
+    
+    Args:
+        url: URL для парсинга
+        format: Формат файла
+        database: База товаров для истории цен (None - не сохранять)
     """
     
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"amazon_products_{timestamp}.xlsx"
+    filename = export_filename("amazon_products", format)
     
     print(f"🚀 Быстрый экспорт: {url}")
     print(f"📊 Файл: {filename}")
@@ -30,26 +36,28 @@ async def quick_export(url: str = "https://www.amazon.com/s?k=shoes"):
             print("❌ Товары не найдены")
             return None
         
-        # Создаем DataFrame
-        df = pd.DataFrame(products)
-        df['Дата'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        df['№'] = range(1, len(df) + 1)
-        
-        # Переупорядочиваем колонки
-        df = df[['№', 'id', 'name', 'price', 'Дата']]
-        df.columns = ['№', 'ID товара', 'Название', 'Цена', 'Дата парсинга']
-        
-        # Экспортируем в Excel
-        with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Товары', index=False)
+        # История цен копится в базе товаров, если она указана
+        if database:
+            from product_store import save_products
             
-            # Настраиваем ширину колонок
-            worksheet = writer.sheets['Товары']
-            worksheet.column_dimensions['A'].width = 8   # №
-            worksheet.column_dimensions['B'].width = 15  # ID
-            worksheet.column_dimensions['C'].width = 80  # Название
-            worksheet.column_dimensions['D'].width = 20  # Цена
-            worksheet.column_dimensions['E'].width = 20  # Дата
+            save_products([(url, products)], database)
+        
+        # Экспортируем построчно
+        parsed_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        export_products(
+            filename,
+            products,
+            columns=[
+                ('№', 8, 'int'),
+                ('ID товара', 15),
+                ('Название', 80),
+                ('Цена', 20),
+                ('Дата парсинга', 20)
+            ],
+            row=lambda number, product: [
+                number, product['id'], product['name'], product['price'], parsed_at
+            ]
+        )
         
         print(f"✅ Готово! Файл: {filename}")
         print(f"📁 Путь: {os.path.abspath(filename)}")
@@ -68,6 +76,8 @@ async def quick_export(url: str = "https://www.amazon.com/s?k=shoes"):
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    
     print("📊 Быстрый экспорт в Excel")
     print("=" * 30)
     
@@ -0,0 +1,252 @@
+"""
+Ограничение частоты запросов по доменам (token bucket)
+Общий лимит для всех страниц парсера и всех процессов обхода
+"""
+
+import asyncio
+import logging
+import math
+import time
+from typing import Dict, Optional, Tuple, Union
+
+from selector_cache import selector_domain
+
+logger = logging.getLogger(__name__)
+
+# Лимит домена: запросов в секунду или (запросов в секунду, размер всплеска)
+DomainRate = Union[float, Tuple[float, int]]
+
+
+class TokenBucket:
+    """
+    Корзина токенов: rate запросов в секунду, до burst запросов подряд
+
+    Токены резервируются сразу (баланс может уйти в минус), поэтому
+    одновременные запросы получают задержки по очереди без блокировок.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Args:
+            rate: Запросов в секунду
+            burst: Размер корзины (запросов подряд без ожидания)
+        """
+        if rate <= 0:
+            raise ValueError("rate должен быть больше 0")
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        """Пополнение токенов за прошедшее время"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """
+        Сколько ждать следующего токена (без резервирования)
+
+        Returns:
+            0 если токен есть, иначе секунды
+        """
+        self._refill(time.monotonic())
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def reserve(self) -> float:
+        """
+        Резервирование токена
+
+        Returns:
+            Сколько ждать до использования токена в секундах
+        """
+        self._refill(time.monotonic())
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class SlotBucket:
+    """
+    Расписание запросов одного из нескольких процессов с общим лимитом
+
+    Время делится на слоты по 1 / (rate * slots) секунд, процесс slot
+    запрашивает домен только в начале каждого slots-го слота. Слоты
+    процессов не пересекаются (часы у процессов общие), поэтому вместе
+    они делают не больше одного запроса за слот: для лимитов, всплеск
+    которых меньше числа процессов, корзины по процессам этого не дают.
+    """
+
+    def __init__(self, rate: float, slot: int, slots: int):
+        """
+        Args:
+            rate: Запросов в секунду для этого процесса
+            slot: Номер процесса (с 0)
+            slots: Количество процессов
+        """
+        if rate <= 0:
+            raise ValueError("rate должен быть больше 0")
+        self.period = 1 / rate
+        self.width = self.period / slots
+        self.offset = (slot % slots) * self.width
+        self.next_free = 0.0
+
+    def _next_slot(self, now: float) -> float:
+        """Начало ближайшего свободного слота процесса (текущий - если не прошло полслота)"""
+        start = max(now, self.next_free)
+        return self.offset + math.ceil((start - self.offset - self.width / 2) / self.period) * self.period
+
+    def delay(self) -> float:
+        """
+        Сколько ждать слота (без резервирования)
+
+        Returns:
+            0 если слот уже начался, иначе секунды
+        """
+        now = time.time()
+        return max(0.0, self._next_slot(now) - now)
+
+    def reserve(self) -> float:
+        """
+        Резервирование ближайшего слота
+
+        Returns:
+            Сколько ждать до начала слота в секундах
+        """
+        now = time.time()
+        start = self._next_slot(now)
+        self.next_free = start + self.width
+        return max(0.0, start - now)
+
+
+class RateLimiter:
+    """
+    Корзины токенов по доменам
+
+    Домены без своего лимита получают rate и burst по умолчанию.
+    Локальные файлы (file://) не ограничиваются.
+
+    Пример:
+        limiter = RateLimiter(rate=1.0, burst=2, domains={'amazon.com': (0.5, 1)})
+        async with AdvancedAmazonParser(rate_limiter=limiter) as parser:
+            ...
+    """
+
+    def __init__(self, rate: float = 1.0, burst: int = 1,
+                 domains: Optional[Dict[str, DomainRate]] = None):
+        """
+        Args:
+            rate: Запросов в секунду на домен по умолчанию (0 - без ограничения)
+            burst: Запросов подряд без ожидания по умолчанию
+            domains: Лимиты отдельных доменов (ключ - хост без www.)
+        """
+        self.rate = rate
+        self.burst = burst
+        self.domains: Dict[str, Tuple[float, int]] = {
+            domain: limit if isinstance(limit, tuple) else (limit, burst)
+            for domain, limit in (domains or {}).items()
+        }
+        self.waited = 0.0
+        # (номер процесса, процессов) для доли лимита из for_workers
+        self.slot: Optional[Tuple[int, int]] = None
+        self._buckets: Dict[str, Union[TokenBucket, SlotBucket, None]] = {}
+
+    def limit(self, domain: str) -> Tuple[float, int]:
+        """Лимит домена: (запросов в секунду, размер всплеска)"""
+        return self.domains.get(domain, (self.rate, self.burst))
+
+    def _bucket(self, url: str) -> Union[TokenBucket, SlotBucket, None]:
+        """Корзина домена URL (None - без ограничения)"""
+        domain = selector_domain(url)
+        if domain not in self._buckets:
+            rate, burst = self.limit(domain)
+            if rate <= 0 or domain == 'file':
+                self._buckets[domain] = None
+            elif burst < 1 and self.slot:
+                # Всплеска на каждый процесс не хватает: процессы ходят по очереди
+                self._buckets[domain] = SlotBucket(rate, *self.slot)
+            else:
+                self._buckets[domain] = TokenBucket(rate, burst)
+        return self._buckets[domain]
+
+    def delay(self, url: str) -> float:
+        """
+        Сколько ждать до запроса к домену URL (без резервирования)
+
+        Args:
+            url: URL страницы
+
+        Returns:
+            Задержка в секундах (0 - можно сразу)
+        """
+        bucket = self._bucket(url)
+        return bucket.delay() if bucket else 0.0
+
+    def try_acquire(self, url: str) -> float:
+        """
+        Резервирование токена, только если запрос можно сделать сразу
+
+        Args:
+            url: URL страницы
+
+        Returns:
+            0 - токен зарезервирован, иначе сколько ждать (ничего не резервируется)
+        """
+        bucket = self._bucket(url)
+        if not bucket:
+            return 0.0
+        wait = bucket.delay()
+        if not wait:
+            bucket.reserve()
+        return wait
+
+    async def acquire(self, url: str) -> float:
+        """
+        Ожидание разрешения на запрос к домену URL
+
+        Args:
+            url: URL страницы
+
+        Returns:
+            Время ожидания в секундах
+        """
+        bucket = self._bucket(url)
+        if not bucket:
+            return 0.0
+        wait = bucket.reserve()
+        if wait:
+            self.waited += wait
+            logger.debug(f"Лимит {selector_domain(url)}: ждем {wait:.2f} с")
+            await asyncio.sleep(wait)
+        return wait
+
+    def for_workers(self, workers: int, worker: int = 0) -> 'RateLimiter':
+        """
+        Доля лимита для одного из workers процессов
+
+        У каждого процесса свои корзины, поэтому скорость и всплеск
+        делятся между ними поровну. Если всплеск меньше числа процессов,
+        процессы запрашивают домен по очереди в своих слотах (SlotBucket),
+        чтобы вместе не превысить исходный всплеск.
+
+        Args:
+            workers: Количество процессов
+            worker: Номер процесса (с 0)
+
+        Returns:
+            Новый ограничитель с лимитами, деленными на workers
+        """
+        workers = max(1, workers)
+        limiter = RateLimiter(
+            self.rate / workers,
+            self.burst // workers,
+            {domain: (rate / workers, burst // workers) for domain, (rate, burst) in self.domains.items()}
+        )
+        limiter.slot = (worker % workers, workers)
+        return limiter
+
+    def __getstate__(self):
+        # Корзины привязаны ко времени процесса: в дочерний передаются только лимиты
+        state = self.__dict__.copy()
+        state['_buckets'] = {}
+        state['waited'] = 0.0
+        return state
@@ -0,0 +1,110 @@
+"""
+Ожидание готовности страницы без фиксированных задержек
+Один комбинированный селектор + MutationObserver в браузере
+"""
+
+import logging
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+# Промис резолвится, когда число карточек по комбинированному селектору
+# достигло min_cards и не меняется settle мс, либо по истечении дедлайна.
+_READINESS_JS = """
+({selector, minCards, settleMs, deadlineMs}) => new Promise((resolve) => {
+    const started = performance.now();
+    let lastCount = -1;
+    let settleTimer = null;
+    let deadlineTimer = null;
+    let observer = null;
+    let done = false;
+
+    const count = () => {
+        try {
+            return document.querySelectorAll(selector).length;
+        } catch (e) {
+            return 0;
+        }
+    };
+
+    const finish = (ready) => {
+        if (done) {
+            return;
+        }
+        done = true;
+        if (observer) {
+            observer.disconnect();
+        }
+        clearTimeout(settleTimer);
+        clearTimeout(deadlineTimer);
+        resolve({ready, count: count(), elapsed: performance.now() - started});
+    };
+
+    const check = () => {
+        const current = count();
+        if (current === lastCount) {
+            return;
+        }
+        lastCount = current;
+        clearTimeout(settleTimer);
+        if (current >= minCards) {
+            settleTimer = setTimeout(() => finish(true), settleMs);
+        }
+    };
+
+    observer = new MutationObserver(check);
+    observer.observe(document.documentElement || document, {childList: true, subtree: true});
+    deadlineTimer = setTimeout(() => finish(lastCount >= minCards), deadlineMs);
+    check();
+})
+"""
+
+
+class ReadinessEngine:
+    """
+    Ожидание появления и стабилизации карточек товаров
+
+    Вместо перебора селекторов с отдельными таймаутами и случайных пауз
+    выполняется один вызов page.evaluate: в браузере MutationObserver
+    следит за числом карточек и сообщает, когда оно перестало меняться.
+    """
+
+    def __init__(self, selectors: List[str], deadline: float = 15.0,
+                 settle: float = 0.3, min_cards: int = 1):
+        """
+        Инициализация
+
+        Args:
+            selectors: Селекторы карточек (объединяются в один)
+            deadline: Общий бюджет ожидания на страницу в секундах
+            settle: Сколько секунд число карточек не должно меняться
+            min_cards: Минимальное число карточек для готовности
+        """
+        self.selector = ', '.join(selectors)
+        self.deadline = deadline
+        self.settle = settle
+        self.min_cards = min_cards
+
+    async def wait(self, page: Any) -> Dict[str, Any]:
+        """
+        Ожидание готовности страницы
+
+        Args:
+            page: Страница Playwright
+
+        Returns:
+            Словарь: ready - карточки найдены и стабилизировались,
+            count - число карточек, elapsed - время ожидания в мс
+        """
+        try:
+            return await page.evaluate(_READINESS_JS, {
+                'selector': self.selector,
+                'minCards': self.min_cards,
+                'settleMs': int(self.settle * 1000),
+                'deadlineMs': int(self.deadline * 1000),
+            })
+        except Exception as e:
+            # Например, страница ушла на другую навигацию во время ожидания
+            logger.debug(f"Ошибка ожидания готовности страницы: {e}")
+            return {'ready': False, 'count': 0, 'elapsed': 0.0}
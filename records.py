@@ -0,0 +1,306 @@
+"""
+Компактные записи товаров и колоночный контейнер для больших выборок
+Повторяющиеся поля (URL источника, категория, валюта) хранятся один раз
+"""
+
+import math
+import sys
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+
+# Поля записи в порядке колонок
+FIELDS = ('id', 'name', 'price', 'price_value', 'currency', 'url', 'category')
+
+# Ключи словаря товара, под которыми скрипты экспорта хранят источник и категорию
+KEY_ALIASES = {
+    'URL источника': 'url',
+    'Категория': 'category',
+}
+
+# Обратное соответствие для представления записи словарем
+_DICT_KEYS = {field: key for key, field in KEY_ALIASES.items()}
+
+# Ключ словаря товара: ID не найден на карточке, парсер подставил ее номер
+# ('1', 'amazon_1'). Есть только у таких товаров.
+FALLBACK_ID = 'id_is_fallback'
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    """Интернирование строки (None остается None)"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class ProductRecord:
+    """
+    Товар с __slots__ вместо словаря
+
+    Поддерживает чтение как словарь (product['name'], product.get('price'),
+    dict(product)), поэтому подходит везде, где раньше был словарь товара.
+    Источник и категория доступны и под ключами 'URL источника'
+    и 'Категория'. URL, категория и валюта интернируются: у товаров
+    одной страницы это один и тот же объект строки.
+    """
+
+    __slots__ = FIELDS
+
+    def __init__(self, id: str, name: str, price: Optional[str] = None,
+                 price_value: Optional[float] = None, currency: Optional[str] = None,
+                 url: Optional[str] = None, category: Optional[str] = None):
+        self.id = id
+        self.name = name
+        self.price = price
+        self.price_value = price_value
+        self.currency = _intern(currency)
+        self.url = _intern(url)
+        self.category = _intern(category)
+
+    @classmethod
+    def from_dict(cls, product: Mapping[str, Any], url: Optional[str] = None,
+                  category: Optional[str] = None) -> 'ProductRecord':
+        """
+        Запись из словаря товара
+
+        Args:
+            product: Словарь товара (результат parse())
+            url: Страница списка (по умолчанию из 'URL источника')
+            category: Категория (по умолчанию из 'Категория')
+
+        Returns:
+            Запись товара
+        """
+        return cls(
+            product.get('id'),
+            product.get('name'),
+            product.get('price'),
+            product.get('price_value'),
+            product.get('currency'),
+            url if url is not None else product.get('URL источника', product.get('url')),
+            category if category is not None else product.get('Категория', product.get('category')),
+        )
+
+    @staticmethod
+    def _field(key: str) -> str:
+        """Имя поля по ключу словаря"""
+        field = KEY_ALIASES.get(key, key)
+        if field not in FIELDS:
+            raise KeyError(key)
+        return field
+
+    def keys(self) -> List[str]:
+        """Ключи, как у словаря товара (источник и категория - если заданы)"""
+        return [
+            _DICT_KEYS.get(field, field) for field in FIELDS
+            if field not in _DICT_KEYS or getattr(self, field) is not None
+        ]
+
+    def __getitem__(self, key: str) -> Any:
+        return getattr(self, self._field(key))
+
+    def __setitem__(self, key: str, value: Any):
+        field = self._field(key)
+        setattr(self, field, _intern(value) if field in ('url', 'category', 'currency') else value)
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and key in self.keys()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Значение по ключу словаря или default"""
+        try:
+            value = self[key]
+        except KeyError:
+            return default
+        # Незаданные источник и категория отсутствуют в словаре товара
+        return default if value is None and key in KEY_ALIASES else value
+
+    def items(self) -> List[Tuple[str, Any]]:
+        """Пары (ключ, значение), как у словаря товара"""
+        return [(key, self[key]) for key in self.keys()]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Запись в виде словаря товара"""
+        return dict(self.items())
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, ProductRecord):
+            return all(getattr(self, field) == getattr(other, field) for field in FIELDS)
+        if isinstance(other, Mapping):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        values = ', '.join(f"{field}={getattr(self, field)!r}" for field in FIELDS)
+        return f"ProductRecord({values})"
+
+
+class _Dictionary:
+    """Словарь повторяющихся значений: строка -> код (None - код -1)"""
+
+    __slots__ = ('values', 'codes')
+
+    def __init__(self):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+    def encode(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(sys.intern(value))
+        return code
+
+    def decode(self, code: int) -> Optional[str]:
+        return None if code < 0 else self.values[code]
+
+
+class ProductBatch:
+    """
+    Колоночный контейнер товаров
+
+    ID и названия хранятся списками, числовые цены - массивом double,
+    а URL источника, категория и валюта - кодами в словаре значений.
+    На миллионах товаров это в разы меньше списка словарей, а в DataFrame
+    колонки переносятся без построчного обхода.
+
+    Пример:
+        batch = ProductBatch()
+        async for result in parser.parse_many(urls):
+            batch.extend(result.products, url=result.url, category="Обувь")
+        df = batch.to_dataframe()
+    """
+
+    def __init__(self, products: Optional[Iterable[Union[Mapping[str, Any], ProductRecord]]] = None):
+        """
+        Args:
+            products: Начальные товары (словари или записи)
+        """
+        self.ids: List[str] = []
+        self.names: List[str] = []
+        self.prices: List[Optional[str]] = []
+        self.price_values = array('d')
+        self.currency_codes = array('i')
+        self.url_codes = array('i')
+        self.category_codes = array('i')
+        self._currencies = _Dictionary()
+        self._urls = _Dictionary()
+        self._categories = _Dictionary()
+        if products is not None:
+            self.extend(products)
+
+    def append(self, product: Union[Mapping[str, Any], ProductRecord], url: Optional[str] = None,
+               category: Optional[str] = None):
+        """
+        Добавление товара
+
+        Args:
+            product: Словарь товара или запись
+            url: Страница списка (по умолчанию из товара)
+            category: Категория (по умолчанию из товара)
+        """
+        price_value = product.get('price_value')
+        self.ids.append(product.get('id'))
+        self.names.append(product.get('name'))
+        self.prices.append(product.get('price'))
+        self.price_values.append(math.nan if price_value is None else price_value)
+        self.currency_codes.append(self._currencies.encode(product.get('currency')))
+        self.url_codes.append(self._urls.encode(
+            url if url is not None else product.get('URL источника', product.get('url'))
+        ))
+        self.category_codes.append(self._categories.encode(
+            category if category is not None else product.get('Категория', product.get('category'))
+        ))
+
+    def extend(self, products: Iterable[Union[Mapping[str, Any], ProductRecord]], url: Optional[str] = None,
+               category: Optional[str] = None):
+        """
+        Добавление товаров одной страницы
+
+        Args:
+            products: Словари товаров или записи
+            url: Страница списка для всех товаров
+            category: Категория для всех товаров
+        """
+        for product in products:
+            self.append(product, url, category)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index: int) -> ProductRecord:
+        price_value = self.price_values[index]
+        return ProductRecord(
+            self.ids[index],
+            self.names[index],
+            self.prices[index],
+            None if math.isnan(price_value) else price_value,
+            self._currencies.decode(self.currency_codes[index]),
+            self._urls.decode(self.url_codes[index]),
+            self._categories.decode(self.category_codes[index]),
+        )
+
+    def __iter__(self) -> Iterator[ProductRecord]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Товары в виде списка словарей (как результат parse())"""
+        return [record.to_dict() for record in self]
+
+    def to_dataframe(self) -> Any:
+        """
+        Товары в виде DataFrame
+
+        URL источника, категория и валюта - категориальные колонки
+        (коды переносятся как есть), цена - float64 без копирования строк.
+
+        Returns:
+            pandas.DataFrame с колонками FIELDS
+        """
+        import numpy as np
+        import pandas as pd
+
+        def categorical(codes: array, dictionary: _Dictionary) -> Any:
+            return pd.Categorical.from_codes(np.frombuffer(codes, dtype=np.int32), dictionary.values)
+
+        return pd.DataFrame({
+            'id': self.ids,
+            'name': self.names,
+            'price': self.prices,
+            'price_value': np.frombuffer(self.price_values, dtype=np.float64).copy(),
+            'currency': categorical(self.currency_codes, self._currencies),
+            'url': categorical(self.url_codes, self._urls),
+            'category': categorical(self.category_codes, self._categories),
+        })
+
+    def to_arrow(self) -> Any:
+        """
+        Товары в виде таблицы Arrow (нужен pyarrow)
+
+        Returns:
+            pyarrow.Table; повторяющиеся поля - словарные колонки
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        def dictionary(codes: array, values: _Dictionary) -> Any:
+            indices = pa.array(codes, type=pa.int32())
+            indices = pc.if_else(pc.less(indices, 0), None, indices)
+            return pa.DictionaryArray.from_arrays(indices, pa.array(values.values, type=pa.string()))
+
+        price_values = pa.array(self.price_values, type=pa.float64())
+        return pa.table({
+            'id': pa.array(self.ids, type=pa.string()),
+            'name': pa.array(self.names, type=pa.string()),
+            'price': pa.array(self.prices, type=pa.string()),
+            'price_value': pc.if_else(pc.is_nan(price_values), None, price_values),
+            'currency': dictionary(self.currency_codes, self._currencies),
+            'url': dictionary(self.url_codes, self._urls),
+            'category': dictionary(self.category_codes, self._categories),
+        })
@@ -0,0 +1,252 @@
+"""
+Инкрементальное хранилище строк из Excel файлов для итоговых отчетов
+Каждый файл разбирается один раз, повторный запуск читает только новые
+"""
+
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Колонка с именем исходного файла
+SOURCE_COLUMN = 'Источник файла'
+
+# Разные скрипты экспорта называют колонку названия по-разному
+COLUMN_ALIASES = {
+    'Название': 'Название товара',
+    'name': 'Название товара',
+    'price': 'Цена',
+    'id': 'ID товара',
+}
+
+
+def file_hash(path: str) -> str:
+    """
+    SHA-256 содержимого файла
+
+    Args:
+        path: Путь к файлу
+
+    Returns:
+        Шестнадцатеричный хэш
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Приведение названий колонок к COLUMN_ALIASES
+
+    Если в файле уже есть целевая колонка (сводный Excel содержит и
+    'Название', и 'Название товара'), значения псевдонима дописываются
+    в ее пустые ячейки, а не создают вторую колонку с тем же именем.
+
+    Args:
+        df: Строки файла
+
+    Returns:
+        DataFrame без псевдонимов и повторяющихся колонок
+    """
+    for alias, column in COLUMN_ALIASES.items():
+        if alias not in df.columns:
+            continue
+        if column in df.columns:
+            df[column] = df[column].combine_first(df[alias])
+            df = df.drop(columns=alias)
+        else:
+            df = df.rename(columns={alias: column})
+    return df
+
+
+def _parquet_available() -> bool:
+    """Можно ли хранить части в Parquet (нужен pyarrow)"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class ReportStore:
+    """
+    Манифест разобранных файлов и колоночный кэш их строк
+
+    Для каждого файла в манифесте хранятся mtime, размер и хэш; строки
+    первого листа сохраняются отдельной частью (Parquet, без pyarrow -
+    pickle). Файл разбирается заново, только если изменилось содержимое.
+    """
+
+    def __init__(self, directory: str = '.', cache_dir: str = '.report_cache',
+                 pattern: str = '.xlsx'):
+        """
+        Инициализация хранилища
+
+        Args:
+            directory: Каталог с Excel файлами
+            cache_dir: Каталог манифеста и частей (относительно directory)
+            pattern: Расширение отслеживаемых файлов
+        """
+        self.directory = directory
+        self.cache_dir = os.path.join(directory, cache_dir)
+        self.pattern = pattern
+        self.manifest_path = os.path.join(self.cache_dir, 'manifest.json')
+        self.part_format = 'parquet' if _parquet_available() else 'pkl'
+        self.manifest: Dict[str, Dict[str, Any]] = {}
+        self.errors: Dict[str, str] = {}
+        self._frame: Optional[pd.DataFrame] = None
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_manifest()
+
+    def _load_manifest(self):
+        """Чтение манифеста с диска"""
+        if not os.path.exists(self.manifest_path):
+            return
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Манифест отчета поврежден, файлы будут разобраны заново: {e}")
+            self.manifest = {}
+
+    def _save_manifest(self):
+        """Атомарная запись манифеста"""
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _part_path(self, entry: Dict[str, Any]) -> str:
+        """Путь к части с уже разобранными строками файла"""
+        return os.path.join(self.cache_dir, entry['part'])
+
+    def files(self) -> List[str]:
+        """Отслеживаемые файлы каталога"""
+        return sorted(f for f in os.listdir(self.directory) if f.endswith(self.pattern))
+
+    def _read_source(self, path: str) -> pd.DataFrame:
+        """Разбор первого листа Excel файла (все значения - строки)"""
+        return normalize_columns(pd.read_excel(path, sheet_name=0, dtype=str))
+
+    def _write_part(self, df: pd.DataFrame, path: str):
+        """Сохранение строк файла в колоночном виде"""
+        if self.part_format == 'parquet':
+            df.to_parquet(path, index=False, compression='zstd')
+        else:
+            df.to_pickle(path)
+
+    def _read_part(self, path: str) -> pd.DataFrame:
+        """Чтение сохраненных строк файла"""
+        if path.endswith('.parquet'):
+            return pd.read_parquet(path)
+        return pd.read_pickle(path)
+
+    def refresh(self) -> Dict[str, int]:
+        """
+        Синхронизация манифеста с каталогом
+
+        Новые и измененные файлы разбираются, удаленные - забываются.
+        Файлы с прежними mtime и размером не открываются вовсе.
+
+        Returns:
+            Счетчики: added, updated, removed, unchanged
+        """
+        counts = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0}
+        current = self.files()
+        changed = False
+
+        for filename in set(self.manifest) - set(current):
+            self._drop(filename)
+            counts['removed'] += 1
+            changed = True
+
+        for filename in current:
+            path = os.path.join(self.directory, filename)
+            stat = os.stat(path)
+            entry = self.manifest.get(filename)
+
+            if entry and entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size \
+                    and os.path.exists(self._part_path(entry)):
+                counts['unchanged'] += 1
+                continue
+
+            digest = file_hash(path)
+            if entry and entry['hash'] == digest and os.path.exists(self._part_path(entry)):
+                # Файл перезаписан тем же содержимым
+                entry['mtime'] = stat.st_mtime
+                counts['unchanged'] += 1
+                changed = True
+                continue
+
+            name_hash = hashlib.sha256(filename.encode('utf-8')).hexdigest()
+            new_entry = {
+                'mtime': stat.st_mtime,
+                'size': stat.st_size,
+                'hash': digest,
+                'part': f"{name_hash[:16]}_{digest[:16]}.{self.part_format}",
+            }
+            part_path = self._part_path(new_entry)
+            # Ошибка одного файла не прерывает обновление остальных
+            try:
+                df = self._read_source(path)
+                df[SOURCE_COLUMN] = filename
+                new_entry['rows'] = len(df)
+                self._write_part(df, part_path)
+            except Exception as e:
+                self.errors[filename] = str(e)
+                logger.warning(f"Не удалось разобрать {filename}: {e}")
+                if os.path.exists(part_path):
+                    os.remove(part_path)
+                continue
+
+            if entry and entry['part'] != new_entry['part']:
+                self._drop(filename)
+            self.manifest[filename] = new_entry
+            counts['updated' if entry else 'added'] += 1
+            changed = True
+
+        self._prune_parts()
+        if changed:
+            self._save_manifest()
+            self._frame = None
+        logger.info(
+            f"Отчет: новых файлов {counts['added']}, измененных {counts['updated']}, "
+            f"удаленных {counts['removed']}, без изменений {counts['unchanged']}"
+        )
+        return counts
+
+    def _prune_parts(self):
+        """Удаление частей, которых нет в манифесте (остались от прерванных запусков)"""
+        parts = {entry['part'] for entry in self.manifest.values()}
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(('.parquet', '.pkl')) and name not in parts:
+                os.remove(os.path.join(self.cache_dir, name))
+
+    def _drop(self, filename: str):
+        """Удаление файла из манифеста вместе с его частью"""
+        entry = self.manifest.pop(filename)
+        try:
+            os.remove(self._part_path(entry))
+        except OSError:
+            pass
+
+    def frame(self) -> pd.DataFrame:
+        """
+        Все строки отслеживаемых файлов
+
+        Returns:
+            DataFrame с колонкой SOURCE_COLUMN (имя исходного файла)
+        """
+        if self._frame is None:
+            parts = [self._read_part(self._part_path(self.manifest[f])) for f in sorted(self.manifest)]
+            self._frame = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=[SOURCE_COLUMN])
+        return self._frame
@@ -0,0 +1,236 @@
+"""
+Дисковый кэш ответов (HTML снимков) с TTL и LRU вытеснением
+Подключается к Playwright через route и к статическому загрузчику
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+# Заголовки ответа, которые нельзя отдавать вместе с уже распакованным телом
+_DROP_RESPONSE_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding'}
+
+
+@dataclass
+class CachedResponse:
+    """
+    Сохраненный ответ
+
+    Attributes:
+        url: URL запроса
+        status: HTTP статус
+        headers: Заголовки ответа
+        body: Тело ответа (распакованное)
+    """
+    url: str
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+
+
+class ResponseCache:
+    """
+    Кэш ответов на диске (SQLite, тела сжаты gzip)
+
+    Ключ - URL и значения выбранных заголовков запроса. Записи старше ttl
+    не отдаются, при превышении max_bytes вытесняются давно не читанные.
+    В режиме replay_only сеть не используется: ответы берутся только
+    из кэша (включая устаревшие), остальные запросы отклоняются.
+    """
+
+    def __init__(self, directory: str = '.response_cache', ttl: float = 3600,
+                 max_bytes: int = 512 * 1024 * 1024, replay_only: bool = False,
+                 key_headers: Iterable[str] = ('accept-language',),
+                 resource_types: Iterable[str] = ('document', 'xhr', 'fetch')):
+        """
+        Инициализация кэша
+
+        Args:
+            directory: Каталог кэша
+            ttl: Время жизни записи в секундах
+            max_bytes: Максимальный размер сжатых тел в байтах
+            replay_only: Работать только из кэша, без сети
+            key_headers: Заголовки запроса, входящие в ключ
+            resource_types: Типы ресурсов Playwright, которые кэшируются
+        """
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.replay_only = replay_only
+        self.key_headers = tuple(header.lower() for header in key_headers)
+        self.resource_types = set(resource_types)
+        self.hits = 0
+        self.misses = 0
+
+        self._open()
+
+    def _open(self):
+        """Открытие базы кэша (создается при первом запуске)"""
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(self.directory, 'cache.sqlite'), check_same_thread=False)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            ' key TEXT PRIMARY KEY, url TEXT, status INTEGER, headers TEXT,'
+            ' body BLOB, size INTEGER, created REAL, accessed REAL)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+        self._db.commit()
+
+    def __getstate__(self):
+        # Для передачи в процессы parse_sharded: соединение открывается заново
+        state = self.__dict__.copy()
+        del state['_db'], state['_lock']
+        state['hits'] = state['misses'] = 0
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._open()
+
+    def key(self, url: str, headers: Optional[Mapping[str, str]] = None) -> str:
+        """
+        Ключ кэша для запроса
+
+        Args:
+            url: URL запроса
+            headers: Заголовки запроса
+
+        Returns:
+            SHA-256 от URL и значений ключевых заголовков
+        """
+        headers = {name.lower(): value for name, value in (headers or {}).items()}
+        parts = [url] + [f"{name}={headers.get(name, '')}" for name in self.key_headers]
+        return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+    def get(self, url: str, headers: Optional[Mapping[str, str]] = None) -> Optional[CachedResponse]:
+        """
+        Поиск ответа в кэше
+
+        Args:
+            url: URL запроса
+            headers: Заголовки запроса
+
+        Returns:
+            Сохраненный ответ или None
+        """
+        key = self.key(url, headers)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                'SELECT status, headers, body, created FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+            if row and not self.replay_only and now - row[3] > self.ttl:
+                self._db.execute('DELETE FROM responses WHERE key = ?', (key,))
+                self._db.commit()
+                row = None
+            if row:
+                self._db.execute('UPDATE responses SET accessed = ? WHERE key = ?', (now, key))
+                self._db.commit()
+
+        if not row:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return CachedResponse(url, row[0], json.loads(row[1]), gzip.decompress(row[2]))
+
+    def put(self, url: str, headers: Optional[Mapping[str, str]], status: int,
+            response_headers: Mapping[str, str], body: bytes):
+        """
+        Сохранение ответа
+
+        Args:
+            url: URL запроса
+            headers: Заголовки запроса
+            status: HTTP статус ответа
+            response_headers: Заголовки ответа
+            body: Тело ответа
+        """
+        key = self.key(url, headers)
+        stored_headers = {
+            name: value for name, value in response_headers.items()
+            if name.lower() not in _DROP_RESPONSE_HEADERS
+        }
+        compressed = gzip.compress(body)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, url, status, json.dumps(stored_headers), compressed, len(compressed), now, now)
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        """Вытеснение давно не читанных записей сверх max_bytes (под блокировкой)"""
+        total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        removed = 0
+        for key, size in self._db.execute('SELECT key, size FROM responses ORDER BY accessed').fetchall():
+            if total <= self.max_bytes:
+                break
+            self._db.execute('DELETE FROM responses WHERE key = ?', (key,))
+            total -= size
+            removed += 1
+        logger.info(f"Из кэша ответов вытеснено записей: {removed}")
+
+    def clear(self):
+        """Удаление всех записей"""
+        with self._lock:
+            self._db.execute('DELETE FROM responses')
+            self._db.commit()
+
+    def close(self):
+        """Закрытие базы кэша"""
+        with self._lock:
+            self._db.close()
+
+    async def handle_route(self, route: Any):
+        """
+        Обработчик context.route("**/*", ...) для Playwright
+
+        Args:
+            route: Маршрут Playwright
+        """
+        request = route.request
+        if request.method != 'GET' or request.resource_type not in self.resource_types:
+            if self.replay_only:
+                await route.abort('internetdisconnected')
+            else:
+                await route.fallback()
+            return
+
+        headers = await request.all_headers()
+        cached = self.get(request.url, headers)
+        if cached:
+            await route.fulfill(status=cached.status, headers=cached.headers, body=cached.body)
+            return
+
+        if self.replay_only:
+            logger.warning(f"Нет в кэше (режим replay_only): {request.url}")
+            await route.abort('internetdisconnected')
+            return
+
+        try:
+            response = await route.fetch()
+            body = await response.body()
+        except Exception as e:
+            logger.debug(f"Ошибка загрузки {request.url}: {e}")
+            await route.abort('failed')
+            return
+
+        if response.status == 200:
+            self.put(request.url, headers, response.status, response.headers, body)
+        await route.fulfill(response=response, body=body)
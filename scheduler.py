@@ -0,0 +1,398 @@
+"""
+Планировщик обхода: повторы с экспоненциальной задержкой, автомат
+размыкания по доменам и список окончательно не обработанных URL
+"""
+
+import asyncio
+import heapq
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+from selector_cache import selector_domain
+
+logger = logging.getLogger(__name__)
+
+
+class BlockedPageError(Exception):
+    """
+    Сайт отдал страницу блокировки или CAPTCHA вместо списка товаров
+
+    Attributes:
+        url: URL страницы
+        reason: Сработавший признак (селектор или текст)
+    """
+
+    def __init__(self, url: str, reason: str):
+        super().__init__(f"Страница блокировки на {url}: {reason}")
+        self.url = url
+        self.reason = reason
+
+
+class DomainBlockedError(Exception):
+    """URL не запрашивался: автомат размыкания домена исчерпал попытки"""
+
+
+# Ошибки конфигурации и отсутствия данных: повтор не поможет
+NON_RETRYABLE = (ValueError, TypeError, LookupError, NotImplementedError)
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Повторы с экспоненциальной задержкой и случайным разбросом
+
+    Attributes:
+        max_attempts: Попыток на URL, включая первую
+        base_delay: Задержка перед первым повтором в секундах
+        max_delay: Верхняя граница задержки в секундах
+        jitter: Доля задержки, выбираемая случайно (0 - без разброса)
+    """
+    max_attempts: int = 4
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+    jitter: float = 0.5
+
+    def delay(self, attempt: int) -> float:
+        """
+        Задержка перед следующей попыткой
+
+        Args:
+            attempt: Номер неудачной попытки (с 1)
+
+        Returns:
+            Задержка в секундах
+        """
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay * (1 - self.jitter) + random.uniform(0, delay * self.jitter)
+
+    def should_retry(self, error: BaseException, attempt: int) -> bool:
+        """
+        Нужна ли еще попытка после ошибки
+
+        Args:
+            error: Ошибка попытки
+            attempt: Номер неудачной попытки (с 1)
+
+        Returns:
+            True если ошибка временная и попытки не исчерпаны
+        """
+        return attempt < self.max_attempts and not isinstance(error, NON_RETRYABLE)
+
+
+@dataclass
+class _DomainState:
+    """Состояние автомата размыкания одного домена"""
+    blocks: int = 0
+    trips: int = 0
+    open_until: float = 0.0
+    probing: bool = False
+
+
+class CircuitBreaker:
+    """
+    Автомат размыкания по доменам
+
+    После threshold страниц блокировки подряд домен ставится на паузу
+    (cooldown, удваивается при каждом повторном размыкании). По истечении
+    паузы пропускается одна пробная страница: успех замыкает автомат,
+    новая блокировка снова размыкает его. После max_trips размыканий
+    подряд домен считается недоступным.
+    """
+
+    def __init__(self, threshold: int = 3, cooldown: float = 300.0, max_cooldown: float = 3600.0,
+                 max_trips: int = 3):
+        """
+        Args:
+            threshold: Страниц блокировки подряд до размыкания
+            cooldown: Пауза после первого размыкания в секундах
+            max_cooldown: Верхняя граница паузы в секундах
+            max_trips: Размыканий подряд, после которых домен недоступен
+        """
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.max_trips = max_trips
+        self._domains: Dict[str, _DomainState] = {}
+
+    def _state(self, domain: str) -> _DomainState:
+        return self._domains.setdefault(domain, _DomainState())
+
+    def is_dead(self, domain: str) -> bool:
+        """Домен размыкался max_trips раз подряд"""
+        return self._state(domain).trips >= self.max_trips
+
+    def wait_time(self, domain: str, now: float) -> float:
+        """
+        Сколько ждать перед запросом к домену
+
+        Args:
+            domain: Домен
+            now: Текущее время (time.monotonic)
+
+        Returns:
+            0 - запрос разрешен (после паузы - как пробный), иначе секунды
+        """
+        state = self._state(domain)
+        if state.probing:
+            # Ждем результат пробной страницы
+            return 1.0
+        if state.open_until > now:
+            return state.open_until - now
+        if state.open_until:
+            state.probing = True
+        return 0.0
+
+    def record_success(self, domain: str):
+        """Страница домена обработана: автомат замыкается"""
+        state = self._state(domain)
+        if state.trips:
+            logger.info(f"Домен {domain} снова доступен")
+        self._domains[domain] = _DomainState()
+
+    def record_failure(self, domain: str):
+        """Ошибка, не связанная с блокировкой: освобождаем пробу"""
+        self._state(domain).probing = False
+
+    def record_block(self, domain: str, now: float) -> bool:
+        """
+        Страница блокировки от домена
+
+        Args:
+            domain: Домен
+            now: Текущее время (time.monotonic)
+
+        Returns:
+            True если автомат разомкнулся
+        """
+        state = self._state(domain)
+        if not state.probing and state.open_until > now:
+            # Ответ на запрос, отправленный до размыкания
+            return False
+        state.blocks += 1
+        if not state.probing and state.blocks < self.threshold:
+            return False
+
+        state.probing = False
+        state.blocks = 0
+        state.trips += 1
+        pause = min(self.max_cooldown, self.cooldown * 2 ** (state.trips - 1))
+        state.open_until = now + pause
+        logger.warning(f"Домен {domain} на паузе {pause:.1f} с (размыканий подряд: {state.trips})")
+        return True
+
+
+@dataclass
+class DeadLetter:
+    """
+    URL, который не удалось обработать
+
+    Attributes:
+        index: Позиция URL во входном списке
+        url: URL страницы
+        attempts: Сделано попыток
+        error: Последняя ошибка
+        reason: 'retries_exhausted', 'not_retryable' или 'domain_blocked'
+    """
+    index: int
+    url: str
+    attempts: int
+    error: Optional[str]
+    reason: str
+
+
+@dataclass(order=True)
+class _Task:
+    """Запланированная попытка (упорядочивается по времени готовности)"""
+    ready_at: float
+    seq: int
+    index: int = field(compare=False)
+    url: str = field(compare=False)
+    attempt: int = field(compare=False, default=1)
+    last_result: Any = field(compare=False, default=None)
+
+
+class CrawlScheduler:
+    """
+    Обход URL с очередью повторов
+
+    Временные ошибки повторяются с экспоненциальной задержкой, страницы
+    блокировки размыкают автомат домена: URL этого домена откладываются
+    до конца паузы и не занимают воркеры. URL домена, исчерпавшего лимит
+    rate_limiter парсера, тоже ждут в очереди, пока воркеры обрабатывают
+    другие домены. Окончательно не обработанные URL попадают в dead_letters.
+
+    Пример:
+        scheduler = CrawlScheduler(parser, concurrency=4)
+        async for result in scheduler.run(urls):
+            ...
+        for letter in scheduler.dead_letters:
+            print(letter.url, letter.error)
+    """
+
+    def __init__(self, parser: Any, concurrency: int = 4, retry: Optional[RetryPolicy] = None,
+                 breaker: Optional[CircuitBreaker] = None):
+        """
+        Args:
+            parser: Открытый парсер (async with ...)
+            concurrency: Одновременно обрабатываемых страниц
+            retry: Политика повторов
+            breaker: Автомат размыкания по доменам
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency должно быть не меньше 1")
+        self.parser = parser
+        self.concurrency = concurrency
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.dead_letters: List[DeadLetter] = []
+        self.retries = 0
+
+    async def run(self, urls: Iterable[str]) -> AsyncIterator[Any]:
+        """
+        Обход URL с повторами
+
+        Args:
+            urls: URL страниц с товарами
+
+        Yields:
+            ParseResult для каждого URL в порядке завершения: успешный
+            или последняя неудачная попытка (URL уже в dead_letters)
+        """
+        self.parser.pool_size = max(self.parser.pool_size, self.concurrency)
+        if self.parser.pool:
+            self.parser.pool.ensure_size(self.concurrency)
+
+        queue: List[_Task] = []
+        seq = 0
+        now = time.monotonic()
+        for index, url in enumerate(urls):
+            heapq.heappush(queue, _Task(now, seq, index, url))
+            seq += 1
+
+        pending = len(queue)
+        limiter = self.parser._active_rate_limiter()
+        done: asyncio.Queue = asyncio.Queue()
+        active: Dict[asyncio.Task, _Task] = {}
+
+        async def attempt(task: _Task, reserved: bool):
+            result = await self.parser._parse_result(task.index, task.url, reserved=reserved,
+                                                     attempt=task.attempt)
+            await done.put((task, result))
+
+        try:
+            while pending:
+                now = time.monotonic()
+                while queue and len(active) < self.concurrency and queue[0].ready_at <= now:
+                    task = heapq.heappop(queue)
+                    domain = selector_domain(task.url)
+                    if self.breaker.is_dead(domain):
+                        pending -= 1
+                        yield self._dead(task, task.last_result, 'domain_blocked')
+                        continue
+                    wait = self.breaker.wait_time(domain, now)
+                    if wait:
+                        # Домен на паузе: попытка не тратится
+                        task.ready_at = now + wait
+                        heapq.heappush(queue, task)
+                        continue
+                    # Токен берется до запуска: попытка не ждет лимит, занимая воркер
+                    wait = limiter.try_acquire(task.url) if limiter else 0.0
+                    if wait:
+                        # Лимит домена исчерпан: воркер берет URL другого домена
+                        task.ready_at = now + wait
+                        heapq.heappush(queue, task)
+                        continue
+                    active[asyncio.create_task(attempt(task, limiter is not None))] = task
+
+                timeout = None
+                if queue and len(active) < self.concurrency:
+                    timeout = max(0.0, queue[0].ready_at - time.monotonic())
+                if not active and timeout is None:
+                    break
+                try:
+                    task, result = await asyncio.wait_for(done.get(), timeout)
+                except asyncio.TimeoutError:
+                    continue
+                active = {t: item for t, item in active.items() if item is not task}
+
+                final = self._handle(task, result)
+                if final is None:
+                    task.seq = seq
+                    seq += 1
+                    heapq.heappush(queue, task)
+                    continue
+                pending -= 1
+                yield final
+        finally:
+            for running in active:
+                running.cancel()
+
+    def _handle(self, task: _Task, result: Any) -> Optional[Any]:
+        """
+        Разбор результата попытки
+
+        Args:
+            task: Попытка
+            result: ParseResult
+
+        Returns:
+            Окончательный результат или None, если задача снова в очереди
+            (task.ready_at и task.attempt обновлены)
+        """
+        domain = selector_domain(task.url)
+        now = time.monotonic()
+        result.attempts = task.attempt
+
+        if result.ok:
+            self.breaker.record_success(domain)
+            return result
+
+        error = result.error
+        if isinstance(error, BlockedPageError):
+            self.breaker.record_block(domain, now)
+        else:
+            self.breaker.record_failure(domain)
+
+        if not self.retry.should_retry(error, task.attempt):
+            reason = 'retries_exhausted' if task.attempt >= self.retry.max_attempts else 'not_retryable'
+            return self._dead(task, result, reason)
+
+        delay = self.retry.delay(task.attempt)
+        logger.info(f"Повтор {task.url} через {delay:.1f} с (попытка {task.attempt + 1}): {error}")
+        task.attempt += 1
+        task.ready_at = now + delay
+        task.last_result = result
+        self.retries += 1
+        return None
+
+    def _dead(self, task: _Task, result: Optional[Any], reason: str) -> Any:
+        """Запись URL в dead_letters и последний результат для вызывающего"""
+        from product_parser import ParseResult
+
+        if result is None:
+            domain = selector_domain(task.url)
+            result = ParseResult(task.index, task.url, error=DomainBlockedError(f"Домен {domain} недоступен"))
+            result.attempts = 0
+        error = result.error
+        self.dead_letters.append(DeadLetter(
+            task.index, task.url, result.attempts,
+            f"{type(error).__name__}: {error}" if error else None, reason
+        ))
+        logger.warning(f"URL не обработан ({reason}, попыток: {result.attempts}): {task.url}")
+        return result
+
+
+def dead_letter_urls(letters: Iterable[DeadLetter]) -> List[str]:
+    """
+    URL из dead_letters для повторного запуска
+
+    Args:
+        letters: Записи dead_letters
+
+    Returns:
+        URL в исходном порядке
+    """
+    return [letter.url for letter in sorted(letters, key=lambda letter: letter.index)]
@@ -0,0 +1,140 @@
+"""
+Кэш сработавших селекторов по доменам
+Позволяет пробовать селектор-победитель первым и не перебирать весь список
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+
+def selector_domain(url: str) -> str:
+    """
+    Ключ домена для кэша селекторов
+
+    Args:
+        url: URL страницы
+
+    Returns:
+        Хост без www. (для локальных файлов - 'file')
+    """
+    parts = urlsplit(url or '')
+    if parts.scheme == 'file':
+        return 'file'
+    host = (parts.hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+class SelectorCache:
+    """
+    Статистика селекторов по домену и полю с сохранением на диск
+
+    Для каждого поля ('cards', 'name', 'price' ...) хранится, на скольких
+    страницах селектор сработал и на скольких страницах подряд его обошел
+    другой селектор. Победитель, проигравший max_misses страниц подряд,
+    забывается.
+    """
+
+    def __init__(self, path: Optional[str] = '.selector_cache.json', max_misses: int = 5):
+        """
+        Инициализация кэша
+
+        Args:
+            path: Путь к JSON файлу кэша (None - только в памяти)
+            max_misses: Промахов подряд до понижения селектора
+        """
+        self.path = path
+        self.max_misses = max_misses
+        self._data: Dict[str, Dict[str, Dict[str, Dict[str, int]]]] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.load()
+
+    def __getstate__(self):
+        # Для передачи в процессы parse_sharded: блокировка не копируется
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Загрузка кэша с диска"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self._data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Не удалось прочитать кэш селекторов {self.path}: {e}")
+            self._data = {}
+
+    def save(self):
+        """Сохранение кэша на диск (только если были изменения)"""
+        if not self.path or not self._dirty:
+            return
+        with self._lock:
+            # Свой временный файл у каждого процесса: шарды сохраняют кэш одновременно
+            fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(self.path) + '.',
+                                            suffix='.tmp', dir=os.path.dirname(self.path) or '.')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(self._data, f, ensure_ascii=False, indent=1)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            self._dirty = False
+
+    def order(self, domain: str, field: str, selectors: List[str]) -> List[str]:
+        """
+        Список селекторов с известными победителями в начале
+
+        Args:
+            domain: Домен сайта
+            field: Название поля
+            selectors: Исходный список селекторов
+
+        Returns:
+            Переупорядоченный список (остальные селекторы - в исходном порядке)
+        """
+        stats = self._data.get(domain, {}).get(field)
+        if not stats:
+            return selectors
+        known = [selector for selector in selectors if selector in stats]
+        known.sort(key=lambda selector: stats[selector]['hits'], reverse=True)
+        return known + [selector for selector in selectors if selector not in stats]
+
+    def record(self, domain: str, field: str, winner: str, expected: Optional[str] = None):
+        """
+        Учет сработавшего селектора
+
+        Args:
+            domain: Домен сайта
+            field: Название поля
+            winner: Селектор, который дал значение
+            expected: Селектор, который пробовали первым
+        """
+        with self._lock:
+            stats = self._data.setdefault(domain, {}).setdefault(field, {})
+
+            entry = stats.setdefault(winner, {'hits': 0, 'misses': 0})
+            entry['hits'] += 1
+            entry['misses'] = 0
+
+            if expected and expected != winner and expected in stats:
+                stale = stats[expected]
+                stale['misses'] += 1
+                if stale['misses'] >= self.max_misses:
+                    del stats[expected]
+                    logger.info(f"Селектор {expected} ({domain}, {field}) больше не срабатывает, понижаем")
+
+            self._dirty = True
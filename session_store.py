@@ -0,0 +1,218 @@
+"""
+Сессии браузера по доменам: cookies и localStorage между запусками
+Сессия ротируется по возрасту и сбрасывается после страницы блокировки
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+from urllib.parse import quote, urlsplit
+
+logger = logging.getLogger(__name__)
+
+
+def _host_matches(host: str, domain: str) -> bool:
+    """Хост (или домен cookie) относится к домену или его поддомену"""
+    host = host.lstrip('.').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    return host == domain or host.endswith('.' + domain)
+
+
+def cookie_domain_pattern(domain: str) -> Pattern[str]:
+    """Шаблон доменов cookies домена и его поддоменов (для context.clear_cookies)"""
+    return re.compile(rf"(^|\.){re.escape(domain)}$")
+
+
+@dataclass
+class Session:
+    """
+    Сохраненная сессия домена в формате storage_state Playwright
+
+    Attributes:
+        domain: Домен (хост без www.)
+        created: Начало сессии (unix time); не меняется при пересохранении
+        updated: Время последнего сохранения
+        cookies: Cookies домена и поддоменов
+        origins: localStorage источников домена
+    """
+    domain: str
+    created: float
+    updated: float
+    cookies: List[Dict[str, Any]] = field(default_factory=list)
+    origins: List[Dict[str, Any]] = field(default_factory=list)
+
+    @classmethod
+    def from_storage_state(cls, domain: str, state: Dict[str, Any],
+                           created: Optional[float] = None) -> 'Session':
+        """
+        Сессия домена из context.storage_state()
+
+        Args:
+            domain: Домен
+            state: Результат storage_state (cookies и origins всех сайтов)
+            created: Начало сессии, если контекст продолжает сохраненную
+
+        Returns:
+            Сессия только с данными домена
+        """
+        now = time.time()
+        return cls(
+            domain,
+            created or now,
+            now,
+            [cookie for cookie in state.get('cookies', []) if _host_matches(cookie.get('domain', ''), domain)],
+            [origin for origin in state.get('origins', [])
+             if _host_matches(urlsplit(origin.get('origin', '')).hostname or '', domain)],
+        )
+
+    def local_storage_script(self) -> str:
+        """
+        Скрипт инициализации, восстанавливающий localStorage
+
+        Значения записываются один раз на вкладку (до скриптов сайта),
+        дальше сайт меняет localStorage сам.
+
+        Returns:
+            JavaScript для context.add_init_script
+        """
+        origins = {
+            origin['origin']: [[item['name'], item['value']] for item in origin.get('localStorage', [])]
+            for origin in self.origins
+        }
+        return """
+            (() => {
+                const items = %s[location.origin];
+                const marker = '__restored_session_%d';
+                try {
+                    if (!items || sessionStorage.getItem(marker)) {
+                        return;
+                    }
+                    for (const [name, value] of items) {
+                        localStorage.setItem(name, value);
+                    }
+                    sessionStorage.setItem(marker, '1');
+                } catch (e) {}
+            })();
+        """ % (json.dumps(origins, ensure_ascii=False), int(self.created))
+
+
+class SessionStore:
+    """
+    Сессии по доменам на диске (по JSON файлу на домен)
+
+    Сессия старше max_age считается просроченной и удаляется: следующая
+    успешная страница начинает новую. Пересохраняется сессия не чаще
+    раза в refresh секунд. Файлы читаются заново, если их изменил
+    другой процесс.
+
+    Пример:
+        async with AdvancedAmazonParser(sessions=SessionStore('.sessions')) as parser:
+            products = await parser.parse(url)
+    """
+
+    def __init__(self, directory: str = '.sessions', max_age: float = 6 * 3600, refresh: float = 600.0):
+        """
+        Args:
+            directory: Папка с файлами сессий
+            max_age: Возраст сессии до ротации в секундах
+            refresh: Интервал пересохранения сессии в секундах
+        """
+        self.directory = directory
+        self.max_age = max_age
+        self.refresh = refresh
+        self._cache: Dict[str, Tuple[float, Session]] = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Для передачи в процессы parse_sharded: кэш и блокировка не копируются
+        state = self.__dict__.copy()
+        del state['_cache'], state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def _path(self, domain: str) -> str:
+        """Файл сессии домена"""
+        return os.path.join(self.directory, f"{quote(domain, safe='')}.json")
+
+    def get(self, domain: str) -> Optional[Session]:
+        """
+        Действующая сессия домена
+
+        Args:
+            domain: Домен
+
+        Returns:
+            Сессия или None (нет сохраненной или она просрочена)
+        """
+        path = self._path(domain)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            self._cache.pop(domain, None)
+            return None
+
+        cached = self._cache.get(domain)
+        if cached and cached[0] == mtime:
+            session = cached[1]
+        else:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    session = Session(**json.load(f))
+            except (OSError, ValueError, TypeError) as e:
+                logger.warning(f"Не удалось прочитать сессию {path}: {e}")
+                return None
+            self._cache[domain] = (mtime, session)
+
+        if time.time() - session.created >= self.max_age:
+            self.invalidate(domain, f"старше {self.max_age:g} с")
+            return None
+        return session
+
+    def needs_save(self, domain: str) -> bool:
+        """Сессии домена нет или она сохранялась дольше refresh секунд назад"""
+        session = self.get(domain)
+        return session is None or time.time() - session.updated >= self.refresh
+
+    def save(self, session: Session):
+        """
+        Сохранение сессии
+
+        Args:
+            session: Сессия домена
+        """
+        path = self._path(session.domain)
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            # Свой временный файл у каждого процесса, общий каталог сессий
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(asdict(session), f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            self._cache[session.domain] = (os.path.getmtime(path), session)
+        logger.debug(f"Сессия {session.domain} сохранена ({len(session.cookies)} cookies)")
+
+    def invalidate(self, domain: str, reason: str = ''):
+        """
+        Удаление сессии домена
+
+        Args:
+            domain: Домен
+            reason: Причина для лога
+        """
+        with self._lock:
+            self._cache.pop(domain, None)
+            try:
+                os.remove(self._path(domain))
+            except FileNotFoundError:
+                return
+        logger.info(f"Сессия {domain} сброшена{f': {reason}' if reason else ''}")
@@ -0,0 +1,30 @@
+"""
+Парсеры по названию сайта для командной строки и демона
+Модуль парсера импортируется только при запросе его класса
+"""
+
+import importlib
+from typing import Dict, Tuple
+
+# Классы парсеров по названию сайта: (модуль, класс)
+SITES: Dict[str, Tuple[str, str]] = {
+    'generic': ('product_parser', 'ProductParser'),
+    'amazon': ('amazon_advanced', 'AdvancedAmazonParser'),
+}
+
+
+def parser_class(site: str):
+    """
+    Класс парсера для сайта
+
+    Args:
+        site: Название сайта (ключ SITES)
+
+    Returns:
+        Класс парсера
+
+    Raises:
+        KeyError: Неизвестный сайт
+    """
+    module_name, class_name = SITES[site]
+    return getattr(importlib.import_module(module_name), class_name)
@@ -0,0 +1,306 @@
+"""
+Разбор статического HTML без браузера
+Использует те же списки селекторов, что и парсеры на Playwright
+"""
+
+import gzip
+import logging
+import os
+import zlib
+from email.message import Message
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, unquote
+
+import metrics
+from scheduler import BlockedPageError
+
+logger = logging.getLogger(__name__)
+
+# Элементы, текст которых не входит в innerText
+_SKIP_TEXT_TAGS = {'script', 'style', 'noscript', 'template'}
+
+
+def _require_lxml():
+    """Импорт lxml и cssselect с понятной ошибкой при их отсутствии"""
+    try:
+        import lxml.html
+        from lxml import etree
+        from cssselect import GenericTranslator, SelectorError
+    except ImportError as e:
+        raise ImportError(
+            "Для статического разбора нужны lxml и cssselect: pip install lxml cssselect"
+        ) from e
+    return lxml.html, etree, GenericTranslator, SelectorError
+
+
+@lru_cache(maxsize=512)
+def _compile(selector: str, prefix: str):
+    """
+    Компиляция CSS селектора в XPath
+
+    Args:
+        selector: CSS селектор
+        prefix: Ось XPath: 'descendant::' для потомков карточки,
+            'descendant-or-self::' для поиска по документу
+
+    Returns:
+        Скомпилированный XPath или None для неподдерживаемого селектора
+    """
+    _, etree, GenericTranslator, SelectorError = _require_lxml()
+    try:
+        return etree.XPath(GenericTranslator().css_to_xpath(selector, prefix=prefix))
+    except (SelectorError, etree.XPathSyntaxError) as e:
+        logger.debug(f"Селектор {selector} не поддерживается: {e}")
+        return None
+
+
+def _select(element: Any, selector: str, prefix: str = 'descendant::') -> List[Any]:
+    """Все элементы по CSS селектору (пустой список для неподдерживаемого)"""
+    xpath = _compile(selector, prefix)
+    return xpath(element) if xpath is not None else []
+
+
+def inner_text(element: Any) -> str:
+    """
+    Приближение innerText для элемента lxml
+
+    Текст скриптов и стилей пропускается, пробелы схлопываются.
+
+    Args:
+        element: Элемент lxml
+
+    Returns:
+        Видимый текст элемента
+    """
+    parts = []
+
+    def walk(node):
+        if isinstance(node.tag, str) and node.tag.lower() in _SKIP_TEXT_TAGS:
+            return
+        if node.text and isinstance(node.tag, str):
+            parts.append(node.text)
+        for child in node:
+            walk(child)
+            if child.tail:
+                parts.append(child.tail)
+
+    walk(element)
+    return ' '.join(''.join(parts).split())
+
+
+def snapshot_cards(root: Any, card_selectors: List[str], spec: Dict[str, Any],
+                   limit: Optional[int] = None) -> Tuple[Optional[str], int, List[Dict[str, Any]]]:
+    """
+    Снимки карточек товаров из дерева lxml
+
+    Формат совпадает с ProductParser._snapshot_cards, поэтому снимки
+    превращаются в товары теми же методами _product_from_snapshot.
+
+    Args:
+        root: Корень документа lxml
+        card_selectors: Селекторы карточек в порядке приоритета
+        spec: Спецификация атрибутов и текстов (см. ProductParser._batch_spec)
+        limit: Максимальное количество карточек
+
+    Returns:
+        Сработавший селектор, общее число карточек и их снимки
+    """
+    cards = []
+    matched = None
+    for selector in card_selectors:
+        found = _select(root, selector, 'descendant-or-self::')
+        if found:
+            cards = found
+            matched = selector
+            break
+
+    total = len(cards)
+    snapshots = []
+
+    for card in cards[:limit]:
+        attributes = {attr: card.get(attr) for attr in spec['attributes']}
+
+        nested = []
+        for selector, attr in spec['nested']:
+            found = _select(card, selector)
+            nested.append(found[0].get(attr) if found else None)
+
+        fields = {}
+        for field, options in spec['fields'].items():
+            texts = []
+            for i, selector in enumerate(options['selectors']):
+                found = _select(card, selector)
+                if not found:
+                    continue
+                text = inner_text(found[0])
+                texts.append([i, text])
+                if options['stop'] and text.strip():
+                    break
+            fields[field] = texts
+
+        snapshots.append({'attributes': attributes, 'nested': nested, 'fields': fields})
+
+    return matched, total, snapshots
+
+
+class StaticProductParser:
+    """
+    Парсер серверно-отрендеренных страниц на lxml
+
+    Берет селекторы и логику построения товаров у парсера Playwright,
+    но загружает HTML обычным HTTP запросом или читает его с диска.
+    """
+
+    def __init__(self, parser: Any, timeout: float = 30.0):
+        """
+        Инициализация статического парсера
+
+        Args:
+            parser: Экземпляр ProductParser или его наследника (браузер не запускается)
+            timeout: Таймаут HTTP запроса в секундах
+        """
+        self.parser = parser
+        self.timeout = timeout
+
+    def _headers(self) -> Dict[str, str]:
+        """Заголовки запроса на основе настроек контекста парсера"""
+        options = self.parser._context_options()
+        headers = dict(options.get('extra_http_headers', {}))
+        headers['User-Agent'] = options.get('user_agent', headers.get('User-Agent', ''))
+        # urllib не распаковывает brotli
+        headers['Accept-Encoding'] = 'gzip, deflate'
+        return headers
+
+    def fetch(self, url: str) -> str:
+        """
+        Получение HTML по URL, file:// URL или пути к файлу
+
+        Args:
+            url: Адрес или путь к сохраненной странице
+
+        Returns:
+            HTML страницы
+        """
+        parts = urlsplit(url)
+        if parts.scheme == 'file' or (not parts.scheme and os.path.exists(url)):
+            path = unquote(parts.path) if parts.scheme == 'file' else url
+            with open(path, 'rb') as f:
+                return f.read().decode('utf-8', errors='replace')
+
+        headers = self._headers()
+        cache = getattr(self.parser, 'response_cache', None)
+        if cache:
+            cached = cache.get(url, headers)
+            if cached:
+                return self._decode(cached.body, cached.headers)
+            if cache.replay_only:
+                raise LookupError(f"Нет в кэше (режим replay_only): {url}")
+
+        import urllib.request
+
+        request = urllib.request.Request(url, headers=headers)
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            body = response.read()
+            status = response.status
+            response_headers = dict(response.headers.items())
+
+        encoding = response_headers.get('Content-Encoding', '').lower()
+        if encoding == 'gzip':
+            body = gzip.decompress(body)
+        elif encoding == 'deflate':
+            body = zlib.decompress(body)
+
+        if cache and status == 200:
+            cache.put(url, headers, status, response_headers, body)
+        return self._decode(body, response_headers)
+
+    @staticmethod
+    def _decode(body: bytes, headers: Dict[str, str]) -> str:
+        """Декодирование тела ответа по charset из Content-Type"""
+        message = Message()
+        for name, value in headers.items():
+            if name.lower() == 'content-type':
+                message['Content-Type'] = value
+        charset = message.get_content_charset() or 'utf-8'
+        return body.decode(charset, errors='replace')
+
+    def parse_html(self, html: str, limit: Optional[int] = None, url: str = '') -> List[Dict[str, str]]:
+        """
+        Извлечение товаров из HTML
+
+        Args:
+            html: HTML страницы
+            limit: Максимальное количество товаров
+            url: Адрес страницы (для кэша селекторов)
+
+        Returns:
+            Список словарей с информацией о товарах
+        """
+        lxml_html, _, _, _ = _require_lxml()
+        root = lxml_html.fromstring(html)
+
+        card_selectors = self.parser._selectors_for(url, 'cards', self.parser.PRODUCT_SELECTORS)
+        spec = self.parser._batch_spec(url)
+        selector, total, snapshots = snapshot_cards(root, card_selectors, spec, limit)
+        self.parser._learn_from_snapshots(url, card_selectors, selector, spec, snapshots)
+        if not snapshots:
+            reason = self._detect_block(root)
+            if reason:
+                raise BlockedPageError(url, reason)
+            logger.warning("Товары не найдены в статическом HTML")
+            return []
+
+        logger.info(f"Найдено {total} товаров в статическом HTML по селектору: {selector}")
+
+        products = []
+        for i, snapshot in enumerate(snapshots):
+            try:
+                product_data = self.parser._product_from_snapshot(snapshot, i)
+                if product_data:
+                    products.append(product_data)
+            except Exception as e:
+                logger.error(f"Ошибка извлечения данных товара {i}: {e}")
+                continue
+
+        return products
+
+    def _detect_block(self, root: Any) -> Optional[str]:
+        """
+        Проверка HTML на страницу блокировки или CAPTCHA (см. ProductParser._detect_block)
+
+        Args:
+            root: Корень документа lxml
+
+        Returns:
+            Сработавший признак или None
+        """
+        for selector in self.parser.BLOCK_SELECTORS:
+            try:
+                if _select(root, selector, 'descendant-or-self::'):
+                    return selector
+            except Exception:
+                continue
+        if self.parser.BLOCK_TEXTS:
+            text = root.text_content()
+            for marker in self.parser.BLOCK_TEXTS:
+                if marker in text:
+                    return marker
+        return None
+
+    def parse(self, url: str, limit: Optional[int] = None) -> List[Dict[str, str]]:
+        """
+        Загрузка и разбор страницы без браузера
+
+        Args:
+            url: Адрес или путь к сохраненной странице
+            limit: Максимальное количество товаров
+
+        Returns:
+            Список словарей с информацией о товарах
+        """
+        logger.info(f"Статическая загрузка: {url}")
+        with metrics.phase(metrics.FETCH):
+            html = self.fetch(url)
+        with metrics.phase(metrics.EXTRACTION):
+            return self.parse_html(html, limit, url)
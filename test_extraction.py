@@ -0,0 +1,126 @@
+"""
+Пакетное и поэлементное извлечение дают одинаковые товары
+
+Страница Playwright заменена деревом lxml: ElementHandle отвечает
+через селекторы static_parser, а page.evaluate(_BATCH_EXTRACT_JS)
+- через snapshot_cards, повторяющий этот скрипт. Браузер не нужен.
+"""
+
+import asyncio
+
+import pytest
+
+from amazon_advanced import AdvancedAmazonParser
+from benchmark import build_cards, build_listing_html
+from product_parser import ProductParser, _BATCH_EXTRACT_JS
+from records import FALLBACK_ID
+from selector_cache import SelectorCache
+from static_parser import _require_lxml, _select, inner_text, snapshot_cards
+
+
+class FakeElement:
+    """Элемент lxml с интерфейсом ElementHandle"""
+
+    def __init__(self, element):
+        self.element = element
+
+    async def query_selector(self, selector):
+        found = _select(self.element, selector)
+        return FakeElement(found[0]) if found else None
+
+    async def get_attribute(self, name):
+        return self.element.get(name)
+
+    async def inner_text(self):
+        return inner_text(self.element)
+
+
+class FakePage:
+    """Документ lxml с интерфейсом Page"""
+
+    def __init__(self, html, url='https://example.com/catalog'):
+        lxml_html, _, _, _ = _require_lxml()
+        self.root = lxml_html.fromstring(html)
+        self.url = url
+
+    async def query_selector_all(self, selector):
+        return [FakeElement(element) for element in _select(self.root, selector, 'descendant-or-self::')]
+
+    async def evaluate(self, script, arg):
+        assert script == _BATCH_EXTRACT_JS
+        selector, total, snapshots = snapshot_cards(self.root, arg['cardSelectors'], arg['spec'], arg['limit'])
+        return {'selector': selector, 'total': total, 'snapshots': snapshots}
+
+
+def page_html(cards):
+    return '<html><body><main>' + ''.join(cards) + '</main></body></html>'
+
+
+def extract_both(parser, page, limit=None):
+    async def run():
+        return (await parser._extract_products_by_element(page, limit),
+                await parser._extract_products_batch(page, limit))
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize('parser_class, markup', [
+    (ProductParser, 'generic'),
+    (AdvancedAmazonParser, 'amazon'),
+])
+@pytest.mark.parametrize('limit', [None, 7])
+def test_listing_fixture(parser_class, markup, limit):
+    page = FakePage(build_listing_html(30, markup))
+    by_element, batch = extract_both(parser_class(), page, limit)
+    assert by_element
+    assert len(by_element) == (limit or 30)
+    assert batch == by_element
+
+
+def test_generic_fallbacks():
+    # Без атрибута ID, без названия, с ценой только в data-атрибуте
+    cards = build_cards(3, 'generic') + [
+        '<div class="product-card"><span class="price">12.50 ₽</span></div>',
+        '<div class="product-card" data-id="x1" data-price="99.90"><h3 class="title">Только атрибут</h3></div>',
+        '<div class="product-card" data-sku="s2"><h2> </h2><div class="name">Пустой h2</div></div>',
+    ]
+    by_element, batch = extract_both(ProductParser(), FakePage(page_html(cards)))
+    assert [product['id'] for product in by_element] == ['sku-0', 'sku-1', 'sku-2', '4', 'x1', 's2']
+    assert [FALLBACK_ID in product for product in by_element] == [False, False, False, True, False, False]
+    assert batch == by_element
+
+
+def test_amazon_fallbacks():
+    # ASIN из ссылки, позиционный ID и цена из data-атрибута
+    cards = build_cards(2, 'amazon') + [
+        '<div data-component-type="s-search-result" class="s-result-item">'
+        '<h2><a href="/x/dp/B000000777/ref=1"><span>Из ссылки</span></a></h2>'
+        '<span class="a-price"><span class="a-offscreen">$5.00</span></span></div>',
+        '<div data-component-type="s-search-result" class="s-result-item" data-price="7.25">'
+        '<h2><span>Без ASIN</span></h2></div>',
+    ]
+    by_element, batch = extract_both(AdvancedAmazonParser(), FakePage(page_html(cards)))
+    assert [product['id'] for product in by_element][2:] == ['B000000777', 'amazon_4']
+    assert [product.get(FALLBACK_ID, False) for product in by_element][2:] == [False, True]
+    assert batch == by_element
+
+
+@pytest.mark.parametrize('batch', [True, False])
+def test_selectors_learned_once_per_page(batch):
+    cache = SelectorCache(None, max_misses=3)
+    parser = ProductParser(selector_cache=cache)
+    parser._use_batch_extraction = lambda: batch
+    listing = FakePage(build_listing_html(30, 'generic'))
+    # Несколько карточек без h3 - не повод понижать селектор, верный для страницы
+    mixed = FakePage(page_html(build_cards(10, 'generic') + [
+        f'<div class="product-card" data-id="h{i}"><h2>Другая разметка {i}</h2></div>' for i in range(4)
+    ]))
+
+    async def run():
+        for page in (listing, listing, mixed):
+            await parser._extract_products(page)
+
+    asyncio.run(run())
+    stats = cache._data['example.com']
+    assert stats['cards'] == {'[class*="product"]': {'hits': 3, 'misses': 0}}
+    assert stats['name']['h3'] == {'hits': 3, 'misses': 0}
+    assert 'h2' not in stats['name']
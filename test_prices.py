@@ -0,0 +1,85 @@
+"""
+Разбор цен: одиночный, векторный и статистика по валютам
+"""
+
+import math
+
+import pandas as pd
+import pytest
+
+from prices import format_price, normalize_number, normalize_prices, parse_price, price_stats_by_currency
+
+CASES = [
+    ('$1,299.99', 1299.99, 'USD'),
+    ('1.299,99 €', 1299.99, 'EUR'),
+    ('1 299,99 ₽', 1299.99, 'RUB'),
+    ('1 299,99 руб.', 1299.99, 'RUB'),
+    ('1 299 ₽', 1299.0, 'RUB'),
+    ('10 000 000', 10000000.0, None),
+    ('12,99', 12.99, None),
+    ('0.299', 0.299, None),
+    ('1,299', 1299.0, None),
+    ('29.', 29.0, None),
+    ('US$ 5', 5.0, 'USD'),
+    ('10,99 € - 24,99 €', 10.99, 'EUR'),
+    # Две цены не сливаются в одно число
+    ('19.99\n24.99', 19.99, None),
+    ('19.99  24.99', 19.99, None),
+    ('19.99 245.00', 19.99, None),
+    ('1 2\n345', 1.0, None),
+]
+
+
+@pytest.mark.parametrize('text, value, currency', CASES)
+def test_parse_price(text, value, currency):
+    _, parsed, detected = parse_price(text)
+    assert parsed == pytest.approx(value)
+    assert detected == currency
+
+
+def test_parse_price_without_number():
+    assert parse_price('Цена не указана') == (None, None, None)
+    assert parse_price(None) == (None, None, None)
+
+
+def test_normalize_number():
+    assert normalize_number('1,299.99') == '1299.99'
+    assert normalize_number('1.299.999') == '1299999'
+    assert normalize_number('.,') is None
+
+
+def test_vectorized_matches_single():
+    texts = [text for text, _, _ in CASES] + ['Цена не указана', '', None]
+    frame = normalize_prices(pd.Series(texts, index=range(10, 10 + len(texts))))
+
+    assert list(frame.index) == list(range(10, 10 + len(texts)))
+    for text, (value, currency) in zip(texts, zip(frame['price_value'], frame['currency'])):
+        _, expected, expected_currency = parse_price(text)
+        if expected is None:
+            assert math.isnan(value)
+        else:
+            assert value == pytest.approx(expected), text
+        assert (None if pd.isna(currency) else currency) == expected_currency, text
+
+
+def test_range_upper_bound_and_default_currency():
+    frame = normalize_prices(pd.Series(['$10.99–$24.99', '21', 'нет']), default_currency='USD')
+    assert list(frame['price_max'][:2]) == [24.99, 21.0]
+    assert list(frame['currency'][:2]) == ['USD', 'USD']
+    assert pd.isna(frame['currency'][2])
+
+
+def test_stats_are_per_currency():
+    stats = price_stats_by_currency([10.0, 20.0, 1000.0, float('nan'), 5.0],
+                                    ['USD', 'USD', 'RUB', 'EUR', None])
+    assert list(stats) == ['USD', 'RUB', None]
+    assert stats['USD']['count'] == 2
+    assert stats['USD']['mean'] == 15.0
+    assert stats['RUB']['max'] == 1000.0
+
+
+def test_format_price():
+    assert format_price(21, 'USD') == '$21.00'
+    assert format_price(19.5, 'EUR') == '€19.50'
+    assert format_price(3, 'CAD') == '3.00 CAD'
+    assert format_price(3, None) == '3.00'
@@ -0,0 +1,113 @@
+"""
+База товаров: дельта-обход, исчезновения и история цен
+"""
+
+import pytest
+
+from product_store import CHANGED, GONE, NEW, ProductStore
+from records import FALLBACK_ID
+
+PAGE = 'https://shop.example/catalog?page=1'
+OTHER = 'https://other.example/list'
+
+
+def product(product_id, name='Товар', price='10.00'):
+    return {'id': product_id, 'name': name, 'price': price, 'price_value': float(price), 'currency': 'USD'}
+
+
+def fallback(product_id, name='Товар'):
+    return {**product(product_id, name), FALLBACK_ID: True}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ProductStore(str(tmp_path / 'products.sqlite'))
+    yield store
+    store.close()
+
+
+def kinds(changes):
+    return sorted((change.kind, change.id) for change in changes)
+
+
+def test_delta_crawl(store):
+    assert kinds(store.sync(PAGE, [product('A'), product('B')], at=1.0)) == [(NEW, 'A'), (NEW, 'B')]
+    # Без изменений - пустой журнал
+    assert store.sync(PAGE, [product('A'), product('B')], at=2.0) == []
+
+    changes = store.sync(PAGE, [product('A', price='12.00'), product('C')], at=3.0)
+    assert kinds(changes) == [(CHANGED, 'A'), (GONE, 'B'), (NEW, 'C')]
+    changed = next(change for change in changes if change.kind == CHANGED)
+    assert (changed.old_price, changed.price) == ('10.00', '12.00')
+
+    assert [row['price'] for row in store.price_history('A')] == ['10.00', '12.00']
+    assert store.summary()['gone'] == 1
+
+
+def test_empty_crawl_keeps_products(store):
+    store.sync(PAGE, [product('A')], at=1.0)
+    assert store.sync(PAGE, [], at=2.0) == []
+    assert store.summary()['active'] == 1
+
+
+def test_positional_ids_are_not_stored(store):
+    # Номера карточек повторяются на всех страницах и сайтах
+    store.sync(PAGE, [fallback('1', 'Первый'), fallback('amazon_2', 'Второй'), product('B07')], at=1.0)
+    changes = store.sync(OTHER, [fallback('1', 'Другой'), fallback('amazon_2', 'Другой')], at=2.0)
+
+    assert changes == []
+    assert [row['id'] for row in store.products()] == ['B07']
+    assert store.sync(PAGE, [fallback('1', 'Третий'), product('B07')], at=3.0) == []
+
+
+def test_sequential_site_ids_are_kept(store):
+    # Настоящие data-id могут совпадать с номером карточки
+    changes = store.sync(PAGE, [product('1'), product('2'), product('3')], at=1.0)
+    assert kinds(changes) == [(NEW, '1'), (NEW, '2'), (NEW, '3')]
+
+
+def test_migration_from_v1_backfills_price_history(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / 'v1.sqlite')
+    db = sqlite3.connect(path)
+    db.executescript(
+        'CREATE TABLE products ('
+        ' id TEXT PRIMARY KEY, url TEXT, name TEXT, price TEXT, price_value REAL,'
+        ' currency TEXT, hash TEXT, first_seen REAL, updated REAL, gone INTEGER DEFAULT 0);'
+        'CREATE TABLE changes ('
+        ' seq INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT, id TEXT, url TEXT,'
+        ' name TEXT, price TEXT, old_price TEXT, at REAL);'
+        'CREATE TABLE crawls (url TEXT PRIMARY KEY, at REAL, products INTEGER);'
+    )
+    db.executemany('INSERT INTO products VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', [
+        ('A', PAGE, 'Товар', '12.00', 12.0, 'USD', 'h1', 1.0, 3.0, 0),
+        ('B', PAGE, 'Товар', '5.00', 5.0, 'USD', 'h2', 1.0, 4.0, 1),
+    ])
+    db.executemany('INSERT INTO changes (kind, id, url, name, price, old_price, at) VALUES (?, ?, ?, ?, ?, ?, ?)', [
+        ('new', 'A', PAGE, 'Товар', '10.00', None, 1.0),
+        ('new', 'B', PAGE, 'Товар', '5.00', None, 1.0),
+        ('changed', 'A', PAGE, 'Товар', '12.00', '10.00', 3.0),
+        ('gone', 'B', PAGE, 'Товар', '5.00', None, 4.0),
+    ])
+    db.execute('INSERT INTO crawls VALUES (?, ?, ?)', (PAGE, 4.0, 1))
+    db.commit()
+    db.close()
+
+    store = ProductStore(path)
+    try:
+        assert store.price_history('A') == [
+            {'price': '12.00', 'price_value': 12.0, 'currency': 'USD', 'url': PAGE, 'at': 3.0}
+        ]
+        assert [row['at'] for row in store.price_history('B')] == [1.0]
+        store.sync(PAGE, [product('A', price='15.00')], at=5.0)
+        assert [row['price'] for row in store.price_history('A')] == ['12.00', '15.00']
+    finally:
+        store.close()
+
+    # Повторное открытие не дублирует записи
+    store = ProductStore(path)
+    try:
+        assert len(store.price_history('A')) == 2
+    finally:
+        store.close()
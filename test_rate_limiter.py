@@ -0,0 +1,158 @@
+"""
+Лимит запросов по доменам: корзина токенов, резервирование и доли процессов
+"""
+
+import asyncio
+import pickle
+
+import pytest
+
+import rate_limiter
+from rate_limiter import RateLimiter, SlotBucket, TokenBucket
+
+
+class FakeClock:
+    """Общие для всех процессов часы, которые двигает тест"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, 'time', clock)
+    return clock
+
+
+def test_token_bucket_burst_then_rate(clock):
+    bucket = TokenBucket(rate=2.0, burst=3)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    # Резервы уходят в минус: задержки выдаются по очереди
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+
+    clock.now += 1.0
+    assert bucket.delay() == pytest.approx(0.5)
+    clock.now += 0.5
+    assert bucket.delay() == 0.0
+    # Корзина не переполняется
+    clock.now += 100
+    assert [bucket.reserve() for _ in range(4)][-1] == pytest.approx(0.5)
+
+
+def test_try_acquire_reserves_only_when_free(clock):
+    limiter = RateLimiter(rate=1.0, burst=1)
+    url = 'https://www.a.com/s?k=1'
+
+    assert limiter.try_acquire(url) == 0.0
+    assert limiter.try_acquire(url) == pytest.approx(1.0)
+    # Неудачная попытка ничего не резервирует
+    assert limiter.try_acquire(url) == pytest.approx(1.0)
+    assert limiter.delay('https://a.com/other') == pytest.approx(1.0)
+
+    clock.now += 1.0
+    assert limiter.try_acquire(url) == 0.0
+    assert limiter.try_acquire('https://b.com/') == 0.0
+
+
+def test_unlimited_domains(clock):
+    limiter = RateLimiter(rate=1.0, burst=1, domains={'fast.com': 0})
+    for _ in range(3):
+        assert limiter.try_acquire('file:///tmp/page.html') == 0.0
+        assert limiter.try_acquire('https://fast.com/') == 0.0
+
+
+def test_domain_limits(clock):
+    limiter = RateLimiter(rate=1.0, burst=1, domains={'a.com': (0.5, 2), 'b.com': 4.0})
+    assert limiter.limit('a.com') == (0.5, 2)
+    assert limiter.limit('b.com') == (4.0, 1)
+    assert limiter.limit('c.com') == (1.0, 1)
+    assert [limiter.try_acquire('https://a.com/') for _ in range(3)][:2] == [0.0, 0.0]
+    assert limiter.delay('https://a.com/') == pytest.approx(2.0)
+
+
+def test_acquire_waits(clock, monkeypatch):
+    slept = []
+
+    async def sleep(delay):
+        slept.append(delay)
+
+    monkeypatch.setattr(rate_limiter.asyncio, 'sleep', sleep)
+    limiter = RateLimiter(rate=2.0, burst=1)
+
+    async def run():
+        return [await limiter.acquire('https://a.com/') for _ in range(3)]
+
+    assert asyncio.run(run()) == [0.0, pytest.approx(0.5), pytest.approx(1.0)]
+    assert slept == [pytest.approx(0.5), pytest.approx(1.0)]
+    assert limiter.waited == pytest.approx(1.5)
+
+
+@pytest.mark.parametrize('burst, workers', [(5, 2), (4, 4), (3, 2), (1, 3), (2, 5)])
+def test_for_workers_burst_capped(burst, workers):
+    limiter = RateLimiter(rate=3.0, burst=burst, domains={'a.com': (6.0, burst)})
+    shares = [limiter.for_workers(workers, worker) for worker in range(workers)]
+
+    assert sum(share.rate for share in shares) == pytest.approx(3.0)
+    assert sum(share.limit('a.com')[0] for share in shares) == pytest.approx(6.0)
+    assert sum(share.burst for share in shares) <= burst
+    assert sum(share.limit('a.com')[1] for share in shares) <= burst
+    assert [share.slot for share in shares] == [(worker, workers) for worker in range(workers)]
+    bucket_class = TokenBucket if burst >= workers else SlotBucket
+    assert all(isinstance(share._bucket('https://a.com/'), bucket_class) for share in shares)
+
+
+def simulate(limiters, url, seconds, step):
+    """Все процессы запрашивают домен при первой возможности на общих часах"""
+    clock = rate_limiter.time
+    end = clock.now + seconds
+    requests = []
+    while clock.now < end:
+        for worker, limiter in enumerate(limiters):
+            if limiter.try_acquire(url) == 0.0:
+                requests.append((clock.now, worker))
+        clock.now += step
+    return requests
+
+
+@pytest.mark.parametrize('workers', [2, 3, 4])
+def test_slots_keep_combined_rate_and_burst(clock, workers):
+    rate = 2.0
+    limiter = RateLimiter(rate=rate, burst=1)
+    shares = [limiter.for_workers(workers, worker) for worker in range(workers)]
+
+    requests = simulate(shares, 'https://a.com/', seconds=10.0, step=0.01)
+    times = [at for at, _ in requests]
+
+    # Все процессы работают, вместе - не быстрее исходного лимита
+    assert {worker for _, worker in requests} == set(range(workers))
+    assert len(times) <= 10.0 * rate + 1
+    assert len(times) >= 10.0 * rate - workers
+    # Всплеск 1: в любом окне k / rate не больше k + 1 запросов, как у одной корзины
+    for k in (1, 2, 3):
+        for i, start in enumerate(times):
+            window = [at for at in times[i:] if at <= start + k / rate + 1e-9]
+            assert len(window) <= k + 1
+    # Слоты процессов не пересекаются
+    assert len(set(times)) == len(times)
+
+
+def test_pickle_keeps_limits_not_buckets(clock):
+    limiter = RateLimiter(rate=2.0, burst=4, domains={'a.com': (1.0, 2)}).for_workers(2, 1)
+    limiter.try_acquire('https://a.com/')
+    limiter.waited = 3.0
+
+    copy = pickle.loads(pickle.dumps(limiter))
+
+    assert copy.rate == 1.0 and copy.burst == 2
+    assert copy.domains == {'a.com': (0.5, 1)}
+    assert copy.slot == (1, 2)
+    assert copy._buckets == {} and copy.waited == 0.0
+    assert copy.try_acquire('https://a.com/') == 0.0
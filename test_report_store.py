@@ -0,0 +1,72 @@
+"""
+Инкрементальное хранилище отчета на Excel файлах из репозитория
+"""
+
+import glob
+import os
+import shutil
+
+import pytest
+
+from report_store import SOURCE_COLUMN, ReportStore
+
+REPO = os.path.dirname(os.path.abspath(__file__))
+REPO_FILES = sorted(os.path.basename(path) for path in glob.glob(os.path.join(REPO, 'amazon_*.xlsx')))
+
+
+@pytest.fixture
+def directory(tmp_path):
+    for filename in REPO_FILES:
+        shutil.copy(os.path.join(REPO, filename), tmp_path / filename)
+    return tmp_path
+
+
+def test_repo_files(directory):
+    store = ReportStore(str(directory))
+    counts = store.refresh()
+
+    assert counts['added'] == len(REPO_FILES) >= 3
+    assert not store.errors
+    df = store.frame()
+    assert not df.columns.duplicated().any()
+    assert 'Название' not in df.columns
+    # В сводном файле названия лежали в колонке 'Название'
+    summary = df[df[SOURCE_COLUMN].str.startswith('amazon_summary_')]
+    assert len(summary) and summary['Название товара'].notna().all()
+    assert len(df) == sum(entry['rows'] for entry in store.manifest.values())
+
+
+def test_unchanged_files_are_not_read(directory, monkeypatch):
+    ReportStore(str(directory)).refresh()
+
+    store = ReportStore(str(directory))
+    monkeypatch.setattr(store, '_read_source', lambda path: pytest.fail(f"прочитан {path}"))
+    assert store.refresh()['unchanged'] == len(REPO_FILES)
+
+
+def test_broken_file_does_not_abort_refresh(directory):
+    (directory / 'broken.xlsx').write_bytes(b'not an excel file')
+    os.makedirs(directory / '.report_cache')
+    (directory / '.report_cache' / 'orphan_part.parquet').write_bytes(b'')
+
+    store = ReportStore(str(directory))
+    counts = store.refresh()
+
+    assert list(store.errors) == ['broken.xlsx']
+    assert counts['added'] == len(REPO_FILES)
+    assert os.path.exists(store.manifest_path)
+    parts = sorted(name for name in os.listdir(store.cache_dir) if name != 'manifest.json')
+    assert parts == sorted(entry['part'] for entry in store.manifest.values())
+
+
+def test_changed_and_removed_files(directory):
+    store = ReportStore(str(directory))
+    store.refresh()
+
+    first, second = REPO_FILES[:2]
+    os.remove(directory / first)
+    shutil.copy(directory / second, directory / 'copy.xlsx')
+    shutil.copy(directory / REPO_FILES[-1], directory / second)
+
+    counts = ReportStore(str(directory)).refresh()
+    assert counts == {'added': 1, 'updated': 1, 'removed': 1, 'unchanged': len(REPO_FILES) - 2}
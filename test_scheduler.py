@@ -0,0 +1,238 @@
+"""
+Планировщик обхода: повторы, автомат размыкания, dead_letters и лимит доменов
+
+Парсер заменен заглушкой, время - ручными часами: ожидание в очереди
+не занимает реальных секунд.
+"""
+
+import asyncio
+import json
+
+import pytest
+
+import rate_limiter
+import scheduler
+from product_parser import ParseResult, ProductParser
+from rate_limiter import RateLimiter
+from scheduler import BlockedPageError, CircuitBreaker, CrawlScheduler, RetryPolicy, dead_letter_urls
+
+
+class FakeClock:
+    """Часы, которые двигает только тест (и ожидание планировщика)"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+class FakeParser:
+    """
+    Заглушка парсера: исходы по URL задаются списком
+
+    Элемент списка - исключение (неудачная попытка) или None (успех).
+    Когда список исчерпан, попытка успешна.
+    """
+
+    def __init__(self, clock, outcomes=None, rate_limiter=None):
+        self.clock = clock
+        self.outcomes = {url: list(items) for url, items in (outcomes or {}).items()}
+        self.rate_limiter = rate_limiter
+        self.pool_size = 1
+        self.pool = None
+        self.calls = []
+
+    def _active_rate_limiter(self):
+        return self.rate_limiter
+
+    async def _parse_result(self, index, url, reserved=False, attempt=1):
+        self.calls.append((url, self.clock.now, reserved))
+        queued = self.outcomes.get(url)
+        error = queued.pop(0) if queued else None
+        if error is not None:
+            return ParseResult(index, url, error=error)
+        return ParseResult(index, url, products=[{'id': str(index), 'name': url, 'price': '1'}])
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(scheduler, 'time', clock)
+    monkeypatch.setattr(rate_limiter, 'time', clock)
+
+    real_wait_for = asyncio.wait_for
+
+    async def wait_for(awaitable, timeout):
+        if timeout is None:
+            return await real_wait_for(awaitable, None)
+        # Даем запущенным попыткам завершиться, затем "ждем" сдвигом часов
+        future = asyncio.ensure_future(awaitable)
+        for _ in range(5):
+            await asyncio.sleep(0)
+        if future.done():
+            return future.result()
+        future.cancel()
+        clock.now += timeout
+        raise asyncio.TimeoutError
+
+    monkeypatch.setattr(asyncio, 'wait_for', wait_for)
+    return clock
+
+
+def crawl(crawler, urls):
+    async def run():
+        return [result async for result in crawler.run(urls)]
+    return asyncio.run(run())
+
+
+def test_retry_with_backoff(clock):
+    url = 'https://a.com/1'
+    parser = FakeParser(clock, {url: [RuntimeError('timeout'), RuntimeError('timeout')]})
+    crawler = CrawlScheduler(parser, concurrency=1, retry=RetryPolicy(base_delay=1.0, jitter=0))
+
+    [result] = crawl(crawler, [url])
+
+    assert result.ok and result.attempts == 3
+    start = parser.calls[0][1]
+    assert [at - start for _, at, _ in parser.calls] == [0.0, 1.0, 3.0]
+    assert crawler.retries == 2
+    assert not crawler.dead_letters
+
+
+def test_retry_delay_jitter(monkeypatch):
+    monkeypatch.setattr(scheduler.random, 'uniform', lambda low, high: high)
+    policy = RetryPolicy(base_delay=2.0, max_delay=5.0, jitter=0.5)
+    assert policy.delay(1) == 2.0
+    assert policy.delay(2) == 4.0
+    assert policy.delay(5) == 5.0
+
+    monkeypatch.setattr(scheduler.random, 'uniform', lambda low, high: low)
+    assert policy.delay(2) == 2.0
+
+
+def test_dead_letters(clock):
+    urls = ['https://a.com/broken', 'https://a.com/config', 'https://a.com/ok']
+    parser = FakeParser(clock, {
+        urls[0]: [RuntimeError('500')] * 5,
+        urls[1]: [ValueError('нет селектора')],
+    })
+    crawler = CrawlScheduler(parser, concurrency=2, retry=RetryPolicy(max_attempts=3, base_delay=0.5, jitter=0))
+
+    results = {result.url: result for result in crawl(crawler, urls)}
+
+    assert results[urls[2]].ok
+    letters = {letter.url: letter for letter in crawler.dead_letters}
+    assert letters[urls[0]].reason == 'retries_exhausted'
+    assert letters[urls[0]].attempts == 3
+    assert letters[urls[0]].error == 'RuntimeError: 500'
+    assert letters[urls[1]].reason == 'not_retryable'
+    assert letters[urls[1]].attempts == 1
+    assert dead_letter_urls(reversed(crawler.dead_letters)) == urls[:2]
+
+
+def test_breaker_open_half_open_close():
+    breaker = CircuitBreaker(threshold=2, cooldown=10.0, max_trips=3)
+    domain = 'a.com'
+
+    assert not breaker.record_block(domain, 0.0)
+    assert breaker.record_block(domain, 0.0)
+    assert breaker.wait_time(domain, 4.0) == 6.0
+    # Ответ на запрос, отправленный до размыкания, паузу не продлевает
+    assert not breaker.record_block(domain, 5.0)
+
+    # Пауза прошла: одна пробная страница, остальные ждут ее результата
+    assert breaker.wait_time(domain, 10.0) == 0.0
+    assert breaker.wait_time(domain, 10.0) > 0
+    breaker.record_success(domain)
+    assert breaker.wait_time(domain, 10.0) == 0.0
+    assert not breaker.is_dead(domain)
+
+
+def test_breaker_probe_failure_doubles_pause_until_dead():
+    breaker = CircuitBreaker(threshold=1, cooldown=10.0, max_cooldown=30.0, max_trips=3)
+    domain = 'a.com'
+
+    assert breaker.record_block(domain, 0.0)
+    assert breaker.wait_time(domain, 10.0) == 0.0
+    assert breaker.record_block(domain, 10.0)
+    assert breaker.wait_time(domain, 10.0) == 20.0
+    # Ошибка без блокировки освобождает пробу, но не замыкает автомат
+    assert breaker.wait_time(domain, 30.0) == 0.0
+    breaker.record_failure(domain)
+    assert breaker.wait_time(domain, 30.0) == 0.0
+    assert breaker.record_block(domain, 30.0)
+    assert breaker.wait_time(domain, 30.0) == 30.0
+    assert breaker.is_dead(domain)
+
+
+def test_blocked_domain_paused_then_dead(clock):
+    blocked = [f'https://a.com/{i}' for i in range(3)]
+    other = 'https://b.com/1'
+    parser = FakeParser(clock, {url: [BlockedPageError(url, 'captcha')] * 10 for url in blocked})
+    crawler = CrawlScheduler(
+        parser, concurrency=1,
+        retry=RetryPolicy(max_attempts=10, base_delay=1.0, jitter=0),
+        breaker=CircuitBreaker(threshold=1, cooldown=10.0, max_trips=2),
+    )
+
+    results = {result.url: result for result in crawl(crawler, blocked + [other])}
+
+    assert results[other].ok
+    assert {letter.url for letter in crawler.dead_letters} == set(blocked)
+    assert {letter.reason for letter in crawler.dead_letters} == {'domain_blocked'}
+    # На паузе домен не запрашивается: после первого размыкания - только проба
+    start = parser.calls[0][1]
+    blocked_calls = [at - start for url, at, _ in parser.calls if url in blocked]
+    assert blocked_calls == [0.0, 10.0]
+    # URL, ни разу не запрошенный, попадает в dead_letters без попыток
+    untouched = [url for url in blocked if url not in {call[0] for call in parser.calls}]
+    assert all(results[url].attempts == 0 for url in untouched)
+
+
+def test_rate_limit_reserved_before_dispatch(clock):
+    urls = ['https://a.com/1', 'https://a.com/2', 'https://b.com/1']
+    limiter = RateLimiter(rate=1.0, burst=1)
+    parser = FakeParser(clock, rate_limiter=limiter)
+    crawler = CrawlScheduler(parser, concurrency=1)
+
+    crawl(crawler, urls)
+
+    # Пока a.com ждет токен, воркер обрабатывает b.com
+    assert [url for url, _, _ in parser.calls] == ['https://a.com/1', 'https://b.com/1', 'https://a.com/2']
+    assert all(reserved for _, _, reserved in parser.calls)
+    times = [at for url, at, _ in parser.calls if 'a.com' in url]
+    assert times[1] - times[0] == pytest.approx(1.0)
+    assert limiter.waited == 0.0
+
+
+class FlakyParser(ProductParser):
+    """Настоящий парсер, первая загрузка каждого URL которого падает"""
+
+    def __init__(self, **kwargs):
+        super().__init__(backend='static', rate_limiter=False, **kwargs)
+        self.failed = set()
+
+    async def _parse_url(self, url, backend=None, reserved=False):
+        if url not in self.failed:
+            self.failed.add(url)
+            raise RuntimeError('timeout')
+        return [{'id': '1', 'name': 'Товар', 'price': '1'}]
+
+
+def test_retries_reach_parser_metrics(clock, tmp_path):
+    log = tmp_path / 'metrics.jsonl'
+    parser = FlakyParser(metrics_log=str(log))
+    crawler = CrawlScheduler(parser, concurrency=2, retry=RetryPolicy(base_delay=1.0, jitter=0))
+
+    results = crawl(crawler, ['https://a.com/1', 'https://b.com/1'])
+
+    assert all(result.ok and result.attempts == 2 for result in results)
+    assert all(result.metrics.counters.get('retries') == 1 for result in results)
+    assert parser.metrics.counters.get('retries') == 2
+    assert 'retries' in parser.metrics.to_prometheus()
+    lines = [json.loads(line) for line in log.read_text(encoding='utf-8').splitlines()]
+    assert sum(line['counters'].get('retries', 0) for line in lines) == 2
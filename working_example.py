@@ -4,6 +4,7 @@
 
 from product_parser import parse_products
 import asyncio
+import logging
 from product_parser import ProductParser
 
 
@@ -170,6 +171,8 @@ def show_usage_instructions():
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    
     print("🚀 Рабочий пример парсера товаров")
     print("=" * 50)
     